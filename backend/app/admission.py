@@ -0,0 +1,226 @@
+"""
+Admission control, load shedding and rate limiting.
+
+Requests are admitted through two lanes. Writes (POST/PUT/PATCH/DELETE) share
+a small pool of WRITE_MAX_CONCURRENT slots with a bounded queue; reads have
+their own, larger pool, so a flood of uploads can never take the capacity
+the dashboard needs. When a lane's queue is full, or a request waits longer
+than its lane's queue timeout, it is shed straight away with a 503 and a
+Retry-After header instead of piling up.
+
+Writes are also rate limited with token buckets per client IP (here) and per
+report author (in the endpoint, once the form is parsed), answering 429 with
+Retry-After when a bucket is empty.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import HTTPException, status as http_status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+WRITE_MAX_CONCURRENT = int(os.getenv("WRITE_MAX_CONCURRENT", "16"))
+WRITE_MAX_QUEUE = int(os.getenv("WRITE_MAX_QUEUE", "64"))
+WRITE_QUEUE_TIMEOUT = float(os.getenv("WRITE_QUEUE_TIMEOUT", "5"))
+READ_MAX_CONCURRENT = int(os.getenv("READ_MAX_CONCURRENT", "256"))
+READ_MAX_QUEUE = int(os.getenv("READ_MAX_QUEUE", "1024"))
+READ_QUEUE_TIMEOUT = float(os.getenv("READ_QUEUE_TIMEOUT", "2"))
+SHED_RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "2"))
+
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "60"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "20"))
+RATE_LIMIT_AUTHOR_PER_MINUTE = float(os.getenv("RATE_LIMIT_AUTHOR_PER_MINUTE", "6"))
+RATE_LIMIT_AUTHOR_BURST = float(os.getenv("RATE_LIMIT_AUTHOR_BURST", "5"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Take the client IP from the last X-Forwarded-For hop, the one appended by the
+# trusted proxy in front of the app; earlier hops are set by the client
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class Overloaded(Exception):
+    """Raised when a lane cannot admit a request."""
+
+
+class AdmissionLane:
+    """Concurrency limiter with a bounded FIFO queue."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(self.name)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            raise Overloaded(self.name)
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter, keeping active unchanged
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def metrics(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+class RateLimiter:
+    """Token buckets per key, keeping at most max_keys recently used keys."""
+
+    def __init__(self, per_minute: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_keys = max_keys
+        self.limited = 0
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str) -> Optional[float]:
+        """Take a token for key; returns seconds to wait when none is left."""
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        retry_after = None
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            self.limited += 1
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            # Evicted keys start again with a full bucket
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class AdmissionController:
+    """Read and write lanes plus per-IP and per-author write rate limits."""
+
+    def __init__(self):
+        self.reads = AdmissionLane("read", READ_MAX_CONCURRENT, READ_MAX_QUEUE, READ_QUEUE_TIMEOUT)
+        self.writes = AdmissionLane("write", WRITE_MAX_CONCURRENT, WRITE_MAX_QUEUE, WRITE_QUEUE_TIMEOUT)
+        self.ip_limiter = RateLimiter(RATE_LIMIT_IP_PER_MINUTE, RATE_LIMIT_IP_BURST)
+        self.author_limiter = RateLimiter(RATE_LIMIT_AUTHOR_PER_MINUTE, RATE_LIMIT_AUTHOR_BURST)
+
+    def check_author(self, author: str):
+        """Rate limit writes per report author, raising 429 when exceeded."""
+        retry_after = self.author_limiter.take(author.strip().lower())
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=http_status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many reports from this author, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+
+    def metrics(self) -> dict:
+        return {
+            "read": self.reads.metrics(),
+            "write": self.writes.metrics(),
+            "rate_limited": {"ip": self.ip_limiter.limited, "author": self.author_limiter.limited},
+        }
+
+
+# Global admission controller
+admission_controller = AdmissionController()
+
+
+def client_ip(scope: Scope) -> str:
+    """Get the client IP of a request."""
+    if TRUST_FORWARDED_FOR:
+        forwarded = ",".join(Headers(scope=scope).getlist("x-forwarded-for"))
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[-1]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+async def _reject(send: Send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting requests through the read and write lanes."""
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in READ_METHODS:
+            lane = self.controller.reads
+        else:
+            lane = self.controller.writes
+            retry_after = self.controller.ip_limiter.take(client_ip(scope))
+            if retry_after is not None:
+                await _reject(send, 429, "Too many requests from this client, try again later", retry_after)
+                return
+
+        try:
+            await lane.acquire()
+        except Overloaded:
+            await _reject(send, 503, "Server is busy, try again shortly", SHED_RETRY_AFTER_SECONDS)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
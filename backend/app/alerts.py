@@ -0,0 +1,488 @@
+"""
+Geofenced alerts for critical reports.
+
+Users subscribe to an area (a circle or a polygon), optionally limited to
+some hazard types. When a report becomes alertable (critical severity, or a
+verified tsunami or storm surge), on creation or through moderation, every
+subscription whose area contains it is notified.
+
+Subscriptions are kept in memory in a grid index. A subscription is
+registered in each cell its bounding box overlaps, on the finest of two
+grid levels where that takes at most ALERT_MAX_CELLS cells; the few areas
+too large for either level are kept in a short list checked for every
+report. Matching a report reads one cell per level and then tests the
+exact shape of each candidate, so its cost depends on how many areas
+overlap that spot rather than on the number of subscriptions. Each worker
+mirrors the alert_subscriptions collection, refreshing it at most every
+ALERT_SYNC_SECONDS.
+
+Notifications go through a bounded queue to a sink (a JSON lines file or an
+HTTP endpoint, set by ALERT_SINK) in batches of up to ALERT_BATCH_SIZE,
+flushed at least every ALERT_FLUSH_SECONDS. A subscription is notified once
+per incident (or report, before it is clustered) per ALERT_DEDUP_SECONDS.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+import httpx
+from bson import ObjectId
+
+from app.db import get_database
+from app.geocoder import haversine_km
+from app.models import AlertSubscriptionCreate, AlertSubscriptionResponse
+
+ALERT_SUBSCRIPTIONS_COLLECTION = "alert_subscriptions"
+
+ALERT_SINK = os.getenv("ALERT_SINK", "file:alerts.jsonl")
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "500"))
+ALERT_FLUSH_SECONDS = float(os.getenv("ALERT_FLUSH_SECONDS", "1"))
+ALERT_DEDUP_SECONDS = float(os.getenv("ALERT_DEDUP_SECONDS", "3600"))
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "100000"))
+ALERT_SYNC_SECONDS = float(os.getenv("ALERT_SYNC_SECONDS", "5"))
+
+# Fine grid cell size; the coarse level uses cells ALERT_COARSE_FACTOR times larger
+ALERT_GRID_CELL_DEG = float(os.getenv("ALERT_GRID_CELL_DEG", "0.2"))
+ALERT_COARSE_FACTOR = 16
+ALERT_MAX_CELLS = int(os.getenv("ALERT_MAX_CELLS", "64"))
+
+# Hazards that alert once verified, whatever their severity
+ALERT_HAZARDS = ("tsunami", "storm_surge")
+
+# Report fields needed to decide on, match and describe an alert
+ALERT_FIELDS = ("title", "location", "coordinates", "type", "severity", "status", "verified", "incident_id")
+
+KM_PER_DEGREE = 111.32
+
+CellKey = Tuple[int, int, int]
+BBox = Tuple[float, float, float, float]
+
+
+def _value(value):
+    return getattr(value, "value", value)
+
+
+def is_alertable(report_data: dict) -> bool:
+    """Check whether a report should alert subscribers."""
+    if _value(report_data.get("severity")) == "critical":
+        return True
+    return _value(report_data.get("type")) in ALERT_HAZARDS and (
+        bool(report_data.get("verified")) or _value(report_data.get("status")) == "verified"
+    )
+
+
+def point_in_polygon(lat: float, lng: float, polygon: List[Tuple[float, float]]) -> bool:
+    """Ray casting test of a point against a polygon ring."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lng_i > lng) != (lng_j > lng) and lat < (lat_j - lat_i) * (lng - lng_i) / (lng_j - lng_i) + lat_i:
+            inside = not inside
+        j = i
+    return inside
+
+
+@dataclass(slots=True)
+class Subscription:
+    """In-memory state of an alert subscription."""
+    id: str
+    user_id: str
+    bbox: BBox
+    center: Optional[Tuple[float, float]] = None
+    radius_km: float = 0.0
+    polygon: Optional[List[Tuple[float, float]]] = None
+    hazard_types: Optional[FrozenSet[str]] = None
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "Subscription":
+        area = doc["area"]
+        hazard_types = frozenset(_value(h) for h in doc["hazard_types"]) if doc.get("hazard_types") else None
+        if area.get("polygon"):
+            polygon = [(lat, lng) for lat, lng in area["polygon"]]
+            lats = [lat for lat, _ in polygon]
+            lngs = [lng for _, lng in polygon]
+            bbox = (min(lats), min(lngs), max(lats), max(lngs))
+            return cls(str(doc["_id"]), doc["user_id"], bbox, polygon=polygon, hazard_types=hazard_types)
+        lat, lng = area["center"]
+        radius_km = area["radius_km"]
+        lat_margin = radius_km / KM_PER_DEGREE
+        # Widest longitude span is at the box edge nearest a pole
+        cos_lat = math.cos(math.radians(min(89.9, abs(lat) + lat_margin)))
+        lng_margin = min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+        bbox = (lat - lat_margin, lng - lng_margin, lat + lat_margin, lng + lng_margin)
+        return cls(str(doc["_id"]), doc["user_id"], bbox, center=(lat, lng), radius_km=radius_km, hazard_types=hazard_types)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            return False
+        if self.polygon is not None:
+            return point_in_polygon(lat, lng, self.polygon)
+        return haversine_km(self.center[0], self.center[1], lat, lng) <= self.radius_km
+
+
+class SubscriptionGrid:
+    """Two-level grid index of subscription areas."""
+
+    def __init__(self, cell_deg: float = ALERT_GRID_CELL_DEG, max_cells: int = ALERT_MAX_CELLS):
+        self.cell_sizes = (cell_deg, cell_deg * ALERT_COARSE_FACTOR)
+        self.max_cells = max_cells
+        self.cells: Dict[CellKey, Set[str]] = defaultdict(set)
+        self.oversized: Set[str] = set()
+        self.subscriptions: Dict[str, Subscription] = {}
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+    def cells_of(self, bbox: BBox) -> Tuple[CellKey, ...]:
+        """Get the cells covering a bounding box on the finest level that fits."""
+        min_lat, min_lng, max_lat, max_lng = bbox
+        for level, size in enumerate(self.cell_sizes):
+            i0, i1 = math.floor(min_lat / size), math.floor(max_lat / size)
+            j0, j1 = math.floor(min_lng / size), math.floor(max_lng / size)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) <= self.max_cells:
+                return tuple((level, i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1))
+        return ()
+
+    def put(self, subscription: Subscription):
+        """Insert or replace a subscription."""
+        self.remove(subscription.id)
+        cells = self.cells_of(subscription.bbox)
+        if cells:
+            for cell in cells:
+                self.cells[cell].add(subscription.id)
+        else:
+            self.oversized.add(subscription.id)
+        self.subscriptions[subscription.id] = subscription
+
+    def remove(self, subscription_id: str) -> Optional[Subscription]:
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return None
+        self.oversized.discard(subscription_id)
+        # Cells are recomputed rather than stored, which saves memory per subscription
+        for cell in self.cells_of(subscription.bbox):
+            members = self.cells[cell]
+            members.discard(subscription_id)
+            if not members:
+                del self.cells[cell]
+        return subscription
+
+    def match(self, lat: float, lng: float, hazard_type: Optional[str] = None) -> List[Subscription]:
+        """Get the subscriptions whose area contains a point."""
+        candidates = set(self.oversized)
+        for level, size in enumerate(self.cell_sizes):
+            candidates.update(self.cells.get((level, math.floor(lat / size), math.floor(lng / size)), ()))
+        matches = []
+        for subscription_id in candidates:
+            subscription = self.subscriptions[subscription_id]
+            if subscription.hazard_types is not None and hazard_type not in subscription.hazard_types:
+                continue
+            if subscription.contains(lat, lng):
+                matches.append(subscription)
+        return matches
+
+
+# Sinks
+
+class FileSink:
+    """Appends notifications to a JSON lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, lines: str):
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+    async def send(self, batch: List[dict]):
+        lines = "".join(json.dumps(notification, default=str) + "\n" for notification in batch)
+        await asyncio.to_thread(self._append, lines)
+
+    async def close(self):
+        pass
+
+
+class HttpSink:
+    """Posts notification batches as JSON to a delivery endpoint."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self._client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, batch: List[dict]):
+        response = await self._client.post(self.url, content=json.dumps({"alerts": batch}, default=str),
+                                           headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+def create_sink(spec: str = ALERT_SINK):
+    """Create a sink from an http(s):// URL or a file:<path> spec."""
+    if spec.startswith(("http://", "https://")):
+        return HttpSink(spec)
+    return FileSink(spec[len("file:"):] if spec.startswith("file:") else spec)
+
+
+class AlertDispatcher:
+    """Deduplicates notifications and sends them to a sink in batches."""
+
+    def __init__(
+        self,
+        sink=None,
+        batch_size: int = ALERT_BATCH_SIZE,
+        flush_seconds: float = ALERT_FLUSH_SECONDS,
+        dedup_seconds: float = ALERT_DEDUP_SECONDS,
+        queue_size: int = ALERT_QUEUE_SIZE
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dedup_seconds = dedup_seconds
+        self.queued = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Dedup keys in expiry order, since every key lives for the same window
+        self._seen: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        # Batch taken off the queue and not yet sent
+        self._batch: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, notification: dict) -> bool:
+        """Queue a notification unless it is a duplicate or the queue is full."""
+        now = time.monotonic()
+        while self._seen:
+            key, expires = next(iter(self._seen.items()))
+            if expires > now:
+                break
+            del self._seen[key]
+        key = (notification["subscription_id"], notification["incident_id"] or notification["report_id"])
+        if key in self._seen:
+            self.deduplicated += 1
+            return False
+        try:
+            self._queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self._seen[key] = now + self.dedup_seconds
+        self.queued += 1
+        return True
+
+    async def _next_batch(self) -> List[dict]:
+        batch = self._batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _send(self, batch: List[dict]):
+        try:
+            await self.sink.send(batch)
+            self.sent += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Failed to send {len(batch)} alerts: {e}")
+
+    async def run(self):
+        """Send queued notifications until cancelled."""
+        while True:
+            await self._send(await self._next_batch())
+            self._batch = []
+
+    def start(self):
+        if self.sink is None:
+            self.sink = create_sink()
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the sender, flushing what is still queued."""
+        if self._task is not None:
+            # Let the sender drain the queue, so no batch is dropped half sent
+            while self._batch or not self._queue.empty():
+                await asyncio.sleep(0.01)
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            if len(batch) >= self.batch_size:
+                await self._send(batch)
+                batch = []
+        if batch:
+            await self._send(batch)
+        if self.sink is not None:
+            await self.sink.close()
+
+    def metrics(self) -> dict:
+        return {
+            "queued": self.queued,
+            "pending": self._queue.qsize(),
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "failed": self.failed,
+        }
+
+
+class AlertEngine:
+    """Matches alertable reports against subscriptions and dispatches alerts."""
+
+    def __init__(self, grid: Optional[SubscriptionGrid] = None, dispatcher: Optional[AlertDispatcher] = None):
+        self.grid = grid or SubscriptionGrid()
+        self.dispatcher = dispatcher or AlertDispatcher()
+        self.matched = 0
+        self._synced_at = 0.0
+        self._synced_through: Optional[datetime] = None
+        self._sync_lock = asyncio.Lock()
+
+    @property
+    def collection(self):
+        database = get_database()
+        if database is None:
+            raise RuntimeError("Database not connected")
+        return database.get_collection(ALERT_SUBSCRIPTIONS_COLLECTION)
+
+    async def sync(self, force: bool = False) -> int:
+        """Pick up subscription changes, at most every ALERT_SYNC_SECONDS."""
+        if not force and time.monotonic() - self._synced_at < ALERT_SYNC_SECONDS:
+            return 0
+        if get_database() is None or self._sync_lock.locked():
+            return 0
+        async with self._sync_lock:
+            self._synced_at = time.monotonic()
+            started = datetime.utcnow()
+            query = {}
+            if self._synced_through:
+                # Overlap the previous sync to allow for clock skew between workers
+                query["updated_at"] = {"$gte": self._synced_through - timedelta(seconds=5)}
+            else:
+                query["active"] = True
+            changed = 0
+            async for doc in self.collection.find(query):
+                if doc.get("active"):
+                    self.grid.put(Subscription.from_doc(doc))
+                else:
+                    self.grid.remove(str(doc["_id"]))
+                changed += 1
+            self._synced_through = started
+            return changed
+
+    async def subscribe(self, user_id: str, subscription: AlertSubscriptionCreate) -> AlertSubscriptionResponse:
+        """Create a subscription for a user."""
+        now = datetime.utcnow()
+        doc = {
+            **subscription.model_dump(exclude_none=True),
+            "user_id": user_id,
+            "active": True,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await self.collection.insert_one(doc)
+        doc["_id"] = str(result.inserted_id)
+        self.grid.put(Subscription.from_doc(doc))
+        return AlertSubscriptionResponse(**doc)
+
+    async def list_subscriptions(self, user_id: str) -> List[AlertSubscriptionResponse]:
+        """Get a user's active subscriptions."""
+        subscriptions = []
+        async for doc in self.collection.find({"user_id": user_id, "active": True}).sort("created_at", -1):
+            doc["_id"] = str(doc["_id"])
+            subscriptions.append(AlertSubscriptionResponse(**doc))
+        return subscriptions
+
+    async def unsubscribe(self, user_id: str, subscription_id: str) -> bool:
+        """Deactivate a user's subscription."""
+        if not ObjectId.is_valid(subscription_id):
+            return False
+        # Kept as inactive, so other workers see the removal when they sync
+        result = await self.collection.update_one(
+            {"_id": ObjectId(subscription_id), "user_id": user_id, "active": True},
+            {"$set": {"active": False, "updated_at": datetime.utcnow()}}
+        )
+        self.grid.remove(subscription_id)
+        return result.modified_count > 0
+
+    def match(self, report_data: dict) -> List[Subscription]:
+        """Get the subscriptions a report falls in."""
+        lat, lng = report_data["coordinates"]
+        return self.grid.match(lat, lng, _value(report_data["type"]))
+
+    async def notify_report(self, report_id: str, report_data: dict) -> int:
+        """Queue alerts for an alertable report, returning how many were queued."""
+        if not is_alertable(report_data):
+            return 0
+        await self.sync()
+        subscriptions = self.match(report_data)
+        self.matched += len(subscriptions)
+        created_at = datetime.utcnow().isoformat()
+        queued = 0
+        for subscription in subscriptions:
+            queued += self.dispatcher.submit({
+                "subscription_id": subscription.id,
+                "user_id": subscription.user_id,
+                "report_id": report_id,
+                "incident_id": report_data.get("incident_id"),
+                "type": _value(report_data["type"]),
+                "severity": _value(report_data["severity"]),
+                "title": report_data.get("title"),
+                "location": report_data.get("location"),
+                "coordinates": list(report_data["coordinates"]),
+                "created_at": created_at,
+            })
+        return queued
+
+    async def notify_change(self, report_id: str, before: dict, after: dict) -> int:
+        """Queue alerts for a report that an update made alertable."""
+        if is_alertable(before) or not is_alertable(after):
+            return 0
+        return await self.notify_report(report_id, after)
+
+    def metrics(self) -> dict:
+        return {
+            "subscriptions": len(self.grid),
+            "cells": len(self.grid.cells),
+            "oversized": len(self.grid.oversized),
+            "matched": self.matched,
+            **self.dispatcher.metrics(),
+        }
+
+
+# Global alert engine
+alert_engine = AlertEngine()
+
+
+async def create_alert_indexes():
+    """Create the indexes used to list and sync subscriptions."""
+    database = get_database()
+    if database is None:
+        return
+    subscriptions = database.get_collection(ALERT_SUBSCRIPTIONS_COLLECTION)
+    await subscriptions.create_index([("user_id", 1), ("active", 1)])
+    await subscriptions.create_index([("updated_at", 1)])
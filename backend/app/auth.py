@@ -0,0 +1,292 @@
+"""
+Password hashing and signed access tokens.
+
+Passwords are hashed with scrypt, which is deliberately slow and memory-hard,
+so hashing and verification run in a small process pool (AUTH_HASH_WORKERS)
+rather than on the event loop.
+
+Access tokens are HMAC-SHA256 signed claims (user id, username, role,
+expiry and a token id) verified without touching the database. Decoded
+claims are kept in an LRU so a repeat request only costs a dict lookup.
+Logging out records the token id in the revoked_tokens collection, expiring
+with the token; each worker mirrors that list in memory and refreshes it at
+most every AUTH_REVOCATION_SYNC_SECONDS.
+
+Set AUTH_SECRET (shared by all workers) in production.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import multiprocessing
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException, status as http_status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.db import get_database
+
+AUTH_SECRET = os.getenv("AUTH_SECRET", "")
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(12 * 3600)))
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_REVOCATION_SYNC_SECONDS = float(os.getenv("AUTH_REVOCATION_SYNC_SECONDS", "2"))
+
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+
+# scrypt cost: 2**14 iterations with r=8 uses 16 MiB per hash
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+
+_SECRET_KEY = (AUTH_SECRET or secrets.token_urlsafe(32)).encode()
+
+
+def check_secret():
+    """Warn at startup when tokens are signed with a per-process secret."""
+    if not AUTH_SECRET:
+        print("⚠️  AUTH_SECRET is not set; tokens will not be valid across workers or restarts")
+
+
+# Password hashing (runs in the hash pool)
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p,
+        maxmem=2 * 128 * n * r * p, dklen=SCRYPT_DKLEN
+    )
+
+
+def _hash_password(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def _verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, n, r, p, salt, digest = encoded.split("$")
+    except ValueError:
+        return False
+    if scheme != "scrypt":
+        return False
+    candidate = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(candidate, _b64decode(digest))
+
+
+# Verified against when a username doesn't exist, so lookups take as long as logins
+_DUMMY_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(b'0' * 16)}${_b64encode(b'0' * SCRYPT_DKLEN)}"
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        # Spawn rather than fork: the server process runs Motor's threads
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=AUTH_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the hash pool."""
+    return await asyncio.get_running_loop().run_in_executor(_get_hash_pool(), _hash_password, password)
+
+
+async def verify_password(password: str, encoded: Optional[str]) -> bool:
+    """Check a password against a stored hash in the hash pool."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_hash_pool(), _verify_password, password, encoded or _DUMMY_HASH
+    ) and encoded is not None
+
+
+async def warm_hash_pool():
+    """Start the hash pool's processes ahead of the first login."""
+    pool = _get_hash_pool()
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(pool, time.sleep, 0) for _ in range(AUTH_HASH_WORKERS)))
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+# Tokens
+
+def _sign(payload: bytes) -> str:
+    return _b64encode(hmac.new(_SECRET_KEY, payload, hashlib.sha256).digest())
+
+
+def issue_token(user_id: str, username: str, role: str) -> Dict:
+    """Issue a signed access token for a user."""
+    now = int(time.time())
+    claims = {
+        "sub": user_id,
+        "username": username,
+        "role": role,
+        "iat": now,
+        "exp": now + AUTH_TOKEN_TTL_SECONDS,
+        "jti": secrets.token_urlsafe(12),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return {"token": f"{payload}.{_sign(payload.encode())}", "claims": claims}
+
+
+class TokenVerifier:
+    """Verifies tokens statelessly, caching decoded claims and revocations."""
+
+    def __init__(self, cache_size: int = AUTH_TOKEN_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._claims: "OrderedDict[str, dict]" = OrderedDict()
+        self._revoked: Dict[str, int] = {}
+        self._synced_at = 0.0
+        self._synced_through: Optional[datetime] = None
+        self._sync_lock = asyncio.Lock()
+
+    def _decode(self, token: str) -> Optional[dict]:
+        claims = self._claims.get(token)
+        if claims is not None:
+            self._claims.move_to_end(token)
+            return claims
+        payload, _, signature = token.partition(".")
+        # Compared as bytes: compare_digest rejects str with non-ASCII characters
+        if not signature or not hmac.compare_digest(signature.encode(), _sign(payload.encode()).encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        self._claims[token] = claims
+        if len(self._claims) > self.cache_size:
+            self._claims.popitem(last=False)
+        return claims
+
+    async def verify(self, token: str) -> Optional[dict]:
+        """Get the claims of a valid, unexpired and unrevoked token."""
+        claims = self._decode(token)
+        now = time.time()
+        if claims is None or claims["exp"] <= now:
+            return None
+        await self.sync()
+        if claims["jti"] in self._revoked:
+            return None
+        return claims
+
+    async def revoke(self, claims: dict):
+        """Revoke a token until it expires."""
+        self._revoked[claims["jti"]] = claims["exp"]
+        database = get_database()
+        if database is None:
+            return
+        await database.get_collection(REVOKED_TOKENS_COLLECTION).update_one(
+            {"_id": claims["jti"]},
+            {"$set": {
+                "revoked_at": datetime.utcnow(),
+                "expires_at": datetime(1970, 1, 1) + timedelta(seconds=claims["exp"])
+            }},
+            upsert=True
+        )
+
+    async def sync(self, force: bool = False):
+        """Pick up revocations from other workers, at most every AUTH_REVOCATION_SYNC_SECONDS."""
+        if not force and time.monotonic() - self._synced_at < AUTH_REVOCATION_SYNC_SECONDS:
+            return
+        database = get_database()
+        if database is None or self._sync_lock.locked():
+            return
+        async with self._sync_lock:
+            self._synced_at = time.monotonic()
+            started = datetime.utcnow()
+            now = time.time()
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            query = {"expires_at": {"$gt": started}}
+            if self._synced_through:
+                # Overlap the previous sync to allow for clock skew between workers
+                query["revoked_at"] = {"$gte": self._synced_through - timedelta(seconds=5)}
+            try:
+                async for doc in database.get_collection(REVOKED_TOKENS_COLLECTION).find(query):
+                    self._revoked[doc["_id"]] = int((doc["expires_at"] - datetime(1970, 1, 1)).total_seconds())
+            except Exception as e:
+                print(f"Failed to sync revoked tokens: {e}")
+                return
+            self._synced_through = started
+
+
+# Global token verifier
+token_verifier = TokenVerifier()
+
+
+async def create_revocation_indexes():
+    """Expire revocation records together with their tokens."""
+    database = get_database()
+    if database is None:
+        return
+    await database.get_collection(REVOKED_TOKENS_COLLECTION).create_index(
+        [("expires_at", 1)], expireAfterSeconds=0
+    )
+
+
+# Dependencies
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)
+) -> Optional[dict]:
+    """Get the claims of the request's bearer token, if any."""
+    if credentials is None:
+        return None
+    claims = await token_verifier.verify(credentials.credentials)
+    if claims is None:
+        raise HTTPException(
+            status_code=http_status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return claims
+
+
+async def require_user(claims: Optional[dict] = Depends(get_current_user)) -> dict:
+    """Dependency requiring an authenticated user."""
+    if claims is None:
+        raise HTTPException(
+            status_code=http_status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return claims
+
+
+def require_role(*roles: str):
+    """Dependency factory requiring an authenticated user with one of roles."""
+    async def check_role(claims: dict = Depends(require_user)) -> dict:
+        if claims["role"] not in roles:
+            raise HTTPException(
+                status_code=http_status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions"
+            )
+        return claims
+    return check_role
@@ -0,0 +1,57 @@
+"""
+Short-lived in-process response cache.
+
+Entries expire TTL seconds after they are stored and the cache holds at most
+max_entries, evicting the least recently used. Keys should change whenever
+the underlying data does (e.g. include the collection-version ETag), so the
+TTL only bounds how long a burst of identical requests reuses one result.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+DASHBOARD_BUNDLE_TTL_SECONDS = float(os.getenv("DASHBOARD_BUNDLE_TTL_SECONDS", "5"))
+DASHBOARD_BUNDLE_CACHE_ENTRIES = int(os.getenv("DASHBOARD_BUNDLE_CACHE_ENTRIES", "256"))
+HEATMAP_TILE_TTL_SECONDS = float(os.getenv("HEATMAP_TILE_TTL_SECONDS", "300"))
+HEATMAP_TILE_CACHE_ENTRIES = int(os.getenv("HEATMAP_TILE_CACHE_ENTRIES", "2048"))
+
+
+class TTLCache:
+    """LRU cache whose entries expire after a fixed time to live."""
+
+    def __init__(self, ttl: float, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Global cache of encoded dashboard bundles
+dashboard_bundle_cache = TTLCache(DASHBOARD_BUNDLE_TTL_SECONDS, DASHBOARD_BUNDLE_CACHE_ENTRIES)
+
+# Global cache of rendered heatmap tiles, keyed by (reports version, z, x, y, ...)
+heatmap_tile_cache = TTLCache(HEATMAP_TILE_TTL_SECONDS, HEATMAP_TILE_CACHE_ENTRIES)
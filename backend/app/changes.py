@@ -0,0 +1,262 @@
+"""
+Change sequence and tombstones for delta sync.
+
+Writes to tracked collections are stamped with change_seq, taken from a
+per-collection counter in change_counters, and changed_at. Deletes leave a
+tombstone carrying the same fields. A client syncs by passing back the token
+of its last response and receives every document and tombstone stamped after
+it, in (change_seq, _id) order.
+
+Sequence numbers are allocated before the write commits, so a later number
+can become visible before an earlier one. Tokens therefore only advance past
+changes older than CHANGES_SETTLE_SECONDS; newer changes are returned but
+may be repeated by the next call, which clients apply idempotently. Writes
+spanning many documents can outlast that window, so they hold their range
+unsettled in the counter document until they return, and tokens stop short
+of it. A response whose changes are all unsettled carries a retry_after hint.
+
+Tombstones older than TOMBSTONE_RETENTION_DAYS are pruned. A token from
+before the pruned range gets a reset and the client resyncs from scratch.
+Stamp documents written before change tracking existed with:
+
+    python -m app.changes backfill
+"""
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from app.db import get_database
+
+COUNTERS_COLLECTION = "change_counters"
+TOMBSTONES_COLLECTION = "tombstones"
+
+CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "2"))
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "7"))
+
+# A held range left behind by a crashed worker stops blocking tokens after this
+CHANGES_HOLD_SECONDS = float(os.getenv("CHANGES_HOLD_SECONDS", "600"))
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _get_collection(name: str):
+    database = get_database()
+    if database is None:
+        raise RuntimeError("Database not connected")
+    return database.get_collection(name)
+
+
+async def allocate(name: str, count: int = 1) -> int:
+    """Reserve count consecutive change sequence numbers, returning the first."""
+    counter = await _get_collection(COUNTERS_COLLECTION).find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"] - count + 1
+
+
+async def stamp(name: str) -> dict:
+    """Allocate the change fields of one write."""
+    return {"change_seq": await allocate(name), "changed_at": datetime.utcnow()}
+
+
+@asynccontextmanager
+async def hold(name: str, count: int = 1) -> AsyncIterator[int]:
+    """Allocate sequence numbers for a multi-document write, unsettled until it returns."""
+    first = await allocate(name, count)
+    counters = _get_collection(COUNTERS_COLLECTION)
+    expires_at = datetime.utcnow() + timedelta(seconds=CHANGES_HOLD_SECONDS)
+    await counters.update_one({"_id": name}, {"$push": {"held": {"seq": first, "expires_at": expires_at}}})
+    try:
+        yield first
+    finally:
+        await counters.update_one({"_id": name}, {"$pull": {"held": {"seq": first}}})
+
+
+async def record_tombstones(name: str, doc_ids: List[str]):
+    """Record deleted documents of a collection."""
+    if not doc_ids:
+        return
+    first = await allocate(name, len(doc_ids))
+    now = datetime.utcnow()
+    await _get_collection(TOMBSTONES_COLLECTION).insert_many([
+        {"collection": name, "doc_id": doc_id, "change_seq": first + i, "changed_at": now}
+        for i, doc_id in enumerate(doc_ids)
+    ])
+
+
+def encode_token(seq: int, doc_id: str) -> str:
+    return f"{seq}-{doc_id}"
+
+
+def decode_token(token: Optional[str]) -> Tuple[int, str]:
+    """Parse a change token; raises ValueError when malformed."""
+    if not token:
+        return 0, ""
+    seq, _, doc_id = token.partition("-")
+    return int(seq), doc_id
+
+
+def _after(seq: int, doc_id: str, id_field: str, id_value) -> dict:
+    """Keyset filter for entries after (seq, doc_id)."""
+    return {"$or": [
+        {"change_seq": {"$gt": seq}},
+        {"change_seq": seq, id_field: {"$gt": id_value}}
+    ]}
+
+
+async def read_changes(collection, name: str, since: Optional[str], limit: int) -> dict:
+    """Read documents and tombstones changed after a token.
+
+    Returns the changed documents, deleted IDs, the next token, whether more
+    changes are waiting, whether the client must resync from scratch, and how
+    long to wait when none of the changes could be settled.
+    """
+    seq, doc_id = decode_token(since)
+    counter = await _get_collection(COUNTERS_COLLECTION).find_one({"_id": name}) or {}
+    if since and seq < counter.get("tombstones_pruned_through", 0):
+        return {"documents": [], "deleted": [], "next_token": "", "has_more": False, "reset": True}
+    now = datetime.utcnow()
+    held = [entry["seq"] for entry in counter.get("held", []) if entry["expires_at"] > now]
+    held_from = min(held) if held else None
+
+    object_id = ObjectId(doc_id) if ObjectId.is_valid(doc_id) else ObjectId("0" * 24)
+    entries = []
+    async for doc in collection.find(
+        _after(seq, doc_id, "_id", object_id)
+    ).sort([("change_seq", 1), ("_id", 1)]).limit(limit + 1):
+        entries.append((doc["change_seq"], str(doc["_id"]), doc, False))
+    async for tombstone in _get_collection(TOMBSTONES_COLLECTION).find(
+        {"collection": name, **_after(seq, doc_id, "doc_id", doc_id)}
+    ).sort([("change_seq", 1), ("doc_id", 1)]).limit(limit + 1):
+        entries.append((tombstone["change_seq"], tombstone["doc_id"], tombstone, True))
+    entries.sort(key=lambda entry: entry[:2])
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    settled_before = now - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    next_token = since or ""
+    for entry_seq, entry_id, entry, _ in entries:
+        if entry["changed_at"] > settled_before or (held_from is not None and entry_seq >= held_from):
+            break
+        next_token = encode_token(entry_seq, entry_id)
+    # Nothing settled yet, so asking again right away would return the same page
+    retry_after = CHANGES_SETTLE_SECONDS if has_more and next_token == (since or "") else None
+
+    documents, deleted = [], []
+    for _, entry_id, entry, is_tombstone in entries:
+        if is_tombstone:
+            deleted.append(entry_id)
+        else:
+            documents.append(entry)
+    return {
+        "documents": documents,
+        "deleted": deleted,
+        "next_token": next_token,
+        "has_more": has_more,
+        "reset": False,
+        "retry_after": retry_after,
+    }
+
+
+async def create_change_indexes(tracked: List[str]):
+    """Create the change sequence and tombstone indexes."""
+    database = get_database()
+    if database is None:
+        return
+    for name in tracked:
+        await database.get_collection(name).create_index([("change_seq", 1), ("_id", 1)])
+    tombstones = database.get_collection(TOMBSTONES_COLLECTION)
+    await tombstones.create_index([("collection", 1), ("change_seq", 1), ("doc_id", 1)])
+    await tombstones.create_index([("changed_at", 1)])
+
+
+async def prune_tombstones() -> int:
+    """Drop tombstones past retention, remembering the pruned sequence range."""
+    tombstones = _get_collection(TOMBSTONES_COLLECTION)
+    cutoff = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    pruned_through: Dict[str, int] = {}
+    async for group in tombstones.aggregate([
+        {"$match": {"changed_at": {"$lt": cutoff}}},
+        {"$group": {"_id": "$collection", "seq": {"$max": "$change_seq"}}}
+    ]):
+        pruned_through[group["_id"]] = group["seq"]
+    if not pruned_through:
+        return 0
+
+    # Record the range before deleting, so no client syncs across the gap
+    counters = _get_collection(COUNTERS_COLLECTION)
+    for name, seq in pruned_through.items():
+        await counters.update_one(
+            {"_id": name},
+            {"$max": {"tombstones_pruned_through": seq}},
+            upsert=True
+        )
+    result = await tombstones.delete_many({
+        "$or": [
+            {"collection": name, "change_seq": {"$lte": seq}}
+            for name, seq in pruned_through.items()
+        ]
+    })
+    if result.deleted_count:
+        print(f"🪦 Pruned {result.deleted_count} tombstones")
+    return result.deleted_count
+
+
+# Backfill
+
+async def backfill(name: str) -> int:
+    """Stamp documents written before change tracking with change sequences."""
+    collection = _get_collection(name)
+    stamped = 0
+    while True:
+        ids = [
+            doc["_id"]
+            async for doc in collection.find({"change_seq": {"$exists": False}}, {"_id": 1}).limit(BACKFILL_BATCH_SIZE)
+        ]
+        if not ids:
+            return stamped
+        first = await allocate(name, len(ids))
+        now = datetime.utcnow()
+        await collection.bulk_write([
+            UpdateOne(
+                {"_id": doc_id, "change_seq": {"$exists": False}},
+                {"$set": {"change_seq": first + i, "changed_at": now}}
+            )
+            for i, doc_id in enumerate(ids)
+        ], ordered=False)
+        stamped += len(ids)
+
+
+async def _main():
+    from app.db import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="OceanEye change tracking")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subcommands.add_parser("backfill", help="Stamp unstamped documents with change sequences")
+    backfill_parser.add_argument("--collection", default="user_reports", help="Collection to stamp")
+    subcommands.add_parser("prune", help="Drop tombstones past retention")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        if args.command == "backfill":
+            await create_change_indexes([args.collection])
+            stamped = await backfill(args.collection)
+            print(f"🔢 Stamped {stamped} documents in {args.collection}")
+        elif args.command == "prune":
+            await prune_tombstones()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
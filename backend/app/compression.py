@@ -0,0 +1,183 @@
+"""
+Negotiated response compression with a cache of precompressed bodies.
+
+Complete (non-streaming) responses larger than COMPRESSION_MINIMUM_SIZE are
+compressed with the best encoding the client accepts: zstd or brotli when
+the optional zstandard/brotli packages are installed (pip install
+"backend[compression]"), otherwise gzip. For the hot endpoints in
+COMPRESSION_CACHE_PATHS, compressed bodies are cached by (ETag, encoding).
+The ETag changes with the collection version, so each version of a payload is
+compressed once and then reused for every client.
+"""
+import gzip
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+COMPRESSION_CACHE_PATHS = [
+    path.strip()
+    for path in os.getenv("COMPRESSION_CACHE_PATHS", "/api/reports,/api/trending,/api/dashboard/stats").split(",")
+    if path.strip()
+]
+
+COMPRESSIBLE_TYPES = ("application/json", "application/geo+json", "text/")
+
+
+def _encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    """Available encoders, in server preference order."""
+    encoders: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        encoders["zstd"] = compressor.compress
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(body, quality=5)
+    encoders["gzip"] = lambda body: gzip.compress(body, compresslevel=6)
+    return encoders
+
+
+ENCODERS = _encoders()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred available encoding from an Accept-Encoding header."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODERS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressedBodyCache:
+    """LRU cache of compressed bodies bounded by total size."""
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: Tuple[str, str], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+# Global cache of compressed hot responses
+compressed_body_cache = CompressedBodyCache()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        cache_paths: Optional[List[str]] = None,
+        cache: Optional[CompressedBodyCache] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache_paths = set(COMPRESSION_CACHE_PATHS if cache_paths is None else cache_paths)
+        self.cache = cache or compressed_body_cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cacheable = scope["method"] == "GET" and scope["path"] in self.cache_paths
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                # Streams, already-encoded and small bodies go out untouched
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+            key = (etag, encoding) if cacheable and etag and start_message["status"] == 200 else None
+            compressed = self.cache.get(key) if key else None
+            if compressed is None:
+                compressed = ENCODERS[encoding](body)
+                if key:
+                    self.cache.put(key, compressed)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
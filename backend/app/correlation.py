@@ -0,0 +1,230 @@
+"""
+Correlation of social posts with nearby user reports.
+
+Reports and posts are reduced to terms (hashtags, location tokens and hazard
+keywords) that are stored on the document itself, under TERMS_FIELD, behind a
+multikey index. When a report or post is ingested, the other collection is
+queried on the primary for items sharing terms within CORRELATION_WINDOW_HOURS,
+and the best matches are stored on both documents. Because the terms are
+written before the probe, of any two items ingested by different workers the
+later one always finds the earlier. Serving related items is then a single
+read of the stored ids, never a cross-collection scan.
+"""
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app.crud import social_posts_crud, user_reports_crud
+from app.geocoder import normalize
+
+CORRELATION_WINDOW_HOURS = int(os.getenv("CORRELATION_WINDOW_HOURS", "24"))
+MAX_RELATED = int(os.getenv("CORRELATION_MAX_RELATED", "20"))
+
+# Newest candidates read per collection, which bounds the cost of one probe
+MAX_CANDIDATES = int(os.getenv("CORRELATION_MAX_CANDIDATES", "500"))
+
+# Document field holding the correlation terms of a report or post
+TERMS_FIELD = "correlation_terms"
+
+# Minimum score for a pair to be related (a place plus a tag or a hazard);
+# pairs that only share location tokens are never related
+MIN_SCORE = 2.5
+
+TERM_WEIGHTS = {"tag": 2.0, "loc": 1.0, "hazard": 1.5}
+
+REPORT = "report"
+POST = "post"
+
+# Keywords that identify a hazard type in free text
+HAZARD_KEYWORDS: Dict[str, List[str]] = {
+    "hurricane": ["hurricane", "cyclone", "cyclonic"],
+    "storm_surge": ["storm surge", "stormsurge", "surge"],
+    "flooding": ["flood", "flooding", "flooded", "waterlogging", "inundation"],
+    "waterspout": ["waterspout"],
+    "high_waves": ["high waves", "waves", "swell", "rough sea", "rough seas"],
+    "unusual_tide": ["tide", "tides", "high tide", "receding"],
+    "tsunami": ["tsunami", "tsunamiwatch", "tsunamialert"],
+    "earthquake": ["earthquake", "tremor", "quake"],
+    "landslide": ["landslide", "landslip"],
+    "coastal_erosion": ["erosion", "coastal erosion"],
+    "erosion": ["erosion"],
+    "sea_level_rise": ["sea level rise"],
+    "coastal_damage": ["damage", "damaged", "collapsed"],
+    "oil_spill": ["oil spill", "oilspill", "oil slick"],
+    "maritime_pollution": ["pollution", "polluted", "sewage", "effluent"],
+    "plastic_debris": ["plastic", "plastics"],
+    "debris": ["debris", "garbage", "trash", "litter"],
+    "harmful_algal_bloom": ["algal bloom", "algae", "red tide"],
+    "dangerous_sea_creatures": ["jellyfish", "shark", "sea snake"],
+    "shipping_accident": ["capsized", "shipwreck", "vessel", "boat sank", "collision"],
+}
+
+# Location words too generic to correlate on
+LOCATION_STOPWORDS = {
+    "the", "of", "and", "near", "at", "in", "beach", "coast", "port", "sea",
+    "district", "city", "town", "village", "area", "road", "north", "south",
+    "east", "west",
+}
+
+_HASHTAG_RE = re.compile(r"#(\w+)")
+
+
+def _hazard_phrases() -> Dict[Tuple[str, ...], Set[str]]:
+    """Map keyword token tuples to the hazard types they indicate."""
+    phrases: Dict[Tuple[str, ...], Set[str]] = defaultdict(set)
+    for hazard, keywords in HAZARD_KEYWORDS.items():
+        for keyword in keywords:
+            phrases[tuple(normalize(keyword))].add(hazard)
+    return phrases
+
+
+_HAZARD_PHRASES = _hazard_phrases()
+_MAX_PHRASE_LEN = max(len(phrase) for phrase in _HAZARD_PHRASES)
+
+
+def hazard_terms(text: str) -> Set[str]:
+    """Find hazard keywords in text."""
+    tokens = normalize(text)
+    found = set()
+    for start in range(len(tokens)):
+        for length in range(1, _MAX_PHRASE_LEN + 1):
+            hazards = _HAZARD_PHRASES.get(tuple(tokens[start:start + length]))
+            if hazards:
+                found.update(f"hazard:{hazard}" for hazard in hazards)
+    return found
+
+
+def location_terms(*locations: Optional[str]) -> Set[str]:
+    """Turn location strings into location tokens."""
+    terms = set()
+    for location in locations:
+        if location:
+            terms.update(f"loc:{token}" for token in normalize(location) if token not in LOCATION_STOPWORDS)
+    return terms
+
+
+def tag_terms(hashtags: Iterable[str], *texts: str) -> Set[str]:
+    """Normalize hashtags listed on a document or written in its text."""
+    tags = set(hashtags)
+    for text in texts:
+        tags.update(_HASHTAG_RE.findall(text))
+    return {f"tag:{tag.lstrip('#').lower()}" for tag in tags if tag.lstrip("#")}
+
+
+def report_terms(report_data: dict) -> Set[str]:
+    """Extract correlation terms from a stored report."""
+    hazard_type = str(getattr(report_data["type"], "value", report_data["type"]))
+    return (
+        tag_terms([], report_data["title"], report_data["description"])
+        | location_terms(report_data["location"], report_data.get("district"))
+        | hazard_terms(f"{report_data['title']} {report_data['description']}")
+        | {f"hazard:{hazard_type}"}
+    )
+
+
+def post_terms(post_data: dict) -> Set[str]:
+    """Extract correlation terms from a stored social post."""
+    return (
+        tag_terms(post_data.get("hashtags", []), post_data["content"])
+        | location_terms(post_data["location"], post_data.get("district"))
+        | hazard_terms(post_data["content"])
+    )
+
+
+def score_terms(terms: Iterable[str]) -> float:
+    """Score a set of shared terms."""
+    kinds = [term.split(":", 1)[0] for term in terms]
+    if all(kind == "loc" for kind in kinds):
+        return 0.0
+    return sum(TERM_WEIGHTS[kind] for kind in kinds)
+
+
+def probe_terms(terms: Iterable[str]) -> List[str]:
+    """Get the terms worth querying on; location tokens alone never relate two items."""
+    return sorted(term for term in terms if not term.startswith("loc:"))
+
+
+def rank_candidates(terms: Set[str], candidates: Iterable[Tuple[str, Iterable[str]]], limit: int = MAX_RELATED) -> List[Tuple[str, float]]:
+    """Get (id, score) of the best candidates sharing enough terms."""
+    scored = [(item_id, score_terms(terms.intersection(item_terms))) for item_id, item_terms in candidates]
+    scored = [(item_id, score) for item_id, score in scored if score >= MIN_SCORE]
+    scored.sort(key=lambda pair: pair[1], reverse=True)
+    return scored[:limit]
+
+
+class CorrelationEngine:
+    """Links reports and posts at ingest and stores the links on both."""
+
+    def __init__(self, window_hours: int = CORRELATION_WINDOW_HOURS):
+        self.window_hours = window_hours
+
+    async def load(self, now: Optional[datetime] = None) -> int:
+        """Store terms on the reports and posts inside the window that lack them."""
+        now = now or datetime.utcnow()
+        since = now - timedelta(hours=self.window_hours)
+        missing = {"timestamp": {"$gte": since}, TERMS_FIELD: {"$exists": False}}
+        loaded = 0
+        for report_data in await user_reports_crud.get_all(limit=0, filters=missing):
+            await user_reports_crud.collection.update_one(
+                {"_id": ObjectId(report_data["_id"])},
+                {"$set": {TERMS_FIELD: sorted(report_terms(report_data))}}
+            )
+            loaded += 1
+        for day in await social_posts_crud.get_bucket_days(since=since):
+            bucket = social_posts_crud.get_bucket(day)
+            async for post_data in bucket.find(missing):
+                await bucket.update_one({"_id": post_data["_id"]}, {"$set": {TERMS_FIELD: sorted(post_terms(post_data))}})
+                loaded += 1
+        return loaded
+
+    async def _report_candidates(self, terms: List[str], since: datetime, until: datetime) -> List[Tuple[str, List[str]]]:
+        cursor = user_reports_crud.collection.find(
+            {TERMS_FIELD: {"$in": terms}, "timestamp": {"$gte": since, "$lte": until}},
+            {TERMS_FIELD: 1}
+        ).sort("timestamp", -1).limit(MAX_CANDIDATES)
+        return [(str(doc["_id"]), doc[TERMS_FIELD]) async for doc in cursor]
+
+    async def _post_candidates(self, terms: List[str], since: datetime, until: datetime) -> List[Tuple[str, List[str]]]:
+        candidates = []
+        for day in await social_posts_crud.get_bucket_days(since=since, until=until):
+            cursor = social_posts_crud.get_bucket(day).find(
+                {TERMS_FIELD: {"$in": terms}, "timestamp": {"$gte": since, "$lte": until}},
+                {TERMS_FIELD: 1}
+            ).sort("timestamp", -1).limit(MAX_CANDIDATES)
+            candidates.extend([(str(doc["_id"]), doc[TERMS_FIELD]) async for doc in cursor])
+        return candidates
+
+    async def _link(self, kind: str, terms: Set[str], timestamp: datetime) -> List[str]:
+        query_terms = probe_terms(terms)
+        if not query_terms:
+            return []
+        window = timedelta(hours=self.window_hours)
+        find_candidates = self._post_candidates if kind == REPORT else self._report_candidates
+        candidates = await find_candidates(query_terms, timestamp - window, timestamp + window)
+        return [related_id for related_id, _ in rank_candidates(terms, candidates)]
+
+    async def correlate_report(self, report_id: str, report_data: dict) -> List[str]:
+        """Link a new report, stored with its terms, to related posts."""
+        terms = set(report_data.get(TERMS_FIELD) or report_terms(report_data))
+        post_ids = await self._link(REPORT, terms, report_data["timestamp"])
+        if post_ids:
+            await user_reports_crud.add_related_posts([report_id], post_ids, MAX_RELATED)
+            await social_posts_crud.add_related_reports(post_ids, [report_id], MAX_RELATED)
+        return post_ids
+
+    async def correlate_post(self, post_id: str, post_data: dict) -> List[str]:
+        """Link a new social post, stored with its terms, to related reports."""
+        terms = set(post_data.get(TERMS_FIELD) or post_terms(post_data))
+        report_ids = await self._link(POST, terms, post_data["timestamp"])
+        if report_ids:
+            await social_posts_crud.add_related_reports([post_id], report_ids, MAX_RELATED)
+            await user_reports_crud.add_related_posts(report_ids, [post_id], MAX_RELATED)
+        return report_ids
+
+
+# Global correlation engine
+correlation_engine = CorrelationEngine()
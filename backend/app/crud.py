@@ -2,22 +2,37 @@
 CRUD operations for OceanEye MongoDB collections.
 """
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 from bson import ObjectId
-from pymongo.errors import DuplicateKeyError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from bson.errors import InvalidBSON
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from app.db import (
     get_user_reports_collection,
-    get_social_posts_collection,
+    get_social_posts_bucket,
+    list_social_bucket_days,
+    ensure_social_bucket_indexes,
+    prune_social_buckets,
     get_trending_hashtags_collection,
-    get_users_collection
+    get_users_collection,
+    get_incidents_collection,
+    secondary_preferred,
+    causal_session
 )
+from app.geocoder import geocode, reverse_geocode
+from app.auth import hash_password, verify_password
+from app.alerts import alert_engine, ALERT_FIELDS, ALERT_HAZARDS
+from app import changes, rollups, schema, tiering
+from app.versions import collection_versions
 from app.models import (
-    UserReportCreate, UserReportUpdate, UserReportResponse,
+    UserReportCreate, UserReportUpdate, UserReportResponse, ReportChangesResponse,
+    BulkModerationItem, BulkModerationItemResult, ModerationUpdate,
     UserCreate, UserResponse,
     SocialPostCreate, SocialPostResponse,
     TrendingHashtagResponse,
+    IncidentResponse,
     CoastalHazardType, SeverityLevel, ReportStatus
 )
 
@@ -25,13 +40,62 @@ from app.models import (
 class CRUDOperations:
     """Base CRUD operations class."""
 
+    # Name under which writes are versioned for conditional GETs
+    collection_name: Optional[str] = None
+
+    # Stamp writes with a change sequence and tombstone deletes for delta sync
+    track_changes: bool = False
+
     def __init__(self, collection: AsyncIOMotorCollection):
         self.collection = collection
 
-    async def create(self, obj_data: dict) -> str:
+    @property
+    def read_collection(self) -> AsyncIOMotorCollection:
+        """Get the collection with reads routed to secondaries, for reads not behind an ETag."""
+        return secondary_preferred(self.collection)
+
+    def encode(self, obj_data: dict) -> dict:
+        """Build the document stored for API fields; the same fields by default."""
+        return obj_data
+
+    def decode(self, document: dict) -> dict:
+        """Turn a stored document back into API fields; unchanged by default."""
+        return document
+
+    def encode_filters(self, filters: dict) -> dict:
+        """Translate a query in API fields to stored fields; unchanged by default."""
+        return filters
+
+    async def touch(self):
+        """Bump the collection version after a write."""
+        if not self.collection_name:
+            return
+        try:
+            await collection_versions.bump(self.collection_name)
+        except Exception as e:
+            print(f"Failed to bump {self.collection_name} version: {e}")
+
+    async def change_stamp(self) -> dict:
+        """Get the change fields for a write, empty when changes aren't tracked."""
+        if not self.track_changes:
+            return {}
+        return await changes.stamp(self.collection_name)
+
+    async def record_deletes(self, obj_ids: List[str]):
+        """Leave tombstones for deleted documents."""
+        if not self.track_changes:
+            return
+        try:
+            await changes.record_tombstones(self.collection_name, obj_ids)
+        except Exception as e:
+            print(f"Failed to record tombstones in {self.collection_name}: {e}")
+
+    async def create(self, obj_data: dict, session=None) -> str:
         """Create a new document."""
         obj_data["created_at"] = datetime.utcnow()
-        result = await self.collection.insert_one(obj_data)
+        obj_data.update(await self.change_stamp())
+        result = await self.collection.insert_one(self.encode(obj_data), session=session)
+        await self.touch()
         return str(result.inserted_id)
 
     async def get_by_id(self, obj_id: str) -> Optional[dict]:
@@ -41,21 +105,29 @@ class CRUDOperations:
         result = await self.collection.find_one({"_id": ObjectId(obj_id)})
         if result:
             result["_id"] = str(result["_id"])
+            result = self.decode(result)
         return result
 
     async def get_all(
         self,
         skip: int = 0,
         limit: int = 100,
-        filters: Optional[dict] = None
+        filters: Optional[dict] = None,
+        secondary: bool = False,
+        session=None
     ) -> List[dict]:
-        """Get all documents with pagination and filters."""
-        query = filters or {}
-        cursor = self.collection.find(query).skip(skip).limit(limit)
+        """Get all documents with pagination and filters.
+
+        With secondary, the read may be served by a secondary; pass a causal
+        session to have it reflect the session's earlier writes.
+        """
+        query = self.encode_filters(filters or {})
+        collection = self.read_collection if secondary else self.collection
+        cursor = collection.find(query, session=session).skip(skip).limit(limit)
         results = []
         async for doc in cursor:
             doc["_id"] = str(doc["_id"])
-            results.append(doc)
+            results.append(self.decode(doc))
         return results
 
     async def update(self, obj_id: str, update_data: dict) -> bool:
@@ -64,10 +136,13 @@ class CRUDOperations:
             return False
 
         update_data["updated_at"] = datetime.utcnow()
+        update_data.update(await self.change_stamp())
         result = await self.collection.update_one(
             {"_id": ObjectId(obj_id)},
             {"$set": update_data}
         )
+        if result.modified_count:
+            await self.touch()
         return result.modified_count > 0
 
     async def delete(self, obj_id: str) -> bool:
@@ -75,16 +150,23 @@ class CRUDOperations:
         if not ObjectId.is_valid(obj_id):
             return False
         result = await self.collection.delete_one({"_id": ObjectId(obj_id)})
+        if result.deleted_count:
+            await self.touch()
+            await self.record_deletes([obj_id])
         return result.deleted_count > 0
 
-    async def count(self, filters: Optional[dict] = None) -> int:
+    async def count(self, filters: Optional[dict] = None, secondary: bool = False) -> int:
         """Count documents matching filters."""
-        query = filters or {}
-        return await self.collection.count_documents(query)
+        query = self.encode_filters(filters or {})
+        collection = self.read_collection if secondary else self.collection
+        return await collection.count_documents(query)
 
 
 class UserReportsCRUD(CRUDOperations):
-    """CRUD operations for user reports."""
+    """CRUD operations for user reports, stored in the compact schema of app.schema."""
+
+    collection_name = "user_reports"
+    track_changes = True
 
     def __init__(self):
         # Don't call super().__init__ here, initialize collection lazily
@@ -98,16 +180,77 @@ class UserReportsCRUD(CRUDOperations):
             raise RuntimeError("Database not connected")
         return coll
 
-    async def create_report(self, report: UserReportCreate) -> str:
-        """Create a new user report."""
+    def encode(self, obj_data: dict) -> dict:
+        """Build the compact document stored for a report."""
+        return schema.encode_report(obj_data)
+
+    def decode(self, document: dict) -> dict:
+        """Turn a stored report of either schema version into API fields."""
+        return schema.decode_report(document)
+
+    def encode_filters(self, filters: dict) -> dict:
+        """Translate a reports query to match both schema versions."""
+        return schema.encode_filters(filters)
+
+    async def create_report(self, report: UserReportCreate, session=None) -> str:
+        """Create a new user report, in a causal session if given."""
         report_data = report.model_dump()
         report_data["status"] = ReportStatus.PENDING
         report_data["timestamp"] = datetime.utcnow()
-        return await self.create(report_data)
+        place = reverse_geocode(*report.coordinates)
+        if place:
+            report_data["district"] = place.district
+            report_data["state"] = place.state
+        from app.correlation import TERMS_FIELD, report_terms
+        report_data[TERMS_FIELD] = sorted(report_terms(report_data))
+        report_id = await self.create(report_data, session=session)
+
+        try:
+            await rollups.record_report(report_data)
+        except Exception as e:
+            print(f"Failed to record rollups for report {report_id}: {e}")
+
+        from app.incidents import incident_clusterer
+        from app.correlation import correlation_engine
+        incident_id = None
+        try:
+            incident_id = await incident_clusterer.assign(report_id, report_data)
+        except Exception as e:
+            # The report is stored either way; it only misses its incident
+            print(f"Failed to cluster report {report_id}: {e}")
+        try:
+            await correlation_engine.correlate_report(report_id, report_data)
+        except Exception as e:
+            print(f"Failed to correlate report {report_id}: {e}")
+        try:
+            await alert_engine.notify_report(report_id, {**report_data, "incident_id": incident_id})
+        except Exception as e:
+            print(f"Failed to send alerts for report {report_id}: {e}")
+        return report_id
+
+    async def get_report(self, report_id: str, causal_token: Optional[str] = None) -> Optional[UserReportResponse]:
+        """Get report by ID.
 
-    async def get_report(self, report_id: str) -> Optional[UserReportResponse]:
-        """Get report by ID."""
-        report_data = await self.get_by_id(report_id)
+        With the causal token of a reporter's write, the read goes to a
+        secondary that has caught up with it; otherwise, or if the token is
+        unusable, it goes to the primary. Archived reports are found too.
+        """
+        report_data = None
+        if causal_token and ObjectId.is_valid(report_id):
+            try:
+                async with causal_session(causal_token) as session:
+                    report_data = await self.read_collection.find_one({"_id": ObjectId(report_id)}, session=session)
+                if report_data:
+                    report_data["_id"] = str(report_data["_id"])
+                    report_data = self.decode(report_data)
+            except (ValueError, KeyError, TypeError, InvalidBSON, PyMongoError) as e:
+                print(f"Causal read of report {report_id} failed, reading from primary: {e}")
+                report_data = None
+        if report_data is None:
+            report_data = await self.get_by_id(report_id)
+        if report_data is None:
+            # Closed reports past retention live in the archive tier
+            report_data = await tiering.get_archived(report_id)
         if report_data:
             return UserReportResponse(**report_data)
         return None
@@ -119,9 +262,35 @@ class UserReportsCRUD(CRUDOperations):
         status: Optional[ReportStatus] = None,
         hazard_type: Optional[CoastalHazardType] = None,
         severity: Optional[SeverityLevel] = None,
-        location: Optional[str] = None
+        location: Optional[str] = None,
+        causal_token: Optional[str] = None
     ) -> List[UserReportResponse]:
-        """Get reports with filters."""
+        """Get reports with filters.
+
+        With a causal token the read goes to a secondary that has caught up
+        with the token's write; otherwise, or if the token is unusable, it
+        goes to the primary, whose collection version the list's ETag carries.
+        """
+        filters = self.build_filters(status, hazard_type, severity, location)
+        reports_data = None
+        if causal_token:
+            try:
+                async with causal_session(causal_token) as session:
+                    reports_data = await self.get_all(skip, limit, filters, secondary=True, session=session)
+            except (ValueError, KeyError, TypeError, InvalidBSON, PyMongoError) as e:
+                print(f"Causal read of reports failed, reading from primary: {e}")
+        if reports_data is None:
+            reports_data = await self.get_all(skip, limit, filters)
+        return [UserReportResponse(**report) for report in reports_data]
+
+    @staticmethod
+    def build_filters(
+        status: Optional[ReportStatus] = None,
+        hazard_type: Optional[CoastalHazardType] = None,
+        severity: Optional[SeverityLevel] = None,
+        location: Optional[str] = None
+    ) -> dict:
+        """Build a reports query from filters."""
         filters = {}
         if status:
             filters["status"] = status
@@ -131,9 +300,7 @@ class UserReportsCRUD(CRUDOperations):
             filters["severity"] = severity
         if location:
             filters["location"] = {"$regex": location, "$options": "i"}
-
-        reports_data = await self.get_all(skip, limit, filters)
-        return [UserReportResponse(**report) for report in reports_data]
+        return filters
 
     async def update_report(self, report_id: str, report_update: UserReportUpdate) -> bool:
         """Update report information."""
@@ -144,10 +311,181 @@ class UserReportsCRUD(CRUDOperations):
         """Update report status."""
         return await self.update(report_id, {"status": status})
 
+    async def update(self, obj_id: str, update_data: dict) -> bool:
+        """Update report by ID and move its rollup counts."""
+        if not ObjectId.is_valid(obj_id):
+            return False
+
+        update_data["updated_at"] = datetime.utcnow()
+        update_data.update(await self.change_stamp())
+        before = await self.collection.find_one_and_update(
+            {"_id": ObjectId(obj_id)},
+            schema.encode_update(update_data),
+            projection=schema.encode_projection(
+                {"timestamp": 1, **{field: 1 for field in (*rollups.DIMENSIONS, *ALERT_FIELDS)}}
+            )
+        )
+        if before is None:
+            return False
+        before = self.decode(before)
+        await self.touch()
+        try:
+            await rollups.record_change(before, update_data)
+        except Exception as e:
+            print(f"Failed to record rollups for report {obj_id}: {e}")
+        try:
+            await alert_engine.notify_change(obj_id, before, {**before, **update_data})
+        except Exception as e:
+            print(f"Failed to send alerts for report {obj_id}: {e}")
+        return True
+
+    async def bulk_moderate(self, items: List[BulkModerationItem]) -> List[BulkModerationItemResult]:
+        """Apply per-report moderation updates with one unordered bulk_write.
+
+        Each update only applies if the report still has the status read just
+        before the write and, when expected_updated_at is given, the same
+        updated_at. Outcomes are read back through a batch marker stamped on
+        the updated reports, which is removed once read.
+        """
+        valid = [item for item in items if ObjectId.is_valid(item.id)]
+        object_ids = [ObjectId(item.id) for item in valid]
+        before = {}
+        async for doc in self.collection.find(
+            {"_id": {"$in": object_ids}},
+            schema.encode_projection({"timestamp": 1, **{field: 1 for field in (*rollups.DIMENSIONS, *ALERT_FIELDS)}})
+        ):
+            before[str(doc["_id"])] = self.decode(doc)
+
+        batch_id = str(ObjectId())
+        now = datetime.utcnow()
+        found = [item for item in valid if item.id in before]
+        if found:
+            async with changes.hold(self.collection_name, len(found)) as first_seq:
+                operations = []
+                for seq, item in enumerate(found, start=first_seq):
+                    update_data = item.model_dump(include={"status", "verified"}, exclude_none=True)
+                    update_data.update({
+                        "updated_at": now,
+                        "moderation_batch": batch_id,
+                        "change_seq": seq,
+                        "changed_at": now
+                    })
+                    query = {"_id": ObjectId(item.id), **self.encode_filters({"status": before[item.id].get("status")})}
+                    if "expected_updated_at" in item.model_fields_set:
+                        query["updated_at"] = item.expected_updated_at
+                    operations.append(UpdateOne(query, schema.encode_update(update_data)))
+                await self.collection.bulk_write(operations, ordered=False)
+
+        applied = set()
+        async for doc in self.collection.find(
+            {"_id": {"$in": object_ids}, "moderation_batch": batch_id},
+            {"_id": 1}
+        ):
+            applied.add(str(doc["_id"]))
+        if applied:
+            # The marker is only needed for the read-back above
+            await self.collection.update_many({"moderation_batch": batch_id}, {"$unset": {"moderation_batch": ""}})
+            await self.touch()
+
+        results = []
+        for item in items:
+            if not ObjectId.is_valid(item.id):
+                result = "invalid"
+            elif item.id not in before:
+                result = "not_found"
+            elif item.id in applied:
+                result = "updated"
+            else:
+                result = "conflict"
+            results.append(BulkModerationItemResult(id=item.id, result=result))
+
+        try:
+            await rollups.record_changes([
+                (before[item.id], item.model_dump(include={"status"}, exclude_none=True))
+                for item in valid if item.id in applied
+            ])
+        except Exception as e:
+            print(f"Failed to record rollups for bulk moderation: {e}")
+        for item in valid:
+            if item.id not in applied:
+                continue
+            after = {**before[item.id], **item.model_dump(include={"status", "verified"}, exclude_none=True)}
+            try:
+                await alert_engine.notify_change(item.id, before[item.id], after)
+            except Exception as e:
+                print(f"Failed to send alerts for report {item.id}: {e}")
+        return results
+
+    async def moderate_by_filter(self, filters: dict, update: ModerationUpdate) -> Dict[str, int]:
+        """Apply one moderation update to every report matching filters, server-side."""
+        update_data = update.model_dump(exclude_none=True)
+        if not update_data:
+            return {"matched": 0, "modified": 0}
+        filters = self.encode_filters(filters)
+        rollup_updates, grouped = None, None
+        try:
+            rollup_updates, grouped = await rollups.plan_bulk_change(self.collection, filters, update_data)
+        except Exception as e:
+            print(f"Failed to plan rollups for bulk moderation: {e}")
+        # Verifying tsunami and storm surge reports alerts their areas
+        alert_candidates = []
+        if update_data.get("verified") or update_data.get("status") == ReportStatus.VERIFIED:
+            alert_candidates = [self.decode(doc) for doc in await self.collection.find(
+                {"$and": [filters, self.encode_filters({"type": {"$in": list(ALERT_HAZARDS)}})]},
+                schema.encode_projection({field: 1 for field in ALERT_FIELDS})
+            ).to_list(length=None)]
+        moderation = dict(update_data)
+        update_data["updated_at"] = datetime.utcnow()
+        # Reports are stamped as update_many reaches them, so the change stays
+        # unsettled until it returns rather than for the settle window only
+        async with changes.hold(self.collection_name) as seq:
+            update_data.update({"change_seq": seq, "changed_at": datetime.utcnow()})
+            result = await self.collection.update_many(filters, schema.encode_update(update_data))
+        if result.modified_count:
+            await self.touch()
+        if rollup_updates is not None:
+            # Counts only move once the reports have, so a failed update leaves them right
+            if grouped is not None and result.matched_count != grouped:
+                print(
+                    f"⚠️  Bulk moderation matched {result.matched_count} reports but {grouped} were counted; "
+                    f"rollups may be off until python -m app.rollups backfill"
+                )
+            try:
+                await rollups.record_bulk_change(rollup_updates)
+            except Exception as e:
+                print(f"Failed to record rollups for bulk moderation: {e}")
+        for doc in alert_candidates:
+            try:
+                await alert_engine.notify_change(str(doc["_id"]), doc, {**doc, **moderation})
+            except Exception as e:
+                print(f"Failed to send alerts for report {doc['_id']}: {e}")
+        return {"matched": result.matched_count, "modified": result.modified_count}
+
     async def delete_report(self, report_id: str) -> bool:
         """Delete report by ID."""
         return await self.delete(report_id)
 
+    async def delete(self, obj_id: str) -> bool:
+        """Delete report by ID and remove it from the rollups."""
+        if not ObjectId.is_valid(obj_id):
+            return False
+        deleted = await self.collection.find_one_and_delete(
+            {"_id": ObjectId(obj_id)},
+            projection=schema.encode_projection(
+                {"timestamp": 1, **{dimension: 1 for dimension in rollups.DIMENSIONS}}
+            )
+        )
+        if deleted is None:
+            return False
+        deleted = self.decode(deleted)
+        await self.touch()
+        await self.record_deletes([obj_id])
+        try:
+            await rollups.record_report(deleted, sign=-1)
+        except Exception as e:
+            print(f"Failed to record rollups for report {obj_id}: {e}")
+        return True
+
     async def get_reports_by_location(self, location: str) -> List[UserReportResponse]:
         """Get reports by location."""
         filters = {"location": {"$regex": location, "$options": "i"}}
@@ -172,26 +510,164 @@ class UserReportsCRUD(CRUDOperations):
         reports_data = await self.get_all(filters=filters)
         return [UserReportResponse(**report) for report in reports_data]
 
+    async def get_reports_by_ids(self, report_ids: List[str]) -> List[UserReportResponse]:
+        """Get reports by ID, in the order given."""
+        object_ids = [ObjectId(report_id) for report_id in report_ids if ObjectId.is_valid(report_id)]
+        reports_data = await self.get_all(limit=0, filters={"_id": {"$in": object_ids}})
+        by_id = {report["_id"]: report for report in reports_data}
+        return [UserReportResponse(**by_id[report_id]) for report_id in report_ids if report_id in by_id]
+
+    async def get_changes(self, since: Optional[str] = None, limit: int = 500) -> ReportChangesResponse:
+        """Get reports created, updated or deleted after a change token."""
+        result = await changes.read_changes(self.collection, self.collection_name, since, limit)
+        for report in result["documents"]:
+            report["_id"] = str(report["_id"])
+            self.decode(report)
+        return ReportChangesResponse(
+            changed=[UserReportResponse(**report) for report in result.pop("documents")],
+            **result
+        )
+
+    async def add_related_posts(self, report_ids: List[str], post_ids: List[str], max_related: int) -> int:
+        """Append related post IDs to reports, keeping the newest max_related."""
+        object_ids = [ObjectId(report_id) for report_id in report_ids if ObjectId.is_valid(report_id)]
+        result = await self.collection.update_many(
+            {"_id": {"$in": object_ids}},
+            {"$push": {"related_post_ids": {"$each": post_ids, "$slice": -max_related}}}
+        )
+        return result.modified_count
+
+    async def get_related_post_ids(self, report_id: str) -> Optional[List[str]]:
+        """Get the related post IDs stored on a report, or None if it doesn't exist."""
+        if not ObjectId.is_valid(report_id):
+            return None
+        result = await self.collection.find_one({"_id": ObjectId(report_id)}, {"related_post_ids": 1})
+        if result is None:
+            return None
+        return result.get("related_post_ids", [])
+
+    async def set_incident(self, report_id: str, incident_id: str) -> bool:
+        """Attach a report to an incident."""
+        if not ObjectId.is_valid(report_id):
+            return False
+        result = await self.collection.update_one(
+            {"_id": ObjectId(report_id)},
+            {"$set": {"incident_id": incident_id, **(await self.change_stamp())}}
+        )
+        if result.modified_count:
+            await self.touch()
+        return result.modified_count > 0
+
+    async def move_incident_reports(self, from_incident_id: str, to_incident_id: str) -> int:
+        """Move all reports of one incident to another."""
+        result = await self.collection.update_many(
+            {"incident_id": from_incident_id},
+            {"$set": {"incident_id": to_incident_id, **(await self.change_stamp())}}
+        )
+        if result.modified_count:
+            await self.touch()
+        return result.modified_count
+
 
 class SocialPostsCRUD(CRUDOperations):
-    """CRUD operations for social posts."""
+    """CRUD operations for social posts, stored in daily bucket collections."""
+
+    collection_name = "social_posts"
 
     def __init__(self):
         pass
 
     @property
     def collection(self):
-        """Get collection with lazy initialization."""
-        coll = get_social_posts_collection()
+        """Get the bucket collection that receives today's posts."""
+        return self.get_bucket(datetime.utcnow().date())
+
+    def get_bucket(self, day: date) -> AsyncIOMotorCollection:
+        """Get the bucket collection for a UTC day."""
+        coll = get_social_posts_bucket(day)
         if coll is None:
             raise RuntimeError("Database not connected")
         return coll
 
+    async def get_bucket_days(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[date]:
+        """Get existing bucket days overlapping a time range, newest first."""
+        days = await list_social_bucket_days()
+        return [
+            day for day in days
+            if (since is None or day >= since.date())
+            and (until is None or day <= until.date())
+        ]
+
+    @staticmethod
+    def build_filters(
+        platform: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        location: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> dict:
+        """Build a bucket query from post filters."""
+        filters = {}
+        if platform:
+            filters["platform"] = platform
+        if sentiment:
+            filters["sentiment"] = sentiment
+        if since or until:
+            filters["timestamp"] = {}
+            if since:
+                filters["timestamp"]["$gte"] = since
+            if until:
+                filters["timestamp"]["$lte"] = until
+        if location:
+            filters["location"] = {"$regex": location, "$options": "i"}
+        return filters
+
+    async def create(self, obj_data: dict, session=None) -> str:
+        """Create a post in the bucket of the UTC day its ID was generated, where get_by_id looks."""
+        object_id = obj_data.setdefault("_id", ObjectId())
+        obj_data["created_at"] = datetime.utcnow()
+        result = await self.get_bucket(object_id.generation_time.date()).insert_one(self.encode(obj_data), session=session)
+        await self.touch()
+        return str(result.inserted_id)
+
     async def create_post(self, post: SocialPostCreate) -> str:
-        """Create a new social post."""
+        """Create a new social post in today's bucket."""
         post_data = post.model_dump()
-        post_data["timestamp"] = datetime.utcnow()
-        return await self.create(post_data)
+        # Bucket, timestamp and ID all come from the ID's time, so they agree on the day
+        object_id = ObjectId()
+        post_data["_id"] = object_id
+        post_data["timestamp"] = object_id.generation_time.replace(tzinfo=None)
+        place = geocode(post.location)
+        if place:
+            post_data["coordinates"] = place.coordinates
+            post_data["district"] = place.district
+            post_data["state"] = place.state
+        if await ensure_social_bucket_indexes(self.get_bucket(post_data["timestamp"].date())):
+            # First write of a new day, expire the buckets that fell out of retention
+            await prune_social_buckets()
+        from app.correlation import TERMS_FIELD, correlation_engine, post_terms
+        post_data[TERMS_FIELD] = sorted(post_terms(post_data))
+        post_id = await self.create(post_data)
+
+        try:
+            await correlation_engine.correlate_post(post_id, post_data)
+        except Exception as e:
+            print(f"Failed to correlate post {post_id}: {e}")
+        return post_id
+
+    async def get_by_id(self, obj_id: str) -> Optional[dict]:
+        """Get post by ID from the bucket of the day it was created."""
+        if not ObjectId.is_valid(obj_id):
+            return None
+        oid = ObjectId(obj_id)
+        result = await self.get_bucket(oid.generation_time.date()).find_one({"_id": oid})
+        if result:
+            result["_id"] = str(result["_id"])
+        return result
 
     async def get_post(self, post_id: str) -> Optional[SocialPostResponse]:
         """Get post by ID."""
@@ -200,30 +676,97 @@ class SocialPostsCRUD(CRUDOperations):
             return SocialPostResponse(**post_data)
         return None
 
+    async def get_posts_by_ids(self, post_ids: List[str]) -> List[SocialPostResponse]:
+        """Get posts by ID, in the order given, with one query per bucket."""
+        ids_by_day: Dict[date, List[ObjectId]] = {}
+        for post_id in post_ids:
+            if ObjectId.is_valid(post_id):
+                oid = ObjectId(post_id)
+                ids_by_day.setdefault(oid.generation_time.date(), []).append(oid)
+        by_id = {}
+        for day, object_ids in ids_by_day.items():
+            async for doc in self.get_bucket(day).find({"_id": {"$in": object_ids}}):
+                doc["_id"] = str(doc["_id"])
+                by_id[doc["_id"]] = doc
+        return [SocialPostResponse(**by_id[post_id]) for post_id in post_ids if post_id in by_id]
+
+    async def add_related_reports(self, post_ids: List[str], report_ids: List[str], max_related: int) -> int:
+        """Append related report IDs to posts, keeping the newest max_related."""
+        ids_by_day: Dict[date, List[ObjectId]] = {}
+        for post_id in post_ids:
+            if ObjectId.is_valid(post_id):
+                oid = ObjectId(post_id)
+                ids_by_day.setdefault(oid.generation_time.date(), []).append(oid)
+        modified = 0
+        for day, object_ids in ids_by_day.items():
+            result = await self.get_bucket(day).update_many(
+                {"_id": {"$in": object_ids}},
+                {"$push": {"related_report_ids": {"$each": report_ids, "$slice": -max_related}}}
+            )
+            modified += result.modified_count
+        return modified
+
+    async def get_related_report_ids(self, post_id: str) -> Optional[List[str]]:
+        """Get the related report IDs stored on a post, or None if it doesn't exist."""
+        if not ObjectId.is_valid(post_id):
+            return None
+        oid = ObjectId(post_id)
+        result = await self.get_bucket(oid.generation_time.date()).find_one({"_id": oid}, {"related_report_ids": 1})
+        if result is None:
+            return None
+        return result.get("related_report_ids", [])
+
     async def get_posts(
         self,
         skip: int = 0,
         limit: int = 100,
         platform: Optional[str] = None,
         sentiment: Optional[str] = None,
-        location: Optional[str] = None
+        location: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
     ) -> List[SocialPostResponse]:
-        """Get posts with filters."""
-        filters = {}
-        if platform:
-            filters["platform"] = platform
-        if sentiment:
-            filters["sentiment"] = sentiment
-        if location:
-            filters["location"] = {"$regex": location, "$options": "i"}
-
-        posts_data = await self.get_all(skip, limit, filters)
+        """Get posts with filters, newest first, reading only buckets in range."""
+        filters = self.build_filters(platform, sentiment, location, since, until)
+        posts_data = []
+        for day in await self.get_bucket_days(since, until):
+            bucket = self.get_bucket(day)
+            if skip:
+                # Skip whole buckets using the indexed count instead of scanning them
+                bucket_count = await bucket.count_documents(filters)
+                if bucket_count <= skip:
+                    skip -= bucket_count
+                    continue
+            cursor = bucket.find(filters).sort("timestamp", -1).skip(skip).limit(limit - len(posts_data))
+            skip = 0
+            async for doc in cursor:
+                doc["_id"] = str(doc["_id"])
+                posts_data.append(doc)
+            if len(posts_data) >= limit:
+                break
         return [SocialPostResponse(**post) for post in posts_data]
 
+    async def count_posts(
+        self,
+        platform: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        location: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> int:
+        """Count posts matching filters across the buckets in range."""
+        filters = self.build_filters(platform, sentiment, location, since, until)
+        total = 0
+        for day in await self.get_bucket_days(since, until):
+            total += await self.get_bucket(day).count_documents(filters)
+        return total
+
 
 class TrendingHashtagsCRUD(CRUDOperations):
     """CRUD operations for trending hashtags."""
 
+    collection_name = "trending_hashtags"
+
     def __init__(self):
         pass
 
@@ -246,6 +789,192 @@ class TrendingHashtagsCRUD(CRUDOperations):
         return [TrendingHashtagResponse(**hashtag) for hashtag in hashtags_data]
 
 
+# Severity levels from least to most severe, indexed by stored severity_rank
+SEVERITY_ORDER = [SeverityLevel.LOW, SeverityLevel.MEDIUM, SeverityLevel.HIGH, SeverityLevel.CRITICAL]
+
+
+class IncidentsCRUD(CRUDOperations):
+    """CRUD operations for incidents clustered from user reports."""
+
+    collection_name = "incidents"
+
+    def __init__(self):
+        pass
+
+    @property
+    def collection(self):
+        """Get collection with lazy initialization."""
+        coll = get_incidents_collection()
+        if coll is None:
+            raise RuntimeError("Database not connected")
+        return coll
+
+    @staticmethod
+    def to_response(incident_data: dict) -> IncidentResponse:
+        """Build the API model from a stored incident."""
+        incident_data["max_severity"] = SEVERITY_ORDER[incident_data.get("severity_rank", 0)]
+        return IncidentResponse(**incident_data)
+
+    async def create_incident(self, report_data: dict, incident_id: Optional[str] = None) -> str:
+        """Create an incident seeded with its first report, under a given ID if any."""
+        lat, lng = report_data["coordinates"]
+        severity = SeverityLevel(report_data["severity"])
+        incident_data = {
+            "type": report_data["type"],
+            "coordinates": [lat, lng],
+            "lat_sum": lat,
+            "lng_sum": lng,
+            "location": report_data["location"],
+            "district": report_data.get("district"),
+            "state": report_data.get("state"),
+            "report_count": 1,
+            "severity_counts": {severity.value: 1},
+            "severity_rank": SEVERITY_ORDER.index(severity),
+            "first_seen": report_data["timestamp"],
+            "last_seen": report_data["timestamp"]
+        }
+        if incident_id:
+            incident_data["_id"] = ObjectId(incident_id)
+        return await self.create(incident_data)
+
+    @staticmethod
+    def _fold_pipeline(
+        count: int,
+        lat_sum: float,
+        lng_sum: float,
+        severity_counts: Dict[str, int],
+        severity_rank: int,
+        first_seen: datetime,
+        last_seen: datetime
+    ) -> List[dict]:
+        """Build the update pipeline adding aggregates to an incident.
+
+        The centroid is recomputed from the stored sums in the same update,
+        so workers adding reports concurrently always leave it consistent.
+        """
+        return [
+            {"$set": {
+                "report_count": {"$add": ["$report_count", count]},
+                "lat_sum": {"$add": ["$lat_sum", lat_sum]},
+                "lng_sum": {"$add": ["$lng_sum", lng_sum]},
+                **{
+                    f"severity_counts.{level}": {"$add": [{"$ifNull": [f"$severity_counts.{level}", 0]}, n]}
+                    for level, n in severity_counts.items()
+                },
+                "severity_rank": {"$max": ["$severity_rank", severity_rank]},
+                "first_seen": {"$min": ["$first_seen", first_seen]},
+                "last_seen": {"$max": ["$last_seen", last_seen]},
+                "updated_at": datetime.utcnow()
+            }},
+            {"$set": {
+                "coordinates": [
+                    {"$divide": ["$lat_sum", "$report_count"]},
+                    {"$divide": ["$lng_sum", "$report_count"]}
+                ]
+            }}
+        ]
+
+    async def add_report(self, incident_id: str, report_data: dict) -> Optional[dict]:
+        """Fold one more report into an incident's aggregates.
+
+        Returns the updated incident, or None if it no longer exists (e.g.
+        another worker merged it away).
+        """
+        lat, lng = report_data["coordinates"]
+        severity = SeverityLevel(report_data["severity"])
+        result = await self.collection.find_one_and_update(
+            {"_id": ObjectId(incident_id)},
+            self._fold_pipeline(
+                1, lat, lng, {severity.value: 1}, SEVERITY_ORDER.index(severity),
+                report_data["timestamp"], report_data["timestamp"]
+            ),
+            return_document=ReturnDocument.AFTER
+        )
+        if result is not None:
+            await self.touch()
+        return result
+
+    async def merge_incidents(self, source_id: str, target_id: str) -> bool:
+        """Fold the aggregates of one incident into another and delete it.
+
+        Returns False, leaving both as they are, if either no longer exists.
+        The source is claimed by deleting it first, so two workers can't both
+        fold it into their incidents.
+        """
+        source = await self.collection.find_one_and_delete({"_id": ObjectId(source_id)})
+        if source is None:
+            return False
+        target = await self.collection.find_one_and_update(
+            {"_id": ObjectId(target_id)},
+            self._fold_pipeline(
+                source["report_count"], source["lat_sum"], source["lng_sum"], source["severity_counts"],
+                source["severity_rank"], source["first_seen"], source["last_seen"]
+            )
+        )
+        if target is None:
+            # The target was merged away meanwhile; put the source back
+            await self.collection.insert_one(source)
+            return False
+        await self.touch()
+        return True
+
+    async def find_recent(
+        self,
+        hazard_type: str,
+        since: datetime,
+        lat_range: List[float],
+        lng_range: List[float]
+    ) -> List[dict]:
+        """Get incidents of a type seen since a time inside a bounding box."""
+        filters = {
+            "type": hazard_type,
+            "last_seen": {"$gte": since},
+            "coordinates.0": {"$gte": lat_range[0], "$lte": lat_range[1]},
+            "coordinates.1": {"$gte": lng_range[0], "$lte": lng_range[1]}
+        }
+        return await self.get_all(limit=0, filters=filters)
+
+    async def get_incident(self, incident_id: str) -> Optional[IncidentResponse]:
+        """Get incident by ID."""
+        incident_data = await self.get_by_id(incident_id)
+        if incident_data:
+            return self.to_response(incident_data)
+        return None
+
+    async def get_incidents(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        hazard_type: Optional[CoastalHazardType] = None,
+        min_severity: Optional[SeverityLevel] = None,
+        since: Optional[datetime] = None
+    ) -> List[IncidentResponse]:
+        """Get incidents with filters, most recently active first."""
+        filters = self.build_filters(hazard_type, min_severity, since)
+        cursor = self.read_collection.find(filters).sort("last_seen", -1).skip(skip).limit(limit)
+        incidents = []
+        async for doc in cursor:
+            doc["_id"] = str(doc["_id"])
+            incidents.append(self.to_response(doc))
+        return incidents
+
+    @staticmethod
+    def build_filters(
+        hazard_type: Optional[CoastalHazardType] = None,
+        min_severity: Optional[SeverityLevel] = None,
+        since: Optional[datetime] = None
+    ) -> dict:
+        """Build an incidents query from filters."""
+        filters = {}
+        if hazard_type:
+            filters["type"] = hazard_type
+        if min_severity:
+            filters["severity_rank"] = {"$gte": SEVERITY_ORDER.index(min_severity)}
+        if since:
+            filters["last_seen"] = {"$gte": since}
+        return filters
+
+
 class UserCRUD(CRUDOperations):
     """CRUD operations for users."""
 
@@ -264,7 +993,7 @@ class UserCRUD(CRUDOperations):
     async def create_user(self, user: UserCreate) -> str:
         """Create a new user."""
         user_data = user.model_dump()
-        # In a real app, hash the password here
+        user_data["password_hash"] = await hash_password(user_data.pop("password"))
         user_data["is_active"] = True
         try:
             return await self.create(user_data)
@@ -286,6 +1015,15 @@ class UserCRUD(CRUDOperations):
             return UserResponse(**user_data)
         return None
 
+    async def authenticate(self, username: str, password: str) -> Optional[UserResponse]:
+        """Get an active user by username and password."""
+        user_data = await self.collection.find_one({"username": username})
+        password_hash = user_data.get("password_hash") if user_data else None
+        if not await verify_password(password, password_hash) or not user_data.get("is_active", True):
+            return None
+        user_data["_id"] = str(user_data["_id"])
+        return UserResponse(**user_data)
+
     async def get_users(self, skip: int = 0, limit: int = 100) -> List[UserResponse]:
         """Get all users."""
         users_data = await self.get_all(skip, limit)
@@ -296,18 +1034,19 @@ class UserCRUD(CRUDOperations):
 user_reports_crud = UserReportsCRUD()
 social_posts_crud = SocialPostsCRUD()
 trending_hashtags_crud = TrendingHashtagsCRUD()
+incidents_crud = IncidentsCRUD()
 user_crud = UserCRUD()
 
 
 # Convenience functions
-async def create_user_report(report: UserReportCreate) -> str:
+async def create_user_report(report: UserReportCreate, session=None) -> str:
     """Create a new user report."""
-    return await user_reports_crud.create_report(report)
+    return await user_reports_crud.create_report(report, session)
 
 
-async def get_user_report(report_id: str) -> Optional[UserReportResponse]:
+async def get_user_report(report_id: str, causal_token: Optional[str] = None) -> Optional[UserReportResponse]:
     """Get user report by ID."""
-    return await user_reports_crud.get_report(report_id)
+    return await user_reports_crud.get_report(report_id, causal_token)
 
 
 async def get_user_reports(
@@ -316,10 +1055,11 @@ async def get_user_reports(
     status: Optional[ReportStatus] = None,
     hazard_type: Optional[CoastalHazardType] = None,
     severity: Optional[SeverityLevel] = None,
-    location: Optional[str] = None
+    location: Optional[str] = None,
+    causal_token: Optional[str] = None
 ) -> List[UserReportResponse]:
     """Get user reports with filters."""
-    return await user_reports_crud.get_reports(skip, limit, status, hazard_type, severity, location)
+    return await user_reports_crud.get_reports(skip, limit, status, hazard_type, severity, location, causal_token)
 
 
 async def update_user_report(report_id: str, report_update: UserReportUpdate) -> bool:
@@ -1,8 +1,15 @@
 """
 Database connection and configuration for OceanEye MongoDB integration.
 """
+import asyncio
+import base64
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.read_preferences import SecondaryPreferred
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,6 +19,22 @@ load_dotenv()
 MONGO_DETAILS = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "oceaneye_db")
 
+# Connection pool bounds per worker process; the minimum is kept open and
+# opened at startup so the first requests don't pay for connection setup
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+
+# Export, incident and rollup reads go to replica set secondaries lagging the
+# primary by at most this many seconds (MongoDB's minimum is 90); 0 keeps
+# every read on the primary. Reads behind an ETag stay on the primary, since
+# the ETag carries the primary's collection version. A standalone server
+# serves all reads itself.
+MONGO_READ_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_READ_MAX_STALENESS_SECONDS", "90"))
+
+# Social posts are stored in one collection per UTC day ("social_posts_YYYYMMDD")
+SOCIAL_BUCKET_PREFIX = "social_posts_"
+SOCIAL_RETENTION_DAYS = int(os.getenv("SOCIAL_RETENTION_DAYS", "30"))
+
 # Global variables for database connection
 client: AsyncIOMotorClient = None
 database = None
@@ -21,11 +44,16 @@ user_reports_collection = None
 social_posts_collection = None
 trending_hashtags_collection = None
 users_collection = None
+incidents_collection = None
+
+# Daily social buckets whose indexes have already been ensured
+_indexed_social_buckets = set()
 
 
 async def connect_to_mongo():
     """Create database connection on startup."""
     global client, database, user_reports_collection, social_posts_collection, trending_hashtags_collection, users_collection
+    global incidents_collection
 
     try:
         # Add timeout to avoid hanging
@@ -33,7 +61,9 @@ async def connect_to_mongo():
             MONGO_DETAILS,
             serverSelectionTimeoutMS=5000,  # 5 second timeout
             connectTimeoutMS=5000,
-            socketTimeoutMS=5000
+            socketTimeoutMS=5000,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE
         )
         database = client[DATABASE_NAME]
 
@@ -42,6 +72,7 @@ async def connect_to_mongo():
         social_posts_collection = database.get_collection("social_posts")
         trending_hashtags_collection = database.get_collection("trending_hashtags")
         users_collection = database.get_collection("users")
+        incidents_collection = database.get_collection("incidents")
 
         # Test the connection with timeout
         await client.admin.command('ping')
@@ -57,6 +88,75 @@ async def connect_to_mongo():
         social_posts_collection = None
         trending_hashtags_collection = None
         users_collection = None
+        incidents_collection = None
+
+
+async def create_indexes():
+    """Create the indexes used by the API's queries."""
+    if database is None:
+        return
+    await user_reports_collection.create_index([("incident_id", 1)])
+    await user_reports_collection.create_index([("correlation_terms", 1), ("timestamp", -1)])
+    # Compact reports keep [longitude, latitude] in a GeoJSON point; the
+    # coordinates index serves reports not yet migrated
+    await user_reports_collection.create_index([("point.coordinates.1", 1), ("point.coordinates.0", 1)])
+    await user_reports_collection.create_index([("coordinates.0", 1), ("coordinates.1", 1)])
+    await incidents_collection.create_index([("type", 1), ("last_seen", -1)])
+    await incidents_collection.create_index([("last_seen", -1)])
+    await users_collection.create_index([("username", 1)], unique=True)
+    await users_collection.create_index([("email", 1)], unique=True)
+
+
+async def prewarm_pool(connections: int = MONGO_MIN_POOL_SIZE):
+    """Open pooled connections up front with concurrent pings."""
+    if client is None or connections <= 0:
+        return
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(connections)))
+
+
+def secondary_preferred(collection: Optional[AsyncIOMotorCollection]) -> Optional[AsyncIOMotorCollection]:
+    """Route a collection's reads to secondaries within the staleness bound."""
+    if collection is None or MONGO_READ_MAX_STALENESS_SECONDS <= 0:
+        return collection
+    return collection.with_options(
+        read_preference=SecondaryPreferred(max_staleness=MONGO_READ_MAX_STALENESS_SECONDS)
+    )
+
+
+@asynccontextmanager
+async def causal_session(token: Optional[str] = None):
+    """Open a causally consistent session, continuing after a causal token.
+
+    Reads in the session, including reads from secondaries, see every write
+    the token was issued after. Yields None without a database; raises
+    ValueError (or InvalidBSON) for a malformed token.
+    """
+    if client is None:
+        yield None
+        return
+    times = None
+    if token:
+        times = bson.decode(base64.urlsafe_b64decode(token))
+        if not isinstance(times.get("clusterTime"), dict) or not isinstance(times.get("operationTime"), bson.Timestamp):
+            raise ValueError("Malformed causal token")
+    async with await client.start_session(causal_consistency=True) as session:
+        if times:
+            session.advance_cluster_time(times["clusterTime"])
+            session.advance_operation_time(times["operationTime"])
+        yield session
+
+
+def causal_token(session) -> Optional[str]:
+    """Encode a session's operation and cluster time as an opaque token.
+
+    Returns None on a standalone server, which has no cluster time.
+    """
+    if session is None or session.operation_time is None or session.cluster_time is None:
+        return None
+    return base64.urlsafe_b64encode(bson.encode({
+        "operationTime": session.operation_time,
+        "clusterTime": session.cluster_time
+    })).decode()
 
 
 async def close_mongo_connection():
@@ -89,4 +189,71 @@ def get_trending_hashtags_collection():
 
 def get_users_collection():
     """Get the users collection."""
-    return users_collection
\ No newline at end of file
+    return users_collection
+
+
+def get_incidents_collection():
+    """Get the incidents collection."""
+    return incidents_collection
+
+
+def social_bucket_name(day: date) -> str:
+    """Get the collection name of the social posts bucket for a UTC day."""
+    return f"{SOCIAL_BUCKET_PREFIX}{day:%Y%m%d}"
+
+
+def social_bucket_day(name: str) -> date:
+    """Get the UTC day stored in a social posts bucket collection name."""
+    return datetime.strptime(name[len(SOCIAL_BUCKET_PREFIX):], "%Y%m%d").date()
+
+
+def get_social_posts_bucket(day: date):
+    """Get the social posts bucket collection for a UTC day."""
+    if database is None:
+        return None
+    return database.get_collection(social_bucket_name(day))
+
+
+async def list_social_bucket_days() -> List[date]:
+    """List the days that have a social posts bucket, newest first."""
+    if database is None:
+        return []
+    names = await database.list_collection_names(
+        filter={"name": {"$regex": f"^{SOCIAL_BUCKET_PREFIX}\\d{{8}}$"}}
+    )
+    return sorted((social_bucket_day(name) for name in names), reverse=True)
+
+
+async def ensure_social_bucket_indexes(collection: AsyncIOMotorCollection) -> bool:
+    """Create the query indexes of a social posts bucket once per process.
+
+    Returns True the first time a bucket is seen, so callers can run
+    retention when a new day starts.
+    """
+    if collection.name in _indexed_social_buckets:
+        return False
+    await collection.create_index([("timestamp", -1)])
+    await collection.create_index([("platform", 1), ("timestamp", -1)])
+    await collection.create_index([("sentiment", 1), ("timestamp", -1)])
+    await collection.create_index([("platform", 1), ("sentiment", 1), ("timestamp", -1)])
+    await collection.create_index([("processed_at", 1)])
+    await collection.create_index([("correlation_terms", 1), ("timestamp", -1)])
+    _indexed_social_buckets.add(collection.name)
+    return True
+
+
+async def prune_social_buckets(retention_days: int = SOCIAL_RETENTION_DAYS) -> List[str]:
+    """Drop social posts buckets older than the retention window."""
+    if database is None:
+        return []
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+    dropped = []
+    for day in await list_social_bucket_days():
+        if day < cutoff:
+            name = social_bucket_name(day)
+            await database.drop_collection(name)
+            _indexed_social_buckets.discard(name)
+            dropped.append(name)
+    if dropped:
+        print(f"🧹 Dropped {len(dropped)} expired social post buckets")
+    return dropped
@@ -0,0 +1,196 @@
+"""
+Streaming bulk export of user reports as CSV, GeoJSON and Parquet.
+
+Reports are read from a Mongo cursor in batches of EXPORT_BATCH_SIZE and each
+batch is encoded and yielded before the next one is fetched, so memory stays
+constant no matter how many rows are exported. Parquet output needs the
+optional pyarrow dependency (pip install "backend[export]").
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple
+
+from app.crud import user_reports_crud
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_COLUMNS = [
+    "id", "title", "description", "location", "latitude", "longitude",
+    "type", "severity", "status", "author", "verified", "images", "videos",
+    "district", "state", "incident_id", "timestamp", "updated_at",
+]
+
+# Only the stored fields the export needs are fetched, with the point of
+# compact reports in place of coordinates
+EXPORT_PROJECTION = {
+    "title": 1, "description": 1, "location": 1, "coordinates": 1, "point": 1,
+    "type": 1, "severity": 1, "status": 1, "author": 1, "verified": 1,
+    "images": 1, "videos": 1, "district": 1, "state": 1, "incident_id": 1,
+    "timestamp": 1, "updated_at": 1,
+}
+
+
+def to_row(doc: dict) -> dict:
+    """Flatten a stored report into an export row."""
+    lat, lng = doc.get("coordinates") or (None, None)
+    return {
+        "id": str(doc["_id"]),
+        "title": doc.get("title"),
+        "description": doc.get("description"),
+        "location": doc.get("location"),
+        "latitude": lat,
+        "longitude": lng,
+        "type": doc.get("type"),
+        "severity": doc.get("severity"),
+        "status": doc.get("status"),
+        "author": doc.get("author"),
+        "verified": doc.get("verified", False),
+        "images": doc.get("images", 0),
+        "videos": doc.get("videos", 0),
+        "district": doc.get("district"),
+        "state": doc.get("state"),
+        "incident_id": doc.get("incident_id"),
+        "timestamp": doc.get("timestamp"),
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+async def iter_row_batches(filters: dict, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    """Yield export rows in batches straight from a cursor."""
+    cursor = user_reports_crud.read_collection.find(
+        user_reports_crud.encode_filters(filters), EXPORT_PROJECTION
+    ).sort("_id", 1).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(to_row(user_reports_crud.decode(doc)))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def csv_chunks(filters: dict) -> AsyncIterator[bytes]:
+    """Stream reports as CSV."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async for batch in iter_row_batches(filters):
+        writer.writerows({key: _isoformat(value) for key, value in row.items()} for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def geojson_chunks(filters: dict) -> AsyncIterator[bytes]:
+    """Stream reports as a GeoJSON FeatureCollection."""
+    yield b'{"type":"FeatureCollection","features":['
+    first = True
+    async for batch in iter_row_batches(filters):
+        features = []
+        for row in batch:
+            properties = {key: _isoformat(value) for key, value in row.items() if key not in ("latitude", "longitude")}
+            features.append(json.dumps({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [row["longitude"], row["latitude"]]},
+                "properties": properties
+            }, separators=(",", ":")))
+        chunk = ",".join(features)
+        yield (chunk if first else "," + chunk).encode("utf-8")
+        first = False
+    yield b"]}"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back in chunks."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("id", pa.string()), ("title", pa.string()), ("description", pa.string()),
+        ("location", pa.string()), ("latitude", pa.float64()), ("longitude", pa.float64()),
+        ("type", pa.string()), ("severity", pa.string()), ("status", pa.string()),
+        ("author", pa.string()), ("verified", pa.bool_()), ("images", pa.int32()),
+        ("videos", pa.int32()), ("district", pa.string()), ("state", pa.string()),
+        ("incident_id", pa.string()), ("timestamp", pa.timestamp("ms")),
+        ("updated_at", pa.timestamp("ms")),
+    ])
+
+
+async def parquet_chunks(filters: dict) -> AsyncIterator[bytes]:
+    """Stream reports as Parquet, one row group per batch."""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for batch in iter_row_batches(filters):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip a byte stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class ExportFormat(NamedTuple):
+    media_type: str
+    extension: str
+    encoder: Callable[[dict], AsyncIterator[bytes]]
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("text/csv", "csv", csv_chunks),
+    "geojson": ExportFormat("application/geo+json", "geojson", geojson_chunks),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet", parquet_chunks),
+}
+
+
+def parquet_available() -> bool:
+    """Check whether the optional Parquet dependency is installed."""
+    return pq is not None
@@ -0,0 +1,263 @@
+"""
+Offline geocoding for OceanEye using a bundled coastal gazetteer.
+
+Forward geocoding resolves free-text locations ("Marina Beach, Chennai") with
+a trie over normalized place-name tokens. Reverse geocoding resolves report
+coordinates to the nearest gazetteer place (and so its district and state)
+with a k-d tree over unit-sphere points. Both run in memory without network
+access.
+"""
+import csv
+import math
+import re
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+GAZETTEER_PATH = Path(__file__).parent / "data" / "coastal_gazetteer.csv"
+
+EARTH_RADIUS_KM = 6371.0
+
+# Reverse lookups farther than this from any gazetteer place return None
+MAX_REVERSE_DISTANCE_KM = 150.0
+
+# More specific places win over broader ones mentioned in the same text
+KIND_RANK = {"beach": 0, "locality": 1, "city": 2, "district": 3, "state": 4}
+
+# Key under which a trie node stores the entries whose name ends there
+_TERMINAL = ""
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class GeoMatch:
+    """A resolved gazetteer place."""
+    name: str
+    kind: str
+    district: Optional[str]
+    state: str
+    lat: float
+    lng: float
+
+    @property
+    def coordinates(self) -> List[float]:
+        """Get [latitude, longitude] like UserReportBase.coordinates."""
+        return [self.lat, self.lng]
+
+
+def normalize(text: str) -> List[str]:
+    """Normalize text into lowercase ASCII alphanumeric tokens."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    text = text.lower().replace("'", "")
+    return _NON_ALNUM_RE.sub(" ", text).split()
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlam = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _to_unit_vector(lat: float, lng: float) -> Tuple[float, float, float]:
+    """Convert degrees to a point on the unit sphere."""
+    phi, lam = math.radians(lat), math.radians(lng)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+class Gazetteer:
+    """In-memory gazetteer index with a name trie and a k-d tree.
+
+    Entries live in parallel arrays; the trie and the tree only hold entry
+    indices, so the index stays small regardless of how many aliases a place
+    has.
+    """
+
+    def __init__(self, rows: Sequence[dict]):
+        self.names: List[str] = []
+        self.kinds: List[str] = []
+        self.districts: List[Optional[str]] = []
+        self.states: List[str] = []
+        self.lats = array("d")
+        self.lngs = array("d")
+        self.trie: Dict[str, dict] = {}
+
+        for row in rows:
+            index = len(self.names)
+            self.names.append(row["name"])
+            self.kinds.append(row["kind"])
+            self.districts.append(row.get("district") or None)
+            self.states.append(row["state"])
+            self.lats.append(float(row["lat"]))
+            self.lngs.append(float(row["lng"]))
+            aliases = [alias for alias in (row.get("aliases") or "").split("|") if alias]
+            for name in [row["name"], *aliases]:
+                self._insert(normalize(name), index)
+
+        self._build_tree()
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "Gazetteer":
+        """Load a gazetteer CSV file."""
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _insert(self, tokens: List[str], index: int):
+        """Add a normalized name to the trie."""
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        entries = node.setdefault(_TERMINAL, [])
+        if index not in entries:
+            entries.append(index)
+
+    def _match(self, index: int) -> GeoMatch:
+        return GeoMatch(
+            name=self.names[index],
+            kind=self.kinds[index],
+            district=self.districts[index],
+            state=self.states[index],
+            lat=self.lats[index],
+            lng=self.lngs[index]
+        )
+
+    # Forward geocoding
+
+    def find_places(self, text: str) -> List[int]:
+        """Find the entries whose names appear in text, longest match first."""
+        tokens = normalize(text)
+        found = []
+        position = 0
+        while position < len(tokens):
+            node = self.trie
+            longest: Tuple[int, List[int]] = (0, [])
+            for offset in range(position, len(tokens)):
+                node = node.get(tokens[offset])
+                if node is None:
+                    break
+                if _TERMINAL in node:
+                    longest = (offset - position + 1, node[_TERMINAL])
+            if longest[0]:
+                found.extend(longest[1])
+                position += longest[0]
+            else:
+                position += 1
+        return found
+
+    def geocode(self, text: str) -> Optional[GeoMatch]:
+        """Resolve free text to the most specific place it mentions."""
+        candidates = self.find_places(text)
+        if not candidates:
+            return None
+
+        # Names shared across states ("Kovalam") are settled by any state or
+        # district that is also mentioned
+        context_states = {self.states[i] for i in candidates if self.kinds[i] in ("state", "district")}
+        context_districts = {self.districts[i] for i in candidates if self.kinds[i] == "district"}
+
+        def sort_key(index: int):
+            in_context = self.states[index] in context_states or self.districts[index] in context_districts
+            return (not in_context, KIND_RANK.get(self.kinds[index], len(KIND_RANK)))
+
+        return self._match(min(candidates, key=sort_key))
+
+    # Reverse geocoding
+
+    def _build_tree(self):
+        """Build an implicit k-d tree over the non-state entries.
+
+        The tree is a permutation of entry indices where the median of each
+        range is the node and the halves are its subtrees, so it needs no
+        node objects.
+        """
+        points = [i for i in range(len(self.names)) if self.kinds[i] != "state"]
+        vectors = {i: _to_unit_vector(self.lats[i], self.lngs[i]) for i in points}
+        self._xyz = array("d")
+        for i in range(len(self.names)):
+            self._xyz.extend(vectors.get(i, (0.0, 0.0, 0.0)))
+
+        def build(indices: List[int], depth: int) -> List[int]:
+            if len(indices) <= 1:
+                return indices
+            axis = depth % 3
+            indices.sort(key=lambda i: self._xyz[3 * i + axis])
+            mid = len(indices) // 2
+            return build(indices[:mid], depth + 1) + [indices[mid]] + build(indices[mid + 1:], depth + 1)
+
+        self._tree = array("i", build(points, 0))
+
+    def nearest(self, lat: float, lng: float) -> Tuple[Optional[int], float]:
+        """Find the nearest entry to a coordinate and its distance in km."""
+        if not self._tree:
+            return None, math.inf
+        query = _to_unit_vector(lat, lng)
+        xyz, tree = self._xyz, self._tree
+        best_index, best_sq = -1, math.inf
+
+        stack = [(0, len(tree), 0)]
+        while stack:
+            start, end, depth = stack.pop()
+            if start >= end:
+                continue
+            mid = (start + end) // 2
+            index = tree[mid]
+            base = 3 * index
+            dx = xyz[base] - query[0]
+            dy = xyz[base + 1] - query[1]
+            dz = xyz[base + 2] - query[2]
+            dist_sq = dx * dx + dy * dy + dz * dz
+            if dist_sq < best_sq:
+                best_index, best_sq = index, dist_sq
+
+            axis = depth % 3
+            diff = query[axis] - xyz[base + axis]
+            near, far = ((start, mid), (mid + 1, end)) if diff < 0 else ((mid + 1, end), (start, mid))
+            # Push the far side first so the near side is searched first
+            if diff * diff < best_sq:
+                stack.append((far[0], far[1], depth + 1))
+            stack.append((near[0], near[1], depth + 1))
+
+        chord = math.sqrt(best_sq)
+        return best_index, 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+    def reverse(
+        self,
+        lat: float,
+        lng: float,
+        max_distance_km: float = MAX_REVERSE_DISTANCE_KM
+    ) -> Optional[GeoMatch]:
+        """Resolve a coordinate to the nearest gazetteer place."""
+        index, distance = self.nearest(lat, lng)
+        if index is None or distance > max_distance_km:
+            return None
+        return self._match(index)
+
+
+# Global gazetteer, loaded on first use
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Get the bundled gazetteer index."""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = Gazetteer.load()
+    return _gazetteer
+
+
+def geocode(text: str) -> Optional[GeoMatch]:
+    """Resolve a free-text location."""
+    return get_gazetteer().geocode(text)
+
+
+def reverse_geocode(lat: float, lng: float) -> Optional[GeoMatch]:
+    """Resolve coordinates to the nearest known place."""
+    return get_gazetteer().reverse(lat, lng)
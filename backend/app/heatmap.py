@@ -0,0 +1,222 @@
+"""
+Severity-weighted report density heatmap tiles.
+
+Tiles follow the web map (XYZ, Web Mercator) scheme. For a tile, the reports
+inside its extent plus the kernel radius are read with their coordinates
+and severity, binned into a weighted pixel histogram and smoothed with a
+Gaussian kernel applied as two matrix products, so the cost is independent
+of the number of reports once they are binned. Densities are mapped to
+colours on a fixed scale (HEATMAP_SATURATION) rather than per tile, so
+neighbouring tiles join up.
+
+Tiles are rendered as RGBA PNG or as a compact grid of 8-bit intensities.
+Rendered tiles are cached under the user_reports collection version, which
+every worker picks up through collection_versions, so any report write moves
+all workers on to freshly rendered tiles. Points are read from the primary,
+after the version is taken, so a cached tile is never older than its version.
+The endpoint validates tiles with the same version's ETag.
+"""
+import base64
+import json
+import math
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.cache import heatmap_tile_cache
+from app.crud import user_reports_crud
+from app.models import ReportStatus
+from app.versions import collection_versions
+
+TILE_SIZE = 256
+HEATMAP_MAX_ZOOM = int(os.getenv("HEATMAP_MAX_ZOOM", "18"))
+# Kernel radius in pixels of a 256 pixel tile
+HEATMAP_RADIUS_PX = float(os.getenv("HEATMAP_RADIUS_PX", "20"))
+# Density drawn at full colour; one critical report peaks at its weight
+HEATMAP_SATURATION = float(os.getenv("HEATMAP_SATURATION", "32"))
+HEATMAP_MAX_POINTS = int(os.getenv("HEATMAP_MAX_POINTS", "100000"))
+
+SEVERITY_WEIGHTS = {"low": 1.0, "medium": 2.0, "high": 4.0, "critical": 8.0}
+
+HEATMAP_FORMATS = ("png", "grid")
+
+# Web Mercator's latitude limit
+MAX_LATITUDE = 85.05112878
+
+
+def _colormap() -> np.ndarray:
+    """Build a 256 entry RGBA lookup table from transparent through yellow to dark red."""
+    stops = np.array([0.0, 0.15, 0.5, 0.8, 1.0])
+    colours = np.array([
+        [255, 255, 178, 0],
+        [254, 204, 92, 140],
+        [253, 141, 60, 190],
+        [240, 59, 32, 220],
+        [189, 0, 38, 240],
+    ], dtype=np.float64)
+    levels = np.linspace(0.0, 1.0, 256)
+    lut = np.stack([np.interp(levels, stops, colours[:, channel]) for channel in range(4)], axis=1)
+    lut[0] = 0
+    return lut.round().astype(np.uint8)
+
+
+_COLORMAP = _colormap()
+
+
+def world_pixels(lat: np.ndarray, lng: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Project coordinates to world pixel coordinates at a zoom level."""
+    scale = TILE_SIZE * (1 << zoom)
+    sin_lat = np.sin(np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)))
+    px = (lng + 180.0) / 360.0 * scale
+    py = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return px, py
+
+
+def pixel_to_latlng(px: float, py: float, zoom: int) -> Tuple[float, float]:
+    """Unproject world pixel coordinates at a zoom level."""
+    scale = TILE_SIZE * (1 << zoom)
+    lng = px / scale * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * py / scale))))
+    return lat, lng
+
+
+def tile_extent(z: int, x: int, y: int, margin_px: float = 0.0) -> Tuple[float, float, float, float]:
+    """Get (south, west, north, east) of a tile grown by margin_px on each side."""
+    north, west = pixel_to_latlng(x * TILE_SIZE - margin_px, y * TILE_SIZE - margin_px, z)
+    south, east = pixel_to_latlng((x + 1) * TILE_SIZE + margin_px, (y + 1) * TILE_SIZE + margin_px, z)
+    return max(south, -90.0), max(west, -180.0), min(north, 90.0), min(east, 180.0)
+
+
+def gaussian_matrix(size: int, margin: int, sigma: float) -> np.ndarray:
+    """Kernel weights from the size + 2 * margin histogram bins to the size output pixels."""
+    centers = np.arange(size)[:, None] + margin
+    bins = np.arange(size + 2 * margin)[None, :]
+    return np.exp(-0.5 * ((centers - bins) / sigma) ** 2)
+
+
+def kernel_density(px: np.ndarray, py: np.ndarray, weights: np.ndarray, size: int, radius: float) -> np.ndarray:
+    """Weighted Gaussian kernel density on a size x size grid.
+
+    px and py are in grid pixels, with points up to radius outside the grid
+    still contributing.
+    """
+    margin = int(math.ceil(radius))
+    span = size + 2 * margin
+    histogram, _, _ = np.histogram2d(
+        py, px,
+        bins=[span, span],
+        range=[[-margin, size + margin], [-margin, size + margin]],
+        weights=weights
+    )
+    # The kernel reaches ~0 at the radius (3 sigma); it is separable, so
+    # smoothing rows then columns is two matrix products
+    kernel = gaussian_matrix(size, margin, max(radius / 3.0, 0.5))
+    return kernel @ histogram @ kernel.T
+
+
+def intensities(density: np.ndarray) -> np.ndarray:
+    """Map densities to 8-bit intensities on the fixed colour scale."""
+    scaled = np.sqrt(np.clip(density / HEATMAP_SATURATION, 0.0, 1.0))
+    return (scaled * 255).round().astype(np.uint8)
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Encode an (height, width, 4) uint8 array as a PNG."""
+    height, width, _ = rgba.shape
+    # Each scanline starts with filter type 0 (none)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)])
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+async def load_points(
+    extent: Tuple[float, float, float, float],
+    hazard_type: Optional[str] = None,
+    since: Optional[datetime] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Read latitude, longitude and severity weight arrays of reports in an extent."""
+    south, west, north, east = extent
+    filters = {
+        "coordinates.0": {"$gte": south, "$lte": north},
+        "coordinates.1": {"$gte": west, "$lte": east},
+        "status": {"$ne": ReportStatus.FALSE_ALARM}
+    }
+    if hazard_type:
+        filters["type"] = hazard_type
+    if since:
+        filters["timestamp"] = {"$gte": since}
+    cursor = user_reports_crud.collection.find(
+        user_reports_crud.encode_filters(filters), {"_id": 0, "coordinates": 1, "point": 1, "severity": 1}
+    ).limit(HEATMAP_MAX_POINTS)
+    docs = [user_reports_crud.decode(doc) for doc in await cursor.to_list(length=HEATMAP_MAX_POINTS)]
+    if not docs:
+        empty = np.empty(0)
+        return empty, empty, empty
+    coordinates = np.array([doc["coordinates"] for doc in docs], dtype=np.float64)
+    weights = np.array([SEVERITY_WEIGHTS.get(doc.get("severity"), 1.0) for doc in docs])
+    return coordinates[:, 0], coordinates[:, 1], weights
+
+
+async def render_tile(
+    z: int,
+    x: int,
+    y: int,
+    fmt: str = "png",
+    size: int = TILE_SIZE,
+    hazard_type: Optional[str] = None,
+    days: Optional[int] = None
+) -> bytes:
+    """Render a heatmap tile as PNG or grid JSON bytes, using the tile cache."""
+    if not 0 <= z <= HEATMAP_MAX_ZOOM or not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise ValueError(f"No tile {z}/{x}/{y}")
+    if fmt not in HEATMAP_FORMATS:
+        raise ValueError(f"Unknown heatmap format {fmt}")
+    if fmt == "png":
+        size = TILE_SIZE
+
+    key = (collection_versions.version(user_reports_crud.collection_name), z, x, y, fmt, size, hazard_type, days)
+    cached = heatmap_tile_cache.get(key)
+    if cached is not None:
+        return cached
+
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    lat, lng, weights = await load_points(tile_extent(z, x, y, HEATMAP_RADIUS_PX), hazard_type, since)
+    px, py = world_pixels(lat, lng, z)
+    scale = size / TILE_SIZE
+    density = kernel_density(
+        (px - x * TILE_SIZE) * scale,
+        (py - y * TILE_SIZE) * scale,
+        weights,
+        size,
+        HEATMAP_RADIUS_PX * scale
+    )
+    levels = intensities(density)
+
+    if fmt == "png":
+        body = encode_png(_COLORMAP[levels])
+    else:
+        body = json.dumps({
+            "z": z,
+            "x": x,
+            "y": y,
+            "size": size,
+            "points": len(weights),
+            "max_density": round(float(density.max()), 4),
+            "saturation": HEATMAP_SATURATION,
+            # Row-major size x size intensities (0-255, sqrt of density / saturation)
+            "values": base64.b64encode(levels.tobytes()).decode()
+        }, separators=(",", ":")).encode()
+    heatmap_tile_cache.set(key, body)
+    return body
@@ -0,0 +1,262 @@
+"""
+Incremental spatiotemporal clustering of user reports into incidents.
+
+Each new report is assigned to an incident of the same hazard type whose
+centroid is within INCIDENT_RADIUS_KM and whose last report is within
+INCIDENT_WINDOW_HOURS. Open incidents are kept in a grid index keyed by
+(hazard type, lat cell, lng cell), so an assignment only looks at the
+neighbouring cells instead of every incident. As in DBSCAN, a report that
+reaches several incidents connects them and they are merged.
+
+Every worker keeps its own grid. Incident aggregates are only changed with
+atomic updates that recompute the centroid from the stored sums, and an
+incident another worker merged away is dropped from the grid and the report
+is assigned again.
+"""
+import asyncio
+import math
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app.crud import incidents_crud, user_reports_crud
+from app.geocoder import haversine_km
+
+INCIDENT_RADIUS_KM = float(os.getenv("INCIDENT_RADIUS_KM", "5"))
+INCIDENT_WINDOW_HOURS = float(os.getenv("INCIDENT_WINDOW_HOURS", "12"))
+# How often incidents past the time window are dropped from the grid
+INCIDENT_PRUNE_SECONDS = float(os.getenv("INCIDENT_PRUNE_SECONDS", "300"))
+
+# Incidents a report may find merged away before it starts a new one
+ASSIGN_ATTEMPTS = 3
+
+KM_PER_DEGREE = 111.32
+
+CellKey = Tuple[str, int, int]
+
+
+def _stored_event() -> asyncio.Event:
+    event = asyncio.Event()
+    event.set()
+    return event
+
+
+@dataclass
+class OpenIncident:
+    """In-memory state of an incident that can still absorb reports."""
+    id: str
+    type: str
+    lat_sum: float
+    lng_sum: float
+    count: int
+    last_seen: datetime
+    cell: Optional[CellKey] = None
+    # Set once the incident document exists
+    stored: asyncio.Event = field(default_factory=_stored_event, repr=False, compare=False)
+
+    @property
+    def centroid(self) -> List[float]:
+        return [self.lat_sum / self.count, self.lng_sum / self.count]
+
+
+class IncidentGrid:
+    """Grid index of open incidents by hazard type and centroid cell."""
+
+    def __init__(self, radius_km: float = INCIDENT_RADIUS_KM, window_hours: float = INCIDENT_WINDOW_HOURS):
+        self.radius_km = radius_km
+        self.window = timedelta(hours=window_hours)
+        # One cell spans the clustering radius in latitude
+        self.cell_deg = radius_km / KM_PER_DEGREE
+        self.cells: Dict[CellKey, Set[str]] = defaultdict(set)
+        self.incidents: Dict[str, OpenIncident] = {}
+
+    def __len__(self) -> int:
+        return len(self.incidents)
+
+    def cell_of(self, hazard_type: str, lat: float, lng: float) -> CellKey:
+        return (hazard_type, math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def put(self, incident: OpenIncident):
+        """Insert an incident or move it to the cell of its current centroid."""
+        cell = self.cell_of(incident.type, *incident.centroid)
+        if incident.cell != cell:
+            if incident.cell is not None:
+                self.cells[incident.cell].discard(incident.id)
+            self.cells[cell].add(incident.id)
+            incident.cell = cell
+        self.incidents[incident.id] = incident
+
+    def remove(self, incident_id: str) -> Optional[OpenIncident]:
+        incident = self.incidents.pop(incident_id, None)
+        if incident is not None and incident.cell is not None:
+            members = self.cells[incident.cell]
+            members.discard(incident_id)
+            if not members:
+                del self.cells[incident.cell]
+        return incident
+
+    def prune(self, now: datetime) -> int:
+        """Drop incidents whose last report is outside the time window."""
+        expired = [
+            incident_id for incident_id, incident in self.incidents.items()
+            if incident.last_seen < now - self.window
+        ]
+        for incident_id in expired:
+            self.remove(incident_id)
+        return len(expired)
+
+    def nearby(self, hazard_type: str, lat: float, lng: float, timestamp: datetime) -> List[Tuple[float, str]]:
+        """Get (distance_km, id) of incidents that can absorb a report, nearest first.
+
+        Incidents found to be outside the time window are dropped from the
+        index on the way.
+        """
+        _, row, col = self.cell_of(hazard_type, lat, lng)
+        # Longitude cells shrink towards the poles, so widen the column span
+        col_span = math.ceil(1 / max(math.cos(math.radians(lat)), 0.01))
+        matches, expired = [], []
+        for i in range(row - 1, row + 2):
+            for j in range(col - col_span, col + col_span + 1):
+                for incident_id in self.cells.get((hazard_type, i, j), ()):
+                    incident = self.incidents[incident_id]
+                    if incident.last_seen < timestamp - self.window:
+                        expired.append(incident_id)
+                        continue
+                    if abs(incident.last_seen - timestamp) > self.window:
+                        continue
+                    distance = haversine_km(lat, lng, *incident.centroid)
+                    if distance <= self.radius_km:
+                        matches.append((distance, incident_id))
+        for incident_id in expired:
+            self.remove(incident_id)
+        return sorted(matches)
+
+
+class IncidentClusterer:
+    """Assigns reports to incidents and keeps the incidents collection current."""
+
+    def __init__(self, grid: Optional[IncidentGrid] = None):
+        self.grid = grid or IncidentGrid()
+        self._pruned_at = datetime.utcnow()
+
+    def _track(self, incident_data: dict):
+        """Add a stored incident to the grid, or refresh the one tracked."""
+        incident_id = str(incident_data["_id"])
+        incident = self.grid.incidents.get(incident_id) or OpenIncident(
+            incident_id, incident_data["type"], 0.0, 0.0, 0, incident_data["last_seen"]
+        )
+        incident.lat_sum = incident_data["lat_sum"]
+        incident.lng_sum = incident_data["lng_sum"]
+        incident.count = incident_data["report_count"]
+        incident.last_seen = incident_data["last_seen"]
+        self.grid.put(incident)
+
+    async def load(self, now: Optional[datetime] = None) -> int:
+        """Warm the grid with incidents still inside the time window."""
+        since = (now or datetime.utcnow()) - self.grid.window
+        for incident_data in await incidents_crud.get_all(limit=0, filters={"last_seen": {"$gte": since}}):
+            self._track(incident_data)
+        return len(self.grid)
+
+    async def _load_nearby(self, hazard_type: str, lat: float, lng: float, timestamp: datetime):
+        """Pull nearby incidents, as other workers left them, into the grid."""
+        margin = 2 * self.grid.cell_deg
+        lng_margin = margin / max(math.cos(math.radians(lat)), 0.01)
+        for incident_data in await incidents_crud.find_recent(
+            hazard_type,
+            timestamp - self.grid.window,
+            [lat - margin, lat + margin],
+            [lng - lng_margin, lng + lng_margin]
+        ):
+            self._track(incident_data)
+
+    def _prune(self):
+        now = datetime.utcnow()
+        if (now - self._pruned_at).total_seconds() >= INCIDENT_PRUNE_SECONDS:
+            self.grid.prune(now)
+            self._pruned_at = now
+
+    async def _start(self, hazard_type: str, report_data: dict) -> str:
+        """Start a new incident with a report."""
+        lat, lng = report_data["coordinates"]
+        incident = OpenIncident(
+            str(ObjectId()), hazard_type, lat, lng, 1, report_data["timestamp"], stored=asyncio.Event()
+        )
+        # Tracked before it is stored, so reports arriving meanwhile join it
+        self.grid.put(incident)
+        try:
+            await incidents_crud.create_incident({**report_data, "type": hazard_type}, incident.id)
+        except Exception:
+            self.grid.remove(incident.id)
+            raise
+        finally:
+            incident.stored.set()
+        return incident.id
+
+    async def _join(self, matches: List[Tuple[float, str]], report_data: dict) -> Optional[str]:
+        """Add a report to the nearest incident, merging the others it reaches.
+
+        Returns None if the incident turned out to be merged away by another
+        worker; it is dropped from the grid.
+        """
+        lat, lng = report_data["coordinates"]
+        incident = self.grid.incidents[matches[0][1]]
+        # The grid is updated before any await, so concurrent assignments in
+        # this worker see the merged, grown incident
+        others = [self.grid.remove(other_id) for _, other_id in matches[1:]]
+        for other in others:
+            incident.lat_sum += other.lat_sum
+            incident.lng_sum += other.lng_sum
+            incident.count += other.count
+            incident.last_seen = max(incident.last_seen, other.last_seen)
+        incident.lat_sum += lat
+        incident.lng_sum += lng
+        incident.count += 1
+        incident.last_seen = max(incident.last_seen, report_data["timestamp"])
+        self.grid.put(incident)
+
+        await incident.stored.wait()
+        for other in others:
+            await other.stored.wait()
+            # The report connects every incident it reaches
+            if await incidents_crud.merge_incidents(other.id, incident.id):
+                await user_reports_crud.move_incident_reports(other.id, incident.id)
+        incident_data = await incidents_crud.add_report(incident.id, report_data)
+        if incident_data is None:
+            self.grid.remove(incident.id)
+            return None
+        if incident.id in self.grid.incidents:
+            # Take in what other workers added meanwhile
+            self._track(incident_data)
+        return incident.id
+
+    async def assign(self, report_id: str, report_data: dict) -> str:
+        """Assign a stored report to an incident and return the incident ID."""
+        hazard_type = str(getattr(report_data["type"], "value", report_data["type"]))
+        lat, lng = report_data["coordinates"]
+        timestamp = report_data["timestamp"]
+        self._prune()
+
+        incident_id = None
+        for _ in range(ASSIGN_ATTEMPTS):
+            if not self.grid.nearby(hazard_type, lat, lng, timestamp):
+                await self._load_nearby(hazard_type, lat, lng, timestamp)
+            matches = self.grid.nearby(hazard_type, lat, lng, timestamp)
+            if not matches:
+                break
+            incident_id = await self._join(matches, report_data)
+            if incident_id:
+                break
+        if incident_id is None:
+            incident_id = await self._start(hazard_type, report_data)
+
+        await user_reports_crud.set_incident(report_id, incident_id)
+        return incident_id
+
+
+# Global clusterer instance
+incident_clusterer = IncidentClusterer()
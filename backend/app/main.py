@@ -1,9 +1,11 @@
 """
 OceanEye FastAPI Application - Coastal Monitoring System
 """
-from fastapi import FastAPI, HTTPException, Query, status as http_status, Form, UploadFile, File
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status as http_status, Form, UploadFile, File, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Dict, List, Optional, Set
+import asyncio
 import uvicorn
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
@@ -12,27 +14,83 @@ import aiofiles
 import uuid
 from pathlib import Path
 
-from app.db import connect_to_mongo, close_mongo_connection
+from app.db import (
+    connect_to_mongo, close_mongo_connection, create_indexes, prune_social_buckets, prewarm_pool,
+    causal_session, causal_token, get_database
+)
 from app.models import (
     UserReportCreate, UserReportUpdate, UserReportResponse, UserReportListResponse,
     SocialPostCreate, SocialPostResponse, SocialPostListResponse,
+    RelatedPostsResponse, RelatedReportsResponse,
     TrendingHashtagResponse, TrendingHashtagListResponse,
-    DashboardStats, StandardResponse,
+    IncidentResponse, IncidentListResponse,
+    DashboardStats, DashboardBundleSection, DashboardBundleResponse,
+    StandardResponse, TimeseriesResponse, ReportChangesResponse,
+    BulkModerationRequest, BulkModerationResponse,
+    UserCreate, UserResponse, LoginRequest, TokenResponse, AuthenticatedUser,
+    AlertSubscriptionCreate, AlertSubscriptionResponse,
     CoastalHazardType, SeverityLevel, ReportStatus, SocialPlatform, SentimentType
 )
 from app.crud import (
-    user_reports_crud, social_posts_crud, trending_hashtags_crud,
+    user_reports_crud, social_posts_crud, trending_hashtags_crud, incidents_crud, user_crud,
     create_user_report, get_user_report, get_user_reports
 )
+from app.incidents import incident_clusterer
+from app.correlation import correlation_engine
+from app.export import EXPORT_FORMATS, gzip_chunks, parquet_available
+from app.rollups import create_rollup_indexes, get_timeseries
+from app.changes import create_change_indexes, prune_tombstones
+from app.tiering import create_archive_collection
+from app.alerts import alert_engine, create_alert_indexes
+from app.versions import check_not_modified, collection_versions
+from app.geocoder import get_gazetteer
+from app.cache import dashboard_bundle_cache
+from app.heatmap import render_tile
+from app.compression import CompressionMiddleware
+from app.profiling import ProfilingMiddleware, profile_store, require_admin_token
+from app.singleflight import SingleFlightMiddleware, single_flight
+from app.admission import AdmissionMiddleware, admission_controller
+from app.auth import (
+    issue_token, token_verifier, require_user, require_role, check_secret,
+    create_revocation_indexes, warm_hash_pool, shutdown_hash_pool
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan management."""
     # Startup
+    check_secret()
     await connect_to_mongo()
+    try:
+        await create_indexes()
+        await create_rollup_indexes()
+        await create_change_indexes([user_reports_crud.collection_name])
+        await create_revocation_indexes()
+        await create_archive_collection()
+        await create_alert_indexes()
+        await prune_tombstones()
+        await prune_social_buckets()
+        await incident_clusterer.load()
+        await correlation_engine.load()
+    except Exception as e:
+        print(f"⚠️  Startup maintenance failed: {e}")
+
+    # Warm up before the server starts accepting connections
+    get_gazetteer()
+    try:
+        await prewarm_pool()
+        await collection_versions.sync(force=True)
+        await token_verifier.sync(force=True)
+        await alert_engine.sync(force=True)
+        await warm_hash_pool()
+    except Exception as e:
+        print(f"⚠️  Startup warm-up failed: {e}")
+    alert_engine.dispatcher.start()
     yield
     # Shutdown
+    await alert_engine.dispatcher.stop()
+    shutdown_hash_pool()
     await close_mongo_connection()
 
 
@@ -44,6 +102,15 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Admit requests through separate read and write lanes, shedding load with
+# 503s and rate limiting writes per client IP. Innermost, so coalesced reads
+# only take one slot and rejections still get CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
+# Share one in-flight response between identical concurrent reads. Added
+# before the rest so it runs below CORS, compression and profiling.
+app.add_middleware(SingleFlightMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -61,6 +128,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses, caching compressed bodies of hot endpoints
+app.add_middleware(CompressionMiddleware)
+
+# Profile requests sent with X-Profile: <admin token>, or sampled by PROFILE_SAMPLE_RATE
+app.add_middleware(ProfilingMiddleware)
+
 
 # Root endpoint
 @app.get("/")
@@ -71,10 +144,13 @@ async def read_root():
         "version": "2.0.0",
         "status": "running",
         "endpoints": {
+            "auth": "/api/auth",
             "user_reports": "/api/reports",
+            "incidents": "/api/incidents",
             "social_posts": "/api/social",
             "trending": "/api/trending",
             "dashboard": "/api/dashboard",
+            "dashboard_bundle": "/api/dashboard/bundle",
             "docs": "/docs",
             "health": "/health"
         }
@@ -89,13 +165,8 @@ async def health_check():
 
 
 # Dashboard Statistics Endpoint
-@app.get(
-    "/api/dashboard/stats",
-    response_model=DashboardStats,
-    summary="Get dashboard statistics"
-)
-async def get_dashboard_stats():
-    """Get current dashboard statistics."""
+async def load_dashboard_stats() -> DashboardStats:
+    """Compute the dashboard statistics."""
     # For now, return mock data - will be replaced with real calculations
     return DashboardStats(
         active_reports=47,
@@ -109,6 +180,112 @@ async def get_dashboard_stats():
     )
 
 
+@app.get(
+    "/api/dashboard/stats",
+    response_model=DashboardStats,
+    summary="Get dashboard statistics"
+)
+async def get_dashboard_stats(request: Request, response: Response):
+    """Get current dashboard statistics."""
+    not_modified = await check_not_modified(request, response, ["user_reports", "social_posts"])
+    if not_modified:
+        return not_modified
+
+    return await load_dashboard_stats()
+
+
+BUNDLE_SECTIONS = ("stats", "reports", "social", "trending")
+
+
+def _parse_bundle_fields(section: str, fields: Optional[str], model) -> Optional[Set[str]]:
+    """Resolve a comma-separated fields selection to model field names."""
+    if not fields:
+        return None
+    aliases = {info.alias: name for name, info in model.model_fields.items() if info.alias}
+    selected = {aliases.get(field.strip(), field.strip()) for field in fields.split(",") if field.strip()}
+    unknown = selected - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {section} fields: {', '.join(sorted(unknown))}"
+        )
+    return selected
+
+
+def _bundle_section(items, total: int, include: Optional[Set[str]]) -> DashboardBundleSection:
+    return DashboardBundleSection(
+        items=[item.model_dump(mode="json", by_alias=True, include=include) for item in items],
+        total=total
+    )
+
+
+@app.get(
+    "/api/dashboard/bundle",
+    response_model=DashboardBundleResponse,
+    summary="Get stats, reports, social posts and trending hashtags in one request"
+)
+async def get_dashboard_bundle(
+    request: Request,
+    response: Response,
+    sections: str = Query(",".join(BUNDLE_SECTIONS), description="Comma-separated sections: stats, reports, social, trending"),
+    reports_limit: int = Query(100, ge=1, le=1000, description="Number of reports to return"),
+    reports_fields: Optional[str] = Query(None, description="Comma-separated report fields to include"),
+    social_limit: int = Query(100, ge=1, le=1000, description="Number of social posts to return"),
+    social_fields: Optional[str] = Query(None, description="Comma-separated social post fields to include"),
+    trending_limit: int = Query(10, ge=1, le=100, description="Number of trending hashtags to return"),
+    trending_fields: Optional[str] = Query(None, description="Comma-separated hashtag fields to include")
+):
+    """Load the dashboard sections concurrently and return them as one payload."""
+    requested = [section.strip() for section in sections.split(",") if section.strip()]
+    unknown = set(requested) - set(BUNDLE_SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}"
+        )
+    report_include = _parse_bundle_fields("reports", reports_fields, UserReportResponse)
+    social_include = _parse_bundle_fields("social", social_fields, SocialPostResponse)
+    trending_include = _parse_bundle_fields("trending", trending_fields, TrendingHashtagResponse)
+
+    not_modified = await check_not_modified(
+        request, response, ["user_reports", "social_posts", "trending_hashtags"]
+    )
+    if not_modified:
+        return not_modified
+
+    # The ETag covers collection versions and query parameters
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    cache_key = response.headers["etag"]
+    body = dashboard_bundle_cache.get(cache_key)
+    if body is None:
+        loaders = {
+            "stats": lambda: load_dashboard_stats(),
+            "reports": lambda: load_user_reports(limit=reports_limit),
+            "social": lambda: load_social_posts(limit=social_limit),
+            "trending": lambda: load_trending_hashtags(trending_limit),
+        }
+        selected = [section for section in BUNDLE_SECTIONS if section in requested]
+        results: Dict[str, object] = dict(zip(
+            selected,
+            await asyncio.gather(*(loaders[section]() for section in selected))
+        ))
+
+        bundle = DashboardBundleResponse(generated_at=datetime.utcnow())
+        if "stats" in results:
+            bundle.stats = results["stats"]
+        if "reports" in results:
+            bundle.reports = _bundle_section(results["reports"].reports, results["reports"].total, report_include)
+        if "social" in results:
+            bundle.social = _bundle_section(results["social"].posts, results["social"].total, social_include)
+        if "trending" in results:
+            hashtags = results["trending"].hashtags
+            bundle.trending = _bundle_section(hashtags, len(hashtags), trending_include)
+        body = bundle.model_dump_json(by_alias=True, exclude_unset=True).encode()
+        dashboard_bundle_cache.set(cache_key, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 # User Reports Endpoints
 @app.post(
     "/api/reports",
@@ -117,6 +294,7 @@ async def get_dashboard_stats():
     summary="Create a new user report with file uploads"
 )
 async def create_user_report_endpoint(
+    response: Response,
     title: str = Form(..., description="Title of the report"),
     description: str = Form(..., description="Detailed description"),
     location: str = Form(..., description="Human-readable location"),
@@ -128,6 +306,7 @@ async def create_user_report_endpoint(
     files: List[UploadFile] = File(default=[], description="Photos and videos")
 ):
     """Create a new user report for coastal hazards with optional file uploads."""
+    admission_controller.check_author(author)
     try:
         # Create upload directories if they don't exist
         upload_base_dir = Path("uploads")
@@ -188,18 +367,26 @@ async def create_user_report_endpoint(
 
         # Try to save to MongoDB
         report_id = None
+        token = None
         try:
-            report_id = await create_user_report(report_data)
+            async with causal_session() as session:
+                report_id = await create_user_report(report_data, session)
+                token = causal_token(session)
         except Exception as e:
             print(f"Failed to save to database: {e}")
             # Continue with file upload success even if DB save fails
             report_id = f"report_{uuid.uuid4()}"
 
+        if token:
+            # Lets the reporter read their own report back from a secondary
+            response.headers["X-Causal-Token"] = token
+
         return StandardResponse(
             success=True,
             message=f"Report created successfully with {len(uploaded_files)} files uploaded",
             data={
                 "report_id": report_id,
+                "causal_token": token,
                 "files_uploaded": len(uploaded_files),
                 "images": image_count,
                 "videos": video_count,
@@ -214,23 +401,19 @@ async def create_user_report_endpoint(
         )
 
 
-@app.get(
-    "/api/reports",
-    response_model=UserReportListResponse,
-    summary="Get user reports with optional filters"
-)
-async def get_user_reports_endpoint(
-    skip: int = Query(0, ge=0, description="Number of reports to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of reports to return"),
-    status: Optional[ReportStatus] = Query(None, description="Filter by report status"),
-    hazard_type: Optional[CoastalHazardType] = Query(None, description="Filter by hazard type"),
-    severity: Optional[SeverityLevel] = Query(None, description="Filter by severity level"),
-    location: Optional[str] = Query(None, description="Filter by location")
-):
-    """Get user reports with filtering and pagination."""
+async def load_user_reports(
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[ReportStatus] = None,
+    hazard_type: Optional[CoastalHazardType] = None,
+    severity: Optional[SeverityLevel] = None,
+    location: Optional[str] = None,
+    causal_token: Optional[str] = None
+) -> UserReportListResponse:
+    """Load a page of user reports, falling back to mock data without a database."""
     try:
         # Try to get from database first
-        reports = await get_user_reports(skip, limit, status, hazard_type, severity, location)
+        reports = await get_user_reports(skip, limit, status, hazard_type, severity, location, causal_token)
         total_count = await user_reports_crud.get_reports_count()
 
         if reports:
@@ -315,16 +498,176 @@ async def get_user_reports_endpoint(
     )
 
 
+@app.get(
+    "/api/reports",
+    response_model=UserReportListResponse,
+    summary="Get user reports with optional filters"
+)
+async def get_user_reports_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Number of reports to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of reports to return"),
+    status: Optional[ReportStatus] = Query(None, description="Filter by report status"),
+    hazard_type: Optional[CoastalHazardType] = Query(None, description="Filter by hazard type"),
+    severity: Optional[SeverityLevel] = Query(None, description="Filter by severity level"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    x_causal_token: Optional[str] = Header(None, description="Causal token from creating a report, to see it in the list")
+):
+    """Get user reports with filtering and pagination."""
+    if x_causal_token:
+        # Read from a secondary, so the page can't be validated or cached by version
+        response.headers["Cache-Control"] = "no-store"
+    else:
+        not_modified = await check_not_modified(request, response, ["user_reports"])
+        if not_modified:
+            return not_modified
+
+    return await load_user_reports(skip, limit, status, hazard_type, severity, location, x_causal_token)
+
+
+@app.get(
+    "/api/reports/export",
+    summary="Stream a bulk export of user reports"
+)
+async def export_user_reports_endpoint(
+    format: str = Query("csv", pattern="^(csv|geojson|parquet)$", description="Export format: csv, geojson or parquet"),
+    status: Optional[ReportStatus] = Query(None, description="Filter by report status"),
+    hazard_type: Optional[CoastalHazardType] = Query(None, description="Filter by hazard type"),
+    severity: Optional[SeverityLevel] = Query(None, description="Filter by severity level"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    gzip: bool = Query(False, description="Gzip the stream on the fly")
+):
+    """Stream all matching reports straight from the database in batches."""
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=http_status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires the pyarrow package"
+        )
+    try:
+        user_reports_crud.collection
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+    export_format = EXPORT_FORMATS[format]
+    filters = user_reports_crud.build_filters(status, hazard_type, severity, location)
+    chunks = export_format.encoder(filters)
+    headers = {
+        "Content-Disposition": f'attachment; filename="oceaneye-reports-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{export_format.extension}"'
+    }
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=export_format.media_type, headers=headers)
+
+
+@app.get(
+    "/api/reports/changes",
+    response_model=ReportChangesResponse,
+    summary="Get reports created, updated or deleted since a change token"
+)
+async def get_report_changes_endpoint(
+    since: Optional[str] = Query(None, description="next_token of the previous response; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes to return")
+):
+    """Get report changes in order, for clients keeping a local copy in sync."""
+    try:
+        return await user_reports_crud.get_changes(since, limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="Invalid change token"
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+
+@app.get(
+    "/api/reports/timeseries",
+    response_model=TimeseriesResponse,
+    summary="Get report counts over time from pre-aggregated rollups"
+)
+async def get_reports_timeseries_endpoint(
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$", description="Bucket size: minute, hour or day"),
+    dimension: Optional[str] = Query(None, pattern="^(type|severity|status|state)$", description="Break counts down by type, severity, status or state"),
+    start: Optional[datetime] = Query(None, description="Start of the range (UTC), defaults to 24 hours ago"),
+    end: Optional[datetime] = Query(None, description="End of the range (UTC), defaults to now")
+):
+    """Get report counts per bucket, reading only rollup documents."""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    try:
+        buckets = await get_timeseries(granularity, start, end, dimension)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return TimeseriesResponse(granularity=granularity, dimension=dimension, buckets=buckets)
+
+
+@app.get(
+    "/api/reports/heatmap/{z}/{x}/{y}",
+    summary="Get a severity-weighted report density heatmap tile",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}, "application/json": {}}}}
+)
+async def get_reports_heatmap_endpoint(
+    request: Request,
+    response: Response,
+    z: int,
+    x: int,
+    y: int,
+    format: str = Query("png", pattern="^(png|grid)$", description="png image, or grid of 8-bit intensities"),
+    size: int = Query(64, ge=8, le=256, description="Grid cells per side (grid format only)"),
+    hazard_type: Optional[CoastalHazardType] = Query(None, description="Only reports of this hazard type"),
+    days: Optional[int] = Query(None, ge=1, le=3650, description="Only reports from the last N days")
+):
+    """Get a web map (XYZ) tile of kernel density of reports, weighted by severity."""
+    # A days window moves on without writes, so such tiles also change every hour
+    window = datetime.utcnow().strftime("%Y-%m-%dT%H") if days else ""
+    not_modified = await check_not_modified(request, response, ["user_reports"], window)
+    if not_modified:
+        return not_modified
+
+    try:
+        body = await render_tile(z, x, y, format, size, hazard_type.value if hazard_type else None, days)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return Response(
+        content=body,
+        media_type="image/png" if format == "png" else "application/json",
+        headers={key: value for key, value in response.headers.items() if key != "content-length"}
+    )
+
+
 @app.get(
     "/api/reports/{report_id}",
     response_model=UserReportResponse,
     summary="Get a specific user report by ID"
 )
-async def get_user_report_endpoint(report_id: str):
+async def get_user_report_endpoint(
+    report_id: str,
+    x_causal_token: Optional[str] = Header(None, description="Causal token from creating the report")
+):
     """Get a specific user report by its ID."""
     try:
         # Try to get from database first
-        report = await get_user_report(report_id)
+        report = await get_user_report(report_id, x_causal_token)
         if report:
             return report
     except Exception as e:
@@ -354,21 +697,170 @@ async def get_user_report_endpoint(report_id: str):
     )
 
 
-# Social Media Endpoints
+@app.patch(
+    "/api/reports/bulk",
+    response_model=BulkModerationResponse,
+    summary="Moderate many reports in one request",
+    dependencies=[Depends(require_role("admin", "moderator"))]
+)
+async def bulk_moderate_reports_endpoint(request: BulkModerationRequest):
+    """Apply status/verification updates to listed reports and/or a filter."""
+    if not request.items and not request.filter:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="Provide items, or a filter with an update"
+        )
+    if request.filter and (request.update is None or not request.update.model_dump(exclude_none=True)):
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="A filter requires a non-empty update"
+        )
+    if request.filter and not request.filter.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail="A filter needs at least one criterion"
+        )
+
+    response = BulkModerationResponse()
+    try:
+        if request.items:
+            response.results = await user_reports_crud.bulk_moderate(request.items)
+            for item_result in response.results:
+                if item_result.result == "updated":
+                    response.updated += 1
+                elif item_result.result == "conflict":
+                    response.conflicts += 1
+                elif item_result.result == "not_found":
+                    response.not_found += 1
+
+        if request.filter:
+            report_filter = request.filter
+            filters = user_reports_crud.build_filters(
+                report_filter.status, report_filter.hazard_type, report_filter.severity, report_filter.location
+            )
+            if report_filter.older_than_days is not None:
+                filters["timestamp"] = {"$lt": datetime.utcnow() - timedelta(days=report_filter.older_than_days)}
+            counts = await user_reports_crud.moderate_by_filter(filters, request.update)
+            response.filter_matched = counts["matched"]
+            response.filter_modified = counts["modified"]
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return response
+
+
 @app.get(
-    "/api/social",
-    response_model=SocialPostListResponse,
-    summary="Get social media posts with optional filters"
+    "/api/reports/{report_id}/related",
+    response_model=RelatedPostsResponse,
+    summary="Get social posts related to a user report"
 )
-async def get_social_posts(
-    skip: int = Query(0, ge=0, description="Number of posts to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of posts to return"),
-    platform: Optional[SocialPlatform] = Query(None, description="Filter by platform"),
-    sentiment: Optional[SentimentType] = Query(None, description="Filter by sentiment"),
-    location: Optional[str] = Query(None, description="Filter by location")
+async def get_report_related_posts_endpoint(report_id: str):
+    """Get the social posts linked to a report at ingest."""
+    try:
+        post_ids = await user_reports_crud.get_related_post_ids(report_id)
+        if post_ids is None:
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail="Report not found"
+            )
+        posts = await social_posts_crud.get_posts_by_ids(list(reversed(post_ids)))
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return RelatedPostsResponse(report_id=report_id, posts=posts)
+
+
+# Incident Endpoints
+@app.get(
+    "/api/incidents",
+    response_model=IncidentListResponse,
+    summary="Get incidents clustered from user reports"
+)
+async def get_incidents_endpoint(
+    skip: int = Query(0, ge=0, description="Number of incidents to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of incidents to return"),
+    hazard_type: Optional[CoastalHazardType] = Query(None, description="Filter by hazard type"),
+    min_severity: Optional[SeverityLevel] = Query(None, description="Only incidents reaching this severity"),
+    since: Optional[datetime] = Query(None, description="Only incidents active at or after this time (UTC)")
 ):
-    """Get social media posts with filtering and pagination."""
-    # Mock data matching frontend requirements
+    """Get incidents, most recently active first."""
+    try:
+        incidents = await incidents_crud.get_incidents(skip, limit, hazard_type, min_severity, since)
+        total_count = await incidents_crud.count(
+            incidents_crud.build_filters(hazard_type, min_severity, since),
+            secondary=True
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+    return IncidentListResponse(
+        incidents=incidents,
+        total=total_count,
+        page=(skip // limit) + 1,
+        limit=limit
+    )
+
+
+@app.get(
+    "/api/incidents/{incident_id}",
+    response_model=IncidentResponse,
+    summary="Get a specific incident by ID"
+)
+async def get_incident_endpoint(incident_id: str):
+    """Get a specific incident by its ID."""
+    try:
+        incident = await incidents_crud.get_incident(incident_id)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    if incident:
+        return incident
+
+    raise HTTPException(
+        status_code=http_status.HTTP_404_NOT_FOUND,
+        detail="Incident not found"
+    )
+
+
+# Social Media Endpoints
+async def load_social_posts(
+    skip: int = 0,
+    limit: int = 100,
+    platform: Optional[SocialPlatform] = None,
+    sentiment: Optional[SentimentType] = None,
+    location: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> SocialPostListResponse:
+    """Load a page of social posts, falling back to mock data without a database."""
+    if get_database() is not None:
+        try:
+            # An empty page is a real answer; only a failing database falls back
+            posts = await social_posts_crud.get_posts(
+                skip, limit, platform, sentiment, location, since, until
+            )
+            total_count = await social_posts_crud.count_posts(
+                platform, sentiment, location, since, until
+            )
+            return SocialPostListResponse(
+                posts=posts,
+                total=total_count,
+                page=(skip // limit) + 1,
+                limit=limit
+            )
+        except Exception as e:
+            print(f"Database error, falling back to mock data: {e}")
+
+    # Fallback to mock data if database is not available
     from app.models import SocialEngagement
 
     mock_posts = [
@@ -430,14 +922,65 @@ async def get_social_posts(
     )
 
 
-# Trending Hashtags Endpoint
 @app.get(
-    "/api/trending",
-    response_model=TrendingHashtagListResponse,
-    summary="Get trending hashtags"
+    "/api/social",
+    response_model=SocialPostListResponse,
+    summary="Get social media posts with optional filters"
 )
-async def get_trending_hashtags():
-    """Get current trending hashtags related to coastal monitoring."""
+async def get_social_posts(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0, description="Number of posts to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of posts to return"),
+    platform: Optional[SocialPlatform] = Query(None, description="Filter by platform"),
+    sentiment: Optional[SentimentType] = Query(None, description="Filter by sentiment"),
+    location: Optional[str] = Query(None, description="Filter by location"),
+    since: Optional[datetime] = Query(None, description="Only posts at or after this time (UTC)"),
+    until: Optional[datetime] = Query(None, description="Only posts at or before this time (UTC)")
+):
+    """Get social media posts with filtering and pagination."""
+    not_modified = await check_not_modified(request, response, ["social_posts"])
+    if not_modified:
+        return not_modified
+
+    return await load_social_posts(skip, limit, platform, sentiment, location, since, until)
+
+
+@app.get(
+    "/api/social/{post_id}/related",
+    response_model=RelatedReportsResponse,
+    summary="Get user reports related to a social post"
+)
+async def get_post_related_reports_endpoint(post_id: str):
+    """Get the user reports linked to a social post at ingest."""
+    try:
+        report_ids = await social_posts_crud.get_related_report_ids(post_id)
+        if report_ids is None:
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail="Post not found"
+            )
+        reports = await user_reports_crud.get_reports_by_ids(list(reversed(report_ids)))
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return RelatedReportsResponse(post_id=post_id, reports=reports)
+
+
+# Trending Hashtags Endpoint
+async def load_trending_hashtags(limit: int = 10) -> TrendingHashtagListResponse:
+    """Load trending hashtags, falling back to mock data without a database."""
+    try:
+        # Try to get from database first
+        hashtags = await trending_hashtags_crud.get_trending(limit)
+        if hashtags:
+            return TrendingHashtagListResponse(hashtags=hashtags)
+    except Exception as e:
+        print(f"Database error, falling back to mock data: {e}")
+
+    # Fallback to mock data if database is not available
     mock_hashtags = [
         TrendingHashtagResponse(
             _id="1",
@@ -476,7 +1019,194 @@ async def get_trending_hashtags():
         )
     ]
 
-    return TrendingHashtagListResponse(hashtags=mock_hashtags)
+    return TrendingHashtagListResponse(hashtags=mock_hashtags[:limit])
+
+
+@app.get(
+    "/api/trending",
+    response_model=TrendingHashtagListResponse,
+    summary="Get trending hashtags"
+)
+async def get_trending_hashtags(request: Request, response: Response):
+    """Get current trending hashtags related to coastal monitoring."""
+    not_modified = await check_not_modified(request, response, ["trending_hashtags"])
+    if not_modified:
+        return not_modified
+
+    return await load_trending_hashtags()
+
+
+# Authentication Endpoints
+@app.post(
+    "/api/auth/register",
+    response_model=UserResponse,
+    status_code=http_status.HTTP_201_CREATED,
+    summary="Register a new reporter account"
+)
+async def register_endpoint(user: UserCreate):
+    """Register a user; new accounts always get the reporter role."""
+    user = user.model_copy(update={"role": "reporter"})
+    try:
+        user_id = await user_crud.create_user(user)
+        created = await user_crud.get_user(user_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return created
+
+
+@app.post(
+    "/api/auth/login",
+    response_model=TokenResponse,
+    summary="Exchange a username and password for an access token"
+)
+async def login_endpoint(credentials: LoginRequest):
+    """Verify credentials and issue a signed access token."""
+    try:
+        user = await user_crud.authenticate(credentials.username, credentials.password)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    if user is None:
+        raise HTTPException(
+            status_code=http_status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid username or password"
+        )
+    issued = issue_token(user.id, user.username, user.role)
+    return TokenResponse(
+        access_token=issued["token"],
+        expires_at=datetime(1970, 1, 1) + timedelta(seconds=issued["claims"]["exp"])
+    )
+
+
+@app.post(
+    "/api/auth/logout",
+    response_model=StandardResponse,
+    summary="Revoke the current access token"
+)
+async def logout_endpoint(claims: dict = Depends(require_user)):
+    """Revoke the bearer token used for this request."""
+    await token_verifier.revoke(claims)
+    return StandardResponse(message="Logged out")
+
+
+@app.get(
+    "/api/auth/me",
+    response_model=AuthenticatedUser,
+    summary="Get the user of the current access token"
+)
+async def me_endpoint(claims: dict = Depends(require_user)):
+    """Get the identity carried by the bearer token, without a database lookup."""
+    return AuthenticatedUser(id=claims["sub"], username=claims["username"], role=claims["role"])
+
+
+# Alert Endpoints
+@app.post(
+    "/api/alerts/subscriptions",
+    response_model=AlertSubscriptionResponse,
+    status_code=http_status.HTTP_201_CREATED,
+    summary="Subscribe to alerts for an area"
+)
+async def create_alert_subscription_endpoint(
+    subscription: AlertSubscriptionCreate,
+    claims: dict = Depends(require_user)
+):
+    """Get alerted about critical reports and verified tsunamis or storm surges inside an area."""
+    try:
+        return await alert_engine.subscribe(claims["sub"], subscription)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+
+@app.get(
+    "/api/alerts/subscriptions",
+    response_model=List[AlertSubscriptionResponse],
+    summary="Get the current user's alert subscriptions"
+)
+async def get_alert_subscriptions_endpoint(claims: dict = Depends(require_user)):
+    """Get the current user's active alert subscriptions, newest first."""
+    try:
+        return await alert_engine.list_subscriptions(claims["sub"])
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+
+@app.delete(
+    "/api/alerts/subscriptions/{subscription_id}",
+    response_model=StandardResponse,
+    summary="Remove an alert subscription"
+)
+async def delete_alert_subscription_endpoint(subscription_id: str, claims: dict = Depends(require_user)):
+    """Stop alerts for one of the current user's subscriptions."""
+    try:
+        removed = await alert_engine.unsubscribe(claims["sub"], subscription_id)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    if not removed:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail="Subscription not found"
+        )
+    return StandardResponse(message="Subscription removed")
+
+
+# Admin Endpoints
+@app.get(
+    "/api/admin/profiles",
+    summary="List captured request profiles",
+    dependencies=[Depends(require_admin_token)]
+)
+async def list_profiles():
+    """List captured request profiles, newest first."""
+    return {"profiles": profile_store.list()}
+
+
+@app.get(
+    "/api/admin/profiles/{profile_id}",
+    summary="Download a request profile as folded stacks",
+    dependencies=[Depends(require_admin_token)]
+)
+async def download_profile(profile_id: str):
+    """Download a profile in collapsed-stack format for flamegraph.pl or speedscope."""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, media_type="text/plain", filename=path.name)
+
+
+@app.get(
+    "/api/admin/metrics",
+    summary="Get request coalescing, admission and alert metrics",
+    dependencies=[Depends(require_admin_token)]
+)
+async def get_admin_metrics():
+    """Get single-flight coalescing counts, admission lane usage and alert delivery counts."""
+    return {
+        "singleflight": single_flight.metrics(),
+        "admission": admission_controller.metrics(),
+        "alerts": alert_engine.metrics()
+    }
 
 
 # Development server
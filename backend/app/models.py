@@ -2,7 +2,7 @@
 Pydantic models for OceanEye coastal monitoring application.
 Models designed to match frontend Dashboard component requirements.
 """
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -141,6 +141,80 @@ class UserReportResponse(UserReportBase):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     status: ReportStatus = Field(default=ReportStatus.PENDING)
     updated_at: Optional[datetime] = None
+    incident_id: Optional[str] = Field(default=None, description="Incident this report was clustered into")
+    district: Optional[str] = Field(default=None, description="District resolved from coordinates")
+    state: Optional[str] = Field(default=None, description="State resolved from coordinates")
+
+    model_config = {
+        "populate_by_name": True,
+        "json_encoders": {
+            datetime: lambda v: v.isoformat()
+        }
+    }
+
+
+# Moderation Models
+class ModerationUpdate(BaseModel):
+    """Moderation fields that can be changed on a report."""
+    status: Optional[ReportStatus] = None
+    verified: Optional[bool] = None
+
+
+class BulkModerationItem(ModerationUpdate):
+    """One report to moderate in a bulk request."""
+    id: str = Field(..., description="Report ID")
+    expected_updated_at: Optional[datetime] = Field(
+        default=None,
+        description="Only apply if the report's updated_at still equals this value (null for never updated)"
+    )
+
+
+class BulkModerationFilter(BaseModel):
+    """Selects reports to moderate server-side."""
+    status: Optional[ReportStatus] = None
+    hazard_type: Optional[CoastalHazardType] = None
+    severity: Optional[SeverityLevel] = None
+    location: Optional[str] = None
+    older_than_days: Optional[int] = Field(default=None, ge=0, description="Only reports created more than N days ago")
+
+
+class BulkModerationRequest(BaseModel):
+    """Bulk moderation by explicit items, by filter, or both."""
+    items: List[BulkModerationItem] = Field(default_factory=list, max_length=5000)
+    filter: Optional[BulkModerationFilter] = None
+    update: Optional[ModerationUpdate] = Field(default=None, description="Update applied to every report matching filter")
+
+
+class BulkModerationItemResult(BaseModel):
+    """Outcome of one bulk moderation item."""
+    id: str
+    result: str = Field(..., description="updated, conflict, not_found or invalid")
+
+
+class BulkModerationResponse(BaseModel):
+    """Response model for bulk moderation."""
+    results: List[BulkModerationItemResult] = Field(default_factory=list)
+    updated: int = 0
+    conflicts: int = 0
+    not_found: int = 0
+    filter_matched: int = 0
+    filter_modified: int = 0
+
+
+# Incident Models
+class IncidentResponse(BaseModel):
+    """Model for incidents that group duplicate user reports of one event."""
+    id: str = Field(..., alias="_id")
+    type: CoastalHazardType = Field(..., description="Type of coastal hazard")
+    coordinates: List[float] = Field(..., description="Centroid [latitude, longitude] of member reports")
+    location: str = Field(..., description="Location of the first report")
+    district: Optional[str] = None
+    state: Optional[str] = None
+    report_count: int = Field(..., description="Number of reports in the incident", ge=0)
+    severity_counts: Dict[str, int] = Field(default_factory=dict, description="Report counts per severity level")
+    max_severity: SeverityLevel = Field(default=SeverityLevel.LOW)
+    first_seen: datetime
+    last_seen: datetime
 
     model_config = {
         "populate_by_name": True,
@@ -183,6 +257,9 @@ class SocialPostResponse(SocialPostBase):
     id: str = Field(..., alias="_id")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     processed_at: Optional[datetime] = None
+    coordinates: Optional[List[float]] = Field(default=None, description="[latitude, longitude] resolved from location")
+    district: Optional[str] = Field(default=None, description="District resolved from location")
+    state: Optional[str] = Field(default=None, description="State resolved from location")
 
     model_config = {
         "populate_by_name": True,
@@ -256,6 +333,83 @@ class UserResponse(UserBase):
     model_config = {"populate_by_name": True}
 
 
+class LoginRequest(BaseModel):
+    """Model for login requests."""
+    username: str
+    password: str
+
+
+class TokenResponse(BaseModel):
+    """Model for issued access tokens."""
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: datetime
+
+
+class AuthenticatedUser(BaseModel):
+    """Identity carried by an access token."""
+    id: str
+    username: str
+    role: str
+
+
+# Alert Models
+def _check_point(point: List[float]) -> List[float]:
+    if len(point) != 2:
+        raise ValueError('Points must be [latitude, longitude]')
+    lat, lng = point
+    if not (-90 <= lat <= 90):
+        raise ValueError('Latitude must be between -90 and 90')
+    if not (-180 <= lng <= 180):
+        raise ValueError('Longitude must be between -180 and 180')
+    return point
+
+
+class AlertArea(BaseModel):
+    """Area of interest: a circle (center and radius_km) or a polygon."""
+    center: Optional[List[float]] = Field(default=None, description="[latitude, longitude] of a circle")
+    radius_km: Optional[float] = Field(default=None, gt=0, le=500, description="Radius of a circle in km")
+    polygon: Optional[List[List[float]]] = Field(
+        default=None, min_length=3, max_length=500, description="Polygon ring of [latitude, longitude] points"
+    )
+
+    @field_validator('center')
+    @classmethod
+    def validate_center(cls, v):
+        return v if v is None else _check_point(v)
+
+    @field_validator('polygon')
+    @classmethod
+    def validate_polygon(cls, v):
+        return v if v is None else [_check_point(point) for point in v]
+
+    @model_validator(mode='after')
+    def validate_shape(self):
+        is_circle = self.center is not None and self.radius_km is not None
+        is_polygon = self.polygon is not None
+        if is_circle == is_polygon:
+            raise ValueError('Give either center and radius_km, or polygon')
+        return self
+
+
+class AlertSubscriptionCreate(BaseModel):
+    """Model for creating alert subscriptions."""
+    name: str = Field(..., min_length=1, max_length=100)
+    area: AlertArea
+    hazard_types: Optional[List[CoastalHazardType]] = Field(
+        default=None, description="Only alert for these hazard types; all when empty"
+    )
+
+
+class AlertSubscriptionResponse(AlertSubscriptionCreate):
+    """Model for alert subscription responses."""
+    id: str = Field(..., alias="_id")
+    user_id: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    model_config = {"populate_by_name": True}
+
+
 # Response wrapper models
 class UserReportListResponse(BaseModel):
     """Response model for list of user reports."""
@@ -265,6 +419,24 @@ class UserReportListResponse(BaseModel):
     limit: int
 
 
+class ReportChangesResponse(BaseModel):
+    """Response model for report delta sync."""
+    changed: List[UserReportResponse] = Field(..., description="Reports created or updated since the token")
+    deleted: List[str] = Field(..., description="IDs of reports deleted since the token")
+    next_token: str = Field(..., description="Pass as since to get the following changes")
+    has_more: bool = Field(..., description="More changes are waiting; request again with next_token")
+    reset: bool = Field(False, description="The token is too old; drop local reports and sync from scratch")
+    retry_after: Optional[float] = Field(None, description="Seconds to wait before requesting again, when none of the changes have settled")
+
+
+class IncidentListResponse(BaseModel):
+    """Response model for list of incidents."""
+    incidents: List[IncidentResponse]
+    total: int
+    page: int
+    limit: int
+
+
 class SocialPostListResponse(BaseModel):
     """Response model for list of social posts."""
     posts: List[SocialPostResponse]
@@ -273,11 +445,52 @@ class SocialPostListResponse(BaseModel):
     limit: int
 
 
+class RelatedPostsResponse(BaseModel):
+    """Response model for social posts related to a report."""
+    report_id: str
+    posts: List[SocialPostResponse]
+
+
+class RelatedReportsResponse(BaseModel):
+    """Response model for user reports related to a social post."""
+    post_id: str
+    reports: List[UserReportResponse]
+
+
 class TrendingHashtagListResponse(BaseModel):
     """Response model for list of trending hashtags."""
     hashtags: List[TrendingHashtagResponse]
 
 
+class DashboardBundleSection(BaseModel):
+    """A list section of the dashboard bundle."""
+    items: List[Dict[str, Any]]
+    total: int
+
+
+class DashboardBundleResponse(BaseModel):
+    """Response model combining the dashboard sections in one payload."""
+    stats: Optional[DashboardStats] = None
+    reports: Optional[DashboardBundleSection] = None
+    social: Optional[DashboardBundleSection] = None
+    trending: Optional[DashboardBundleSection] = None
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class TimeseriesBucket(BaseModel):
+    """Report counts of one time bucket."""
+    bucket_start: datetime
+    total: int
+    counts: Dict[str, int] = Field(default_factory=dict, description="Counts per value of the requested dimension")
+
+
+class TimeseriesResponse(BaseModel):
+    """Response model for report time series."""
+    granularity: str
+    dimension: Optional[str] = None
+    buckets: List[TimeseriesBucket]
+
+
 class StandardResponse(BaseModel):
     """Standard API response model."""
     success: bool = True
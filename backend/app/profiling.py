@@ -0,0 +1,211 @@
+"""
+Opt-in sampling profiler for diagnosing slow requests in production.
+
+A request is profiled when it carries an X-Profile header equal to
+PROFILE_ADMIN_TOKEN, or at random with probability PROFILE_SAMPLE_RATE.
+While it runs, a background thread samples the stacks of every thread (the
+event loop thread for Pydantic/serialization work, Motor's executor threads
+for Mongo I/O) and the folded stacks are written to PROFILE_DIR in the
+collapsed format understood by flamegraph.pl and speedscope. Only the newest
+PROFILE_MAX_FILES profiles are kept.
+"""
+import asyncio
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Header, HTTPException, status as http_status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+
+# Profiled requests running at once; more are served without profiling
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+
+_SLUG_RE = re.compile(r"[^A-Za-z0-9]+")
+_PROFILE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def _frame_label(code) -> str:
+    """Label a code object as function (module path:line)."""
+    filename = code.co_filename
+    for marker in ("site-packages/", "backend/"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples all thread stacks on a background thread into folded counts."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while True:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+            if self._stop.wait(self.interval):
+                break
+
+    def folded(self) -> str:
+        """Render samples as collapsed stacks, one "stack count" per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """Bounded on-disk ring of captured profiles."""
+
+    def __init__(self, directory: Path = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(self, profile_id: str, folded: str, metadata: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.folded").write_text(folded)
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+        self._trim()
+
+    def _trim(self):
+        # Profile ids start with their timestamp, so names sort oldest first
+        metadata_files = sorted(self.directory.glob("*.json"))
+        for path in metadata_files[:max(0, len(metadata_files) - self.max_files)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        """List profile metadata, newest first."""
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id: str) -> Optional[Path]:
+        """Get the folded stacks file of a profile, if it exists."""
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.folded"
+        return path if path.exists() else None
+
+
+# Global profile store
+profile_store = ProfileStore()
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against PROFILE_ADMIN_TOKEN in constant time."""
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding the profile admin routes."""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=http_status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles triggered or sampled requests."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        store: Optional[ProfileStore] = None
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.store = store or profile_store
+        self._slots = threading.BoundedSemaphore(PROFILE_MAX_CONCURRENT)
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if is_admin_token(Headers(scope=scope).get("x-profile")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._slots.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = datetime.utcnow()
+        profile_id = f"{started_at:%Y%m%dT%H%M%S%f}-{scope['method']}-{_SLUG_RE.sub('_', scope['path']).strip('_')}"
+        response_status: Dict[str, int] = {}
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                response_status["status"] = message["status"]
+                MutableHeaders(raw=message["headers"])["X-Profile-Id"] = profile_id
+            await send(message)
+
+        sampler = StackSampler()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            metadata = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": response_status.get("status"),
+                "started_at": started_at.isoformat(),
+                "duration_ms": round(duration_ms, 2),
+                "samples": sum(sampler.samples.values()),
+                "interval_ms": sampler.interval * 1000,
+            }
+            try:
+                await asyncio.to_thread(self.store.save, profile_id, sampler.folded(), metadata)
+            except OSError as e:
+                print(f"Failed to save profile {profile_id}: {e}")
+            finally:
+                self._slots.release()
@@ -0,0 +1,332 @@
+"""
+Pre-aggregated time-series rollups of user reports.
+
+Every report write upserts one bucket document per granularity (minute, hour,
+day) in the report_rollups collection, incrementing the total and per-value
+counts of each dimension (type, severity, status, state). Status and field
+changes move counts between values, so trend queries only read bucket
+documents and never aggregate over user_reports.
+
+Rebuild buckets from existing reports with:
+
+    python -m app.rollups backfill [--days N]
+
+The backfill deletes the buckets of the range before recounting them, so
+report writes must be stopped while it runs; reports written in between
+are counted twice or not at all. Bucketing on the server uses $dateTrunc,
+which needs MongoDB 5.0 or later.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.db import get_database, secondary_preferred
+from app.schema import ENUM_FIELDS, decode_value
+
+ROLLUPS_COLLECTION = "report_rollups"
+
+GRANULARITIES = ("minute", "hour", "day")
+
+# Report fields counted per bucket, stored under by_<dimension>
+DIMENSIONS = ("type", "severity", "status", "state")
+
+# Minute buckets expire after this long through a TTL index
+MINUTE_RETENTION_HOURS = int(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def get_rollups_collection():
+    """Get the rollups collection."""
+    database = get_database()
+    if database is None:
+        raise RuntimeError("Database not connected")
+    return database.get_collection(ROLLUPS_COLLECTION)
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its bucket."""
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_id(timestamp: datetime, granularity: str) -> str:
+    """Get the _id of the bucket document holding a timestamp."""
+    return f"{granularity}:{bucket_start(timestamp, granularity):%Y-%m-%dT%H:%M}"
+
+
+def _value(value) -> Optional[str]:
+    """Get the stored string of an enum or plain value."""
+    if value is None:
+        return None
+    return str(getattr(value, "value", value))
+
+
+def _bucket_upsert(granularity: str, start: datetime, increments: Dict[str, int]) -> UpdateOne:
+    """Build the upsert applying increments to one bucket document."""
+    on_insert = {"granularity": granularity, "bucket_start": start}
+    if granularity == "minute":
+        on_insert["expires_at"] = start + timedelta(hours=MINUTE_RETENTION_HOURS)
+    return UpdateOne(
+        {"_id": bucket_id(start, granularity)},
+        {"$inc": increments, "$setOnInsert": on_insert},
+        upsert=True
+    )
+
+
+def _bucket_updates(timestamp: datetime, increments: Dict[str, int]) -> List[UpdateOne]:
+    """Build one upsert per granularity applying increments to a bucket."""
+    return [
+        _bucket_upsert(granularity, bucket_start(timestamp, granularity), increments)
+        for granularity in GRANULARITIES
+    ]
+
+
+def report_increments(report_data: dict, sign: int = 1) -> Dict[str, int]:
+    """Get the counter increments contributed by one report."""
+    increments = {"total": sign}
+    for dimension in DIMENSIONS:
+        value = _value(report_data.get(dimension))
+        if value is not None:
+            increments[f"by_{dimension}.{value}"] = sign
+    return increments
+
+
+def change_increments(before: dict, after: dict) -> Dict[str, int]:
+    """Get the increments that move a report's counts from old to new values."""
+    increments: Dict[str, int] = {}
+    for dimension in DIMENSIONS:
+        if dimension not in after:
+            continue
+        old, new = _value(before.get(dimension)), _value(after[dimension])
+        if old == new:
+            continue
+        if old is not None:
+            increments[f"by_{dimension}.{old}"] = increments.get(f"by_{dimension}.{old}", 0) - 1
+        if new is not None:
+            increments[f"by_{dimension}.{new}"] = increments.get(f"by_{dimension}.{new}", 0) + 1
+    return increments
+
+
+async def record_report(report_data: dict, sign: int = 1):
+    """Count a created (sign=1) or deleted (sign=-1) report."""
+    await get_rollups_collection().bulk_write(
+        _bucket_updates(report_data["timestamp"], report_increments(report_data, sign)),
+        ordered=False
+    )
+
+
+async def record_change(before: dict, after: dict):
+    """Move a report's counts after its status or fields changed.
+
+    before is the stored report prior to the update (it must include
+    timestamp) and after holds the updated fields.
+    """
+    increments = change_increments(before, after)
+    if increments and before.get("timestamp"):
+        await get_rollups_collection().bulk_write(
+            _bucket_updates(before["timestamp"], increments),
+            ordered=False
+        )
+
+
+async def record_changes(changes: List[Tuple[dict, dict]]):
+    """Move counts for many changed reports with one bulk_write."""
+    merged: Dict[Tuple[str, datetime], Dict[str, int]] = {}
+    for before, after in changes:
+        increments = change_increments(before, after)
+        if not increments or not before.get("timestamp"):
+            continue
+        for granularity in GRANULARITIES:
+            bucket = merged.setdefault((granularity, bucket_start(before["timestamp"], granularity)), {})
+            for field, delta in increments.items():
+                bucket[field] = bucket.get(field, 0) + delta
+    updates = [
+        _bucket_upsert(granularity, start, increments)
+        for (granularity, start), increments in merged.items()
+    ]
+    if updates:
+        await get_rollups_collection().bulk_write(updates, ordered=False)
+
+
+async def plan_bulk_change(reports_collection, filters: dict, after: dict) -> Tuple[List[UpdateOne], Optional[int]]:
+    """Group the count moves of an update_many before it runs.
+
+    Counts are grouped server-side per bucket and old value, so no report
+    documents are fetched; filters must already match stored reports.
+    Returns the bucket updates, to write with record_bulk_change once the
+    update_many has succeeded, and the number of reports grouped, to check
+    against its matched count, or None when no counted field changes.
+    Needs MongoDB 5.0+ for $dateTrunc.
+    """
+    dimensions = [dimension for dimension in DIMENSIONS if dimension in after]
+    if not dimensions:
+        return [], None
+    updates = []
+    grouped = 0
+    for granularity in GRANULARITIES:
+        pipeline = [
+            {"$match": filters},
+            {"$group": {
+                "_id": {
+                    "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": granularity}},
+                    **{dimension: f"${dimension}" for dimension in dimensions}
+                },
+                "count": {"$sum": 1}
+            }}
+        ]
+        async for group in reports_collection.aggregate(pipeline):
+            if granularity == GRANULARITIES[0]:
+                grouped += group["count"]
+            before = {dimension: decode_value(dimension, group["_id"].get(dimension)) for dimension in dimensions}
+            increments = {
+                field: delta * group["count"]
+                for field, delta in change_increments(before, after).items()
+            }
+            if not increments:
+                continue
+            updates.append(_bucket_upsert(granularity, group["_id"]["bucket"], increments))
+    return updates, grouped
+
+
+async def record_bulk_change(updates: List[UpdateOne]):
+    """Write the count moves planned by plan_bulk_change."""
+    if updates:
+        await get_rollups_collection().bulk_write(updates, ordered=False)
+
+
+async def create_rollup_indexes():
+    """Create the rollup query and retention indexes."""
+    collection = get_rollups_collection()
+    await collection.create_index([("granularity", 1), ("bucket_start", 1)])
+    await collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
+
+
+async def get_timeseries(
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    dimension: Optional[str] = None
+) -> List[dict]:
+    """Read bucket documents in [start, end] for one granularity."""
+    projection = {"bucket_start": 1, "total": 1}
+    if dimension:
+        projection[f"by_{dimension}"] = 1
+    # Trend charts tolerate a little replication lag
+    cursor = secondary_preferred(get_rollups_collection()).find(
+        {
+            "granularity": granularity,
+            "bucket_start": {"$gte": bucket_start(start, granularity), "$lte": end}
+        },
+        projection
+    ).sort("bucket_start", 1)
+    buckets = []
+    async for doc in cursor:
+        counts = doc.get(f"by_{dimension}", {}) if dimension else {}
+        buckets.append({
+            "bucket_start": doc["bucket_start"],
+            "total": doc.get("total", 0),
+            # Values moved away from leave zero counters behind
+            "counts": {value: n for value, n in counts.items() if n}
+        })
+    return buckets
+
+
+# Backfill
+
+async def backfill(since: Optional[datetime] = None) -> int:
+    """Rebuild rollups from user_reports with server-side aggregations.
+
+    Not safe against concurrent report writes: run it with writes stopped.
+    Needs MongoDB 5.0+ for $dateTrunc.
+    """
+    database = get_database()
+    if database is None:
+        raise RuntimeError("Database not connected")
+    reports = database.get_collection("user_reports")
+    rollups = get_rollups_collection()
+
+    now = datetime.utcnow()
+    written = 0
+    for granularity in GRANULARITIES:
+        start = since
+        if granularity == "minute":
+            minute_cutoff = now - timedelta(hours=MINUTE_RETENTION_HOURS)
+            start = max(start, minute_cutoff) if start else minute_cutoff
+        match = {"timestamp": {"$gte": bucket_start(start, granularity)}} if start else {}
+
+        range_filter = {"granularity": granularity}
+        if start:
+            range_filter["bucket_start"] = {"$gte": bucket_start(start, granularity)}
+        await rollups.delete_many(range_filter)
+
+        for dimension in (None, *DIMENSIONS):
+            pipeline = [
+                {"$match": match},
+                {"$group": {
+                    "_id": {
+                        "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": granularity}},
+                        "value": f"${dimension}" if dimension else None
+                    },
+                    "count": {"$sum": 1}
+                }}
+            ]
+            updates = []
+            async for group in reports.aggregate(pipeline, allowDiskUse=True):
+                start_of_bucket = group["_id"]["bucket"]
+                value = group["_id"]["value"]
+                if dimension and value is None:
+                    continue
+                if dimension in ENUM_FIELDS:
+                    value = decode_value(dimension, value)
+                field = f"by_{dimension}.{value}" if dimension else "total"
+                on_insert = {"granularity": granularity, "bucket_start": start_of_bucket}
+                if granularity == "minute":
+                    on_insert["expires_at"] = start_of_bucket + timedelta(hours=MINUTE_RETENTION_HOURS)
+                # Coded and string values of one enum group separately, so counts add up
+                updates.append(UpdateOne(
+                    {"_id": bucket_id(start_of_bucket, granularity)},
+                    {"$inc": {field: group["count"]}, "$setOnInsert": on_insert},
+                    upsert=True
+                ))
+                if len(updates) >= BACKFILL_BATCH_SIZE:
+                    await rollups.bulk_write(updates, ordered=False)
+                    written += len(updates)
+                    updates = []
+            if updates:
+                await rollups.bulk_write(updates, ordered=False)
+                written += len(updates)
+    return written
+
+
+async def _main():
+    from app.db import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="OceanEye report rollups")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subcommands.add_parser("backfill", help="Rebuild rollups from user_reports (stop report writes first)")
+    backfill_parser.add_argument("--days", type=int, default=None, help="Only rebuild the last N days")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        if args.command == "backfill":
+            since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+            await create_rollup_indexes()
+            written = await backfill(since)
+            print(f"📊 Backfilled {written} rollup counters")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,338 @@
+"""
+Compact on-disk schema for user reports.
+
+Version 2 report documents store hazard type, severity and status as small
+integer codes, the location as a GeoJSON point ([longitude, latitude]) under
+"point" instead of a [latitude, longitude] "coordinates" list, and only the
+"timestamp" creation time (version 1 also kept an identical "created_at").
+Compact documents carry "v": 2; version 1 documents have no "v".
+
+The CRUD layer encodes documents and queries on the way in and decodes them
+on the way out, so the API models keep their enum strings and coordinates.
+Decoding works field by field and filters match both forms, so version 1
+and 2 documents can be served side by side while the migrator converts
+existing reports in batches:
+
+    python -m app.schema migrate [--collection user_reports] [--max-batches N]
+    python -m app.schema status [--collection user_reports]
+
+The migrator records its progress in schema_migrations, so an interrupted
+pass resumes after the last converted report.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.db import get_database
+from app.models import CoastalHazardType, ReportStatus, SeverityLevel
+
+SCHEMA_VERSION = 2
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+SCHEMA_MIGRATION_BATCH_SIZE = int(os.getenv("SCHEMA_MIGRATION_BATCH_SIZE", "500"))
+# Pause between batches to leave the primary room for live traffic
+SCHEMA_MIGRATION_BATCH_PAUSE_SECONDS = float(os.getenv("SCHEMA_MIGRATION_BATCH_PAUSE_SECONDS", "0.2"))
+
+# Stored codes are positions in these tuples; only ever append to them
+HAZARD_TYPES = (
+    "hurricane", "storm_surge", "flooding", "waterspout", "high_waves", "unusual_tide",
+    "tsunami", "earthquake", "landslide",
+    "coastal_erosion", "erosion", "sea_level_rise", "coastal_damage",
+    "oil_spill", "maritime_pollution", "plastic_debris", "debris", "ocean_noise_pollution",
+    "harmful_algal_bloom", "overfishing", "habitat_destruction", "dangerous_sea_creatures",
+    "ocean_warming", "ocean_acidification",
+    "shipping_accident",
+    "other",
+)
+SEVERITY_LEVELS = ("low", "medium", "high", "critical")
+REPORT_STATUSES = ("pending", "verified", "investigating", "resolved", "false_alarm")
+
+ENUM_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "type": HAZARD_TYPES,
+    "severity": SEVERITY_LEVELS,
+    "status": REPORT_STATUSES,
+}
+_CODES = {field: {value: code for code, value in enumerate(values)} for field, values in ENUM_FIELDS.items()}
+
+
+def _check_codes():
+    """Fail at import if an API enum has a value without a stored code."""
+    for field, enum in (("type", CoastalHazardType), ("severity", SeverityLevel), ("status", ReportStatus)):
+        missing = [member.value for member in enum if member.value not in _CODES[field]]
+        if missing:
+            raise RuntimeError(f"No stored code for {field} values {missing}; append them to ENUM_FIELDS['{field}']")
+
+
+_check_codes()
+
+# Version 1 coordinate paths and the point paths holding the same values
+COORDINATE_PATHS = {"coordinates.0": "point.coordinates.1", "coordinates.1": "point.coordinates.0"}
+
+
+def encode_value(field: str, value):
+    """Get the stored code of an enum field value; codes pass through."""
+    value = getattr(value, "value", value)
+    if value is None or isinstance(value, int):
+        return value
+    return _CODES[field][value]
+
+
+def decode_value(field: str, value) -> Optional[str]:
+    """Get the enum string of a stored enum field value of either version."""
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < len(ENUM_FIELDS[field]):
+        return ENUM_FIELDS[field][value]
+    return value
+
+
+def to_point(coordinates: List[float]) -> dict:
+    """Turn [latitude, longitude] into a GeoJSON point."""
+    lat, lng = coordinates
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+def encode_fields(data: dict) -> dict:
+    """Encode the enum and coordinate fields present in data."""
+    encoded = dict(data)
+    for field in ENUM_FIELDS:
+        if field in encoded:
+            encoded[field] = encode_value(field, encoded[field])
+    if encoded.get("coordinates") is not None:
+        encoded["point"] = to_point(encoded.pop("coordinates"))
+    return encoded
+
+
+def encode_report(report_data: dict) -> dict:
+    """Build the version 2 document to store for a report."""
+    document = encode_fields(report_data)
+    if "timestamp" in document:
+        document.pop("created_at", None)
+    document["v"] = SCHEMA_VERSION
+    return document
+
+
+def decode_report(document: Optional[dict]) -> Optional[dict]:
+    """Turn a stored report of either version back into API fields, in place."""
+    if document is None:
+        return None
+    document.pop("v", None)
+    for field in ENUM_FIELDS:
+        if field in document:
+            document[field] = decode_value(field, document[field])
+    point = document.pop("point", None)
+    if point:
+        lng, lat = point["coordinates"]
+        document["coordinates"] = [lat, lng]
+    return document
+
+
+def encode_update(update_data: dict) -> dict:
+    """Build the update document setting fields on a report of either version."""
+    update = {"$set": encode_fields(update_data)}
+    if "point" in update["$set"]:
+        # A version 1 report must not keep its old coordinates next to the point
+        update["$unset"] = {"coordinates": ""}
+    return update
+
+
+def encode_projection(projection: dict) -> dict:
+    """Add the stored point to a projection that asks for coordinates."""
+    if projection.get("coordinates"):
+        return {**projection, "point": 1}
+    return projection
+
+
+def _both_forms(field: str, value) -> list:
+    value = getattr(value, "value", value)
+    forms = [value]
+    if isinstance(value, str) and value in _CODES[field]:
+        forms.append(_CODES[field][value])
+    return forms
+
+
+def _encode_condition(field: str, condition):
+    if not isinstance(condition, dict):
+        return {"$in": _both_forms(field, condition)}
+    encoded = {}
+    for operator, operand in condition.items():
+        if operator in ("$in", "$nin"):
+            encoded[operator] = [form for value in operand for form in _both_forms(field, value)]
+        elif operator == "$eq":
+            encoded["$in"] = _both_forms(field, operand)
+        elif operator == "$ne":
+            encoded["$nin"] = _both_forms(field, operand)
+        else:
+            encoded[operator] = operand
+    return encoded
+
+
+def encode_filters(filters: dict) -> dict:
+    """Translate a reports query in API fields to match stored reports of either version."""
+    encoded = {}
+    coordinates = {}
+    for key, condition in filters.items():
+        if key in ("$and", "$or", "$nor"):
+            encoded[key] = [encode_filters(clause) for clause in condition]
+        elif key in ENUM_FIELDS:
+            encoded[key] = _encode_condition(key, condition)
+        elif key in COORDINATE_PATHS:
+            coordinates[key] = condition
+        else:
+            encoded[key] = condition
+    if coordinates:
+        either = [coordinates, {COORDINATE_PATHS[key]: condition for key, condition in coordinates.items()}]
+        if "$or" in encoded:
+            encoded = {"$and": [encoded, {"$or": either}]}
+        else:
+            encoded["$or"] = either
+    return encoded
+
+
+def migration_update(document: dict) -> Optional[UpdateOne]:
+    """Build the update converting one stored report to the current version.
+
+    The update only applies while the converted fields still hold the values
+    read, so a report changed in between is skipped rather than overwritten.
+    """
+    if document.get("v") == SCHEMA_VERSION:
+        return None
+    guard = {"_id": document["_id"]}
+    changes = {"v": SCHEMA_VERSION}
+    removed = {}
+    for field in ENUM_FIELDS:
+        if field in document:
+            guard[field] = document[field]
+            changes[field] = encode_value(field, decode_value(field, document[field]))
+    if document.get("coordinates") is not None:
+        guard["coordinates"] = document["coordinates"]
+        changes["point"] = to_point(document["coordinates"])
+        removed["coordinates"] = ""
+    if "created_at" in document:
+        if "timestamp" not in document:
+            changes["timestamp"] = document["created_at"]
+        removed["created_at"] = ""
+    update = {"$set": changes}
+    if removed:
+        update["$unset"] = removed
+    return UpdateOne(guard, update)
+
+
+def _get_collection(name: str):
+    database = get_database()
+    if database is None:
+        raise RuntimeError("Database not connected")
+    return database.get_collection(name)
+
+
+async def migrate_batch(
+    collection_name: str,
+    after_id: Optional[ObjectId],
+    batch_size: int = SCHEMA_MIGRATION_BATCH_SIZE
+) -> Tuple[Optional[ObjectId], int, int]:
+    """Convert the next batch of older reports after an ID.
+
+    Returns the last ID read (None when there are none left), the number of
+    reports converted and the number skipped because they changed meanwhile.
+    """
+    collection = _get_collection(collection_name)
+    query = {"v": {"$ne": SCHEMA_VERSION}}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    docs = await collection.find(query).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+    if not docs:
+        return None, 0, 0
+    operations = [update for update in map(migration_update, docs) if update is not None]
+    migrated = skipped = 0
+    if operations:
+        result = await collection.bulk_write(operations, ordered=False)
+        migrated = result.modified_count
+        skipped = len(operations) - result.matched_count
+    return docs[-1]["_id"], migrated, skipped
+
+
+async def migrate(
+    collection_name: str = "user_reports",
+    batch_size: int = SCHEMA_MIGRATION_BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> dict:
+    """Run or resume a migration pass over a reports collection, returning its checkpoint.
+
+    Reports skipped because they changed during the pass are picked up by
+    the next pass. Converting a report doesn't change what the API returns,
+    so it isn't stamped for delta sync and doesn't bump the collection version.
+    """
+    checkpoints = _get_collection(MIGRATIONS_COLLECTION)
+    checkpoint = await checkpoints.find_one({"_id": collection_name})
+    if checkpoint is None or checkpoint.get("completed_at") or checkpoint.get("version") != SCHEMA_VERSION:
+        checkpoint = {
+            "_id": collection_name,
+            "version": SCHEMA_VERSION,
+            "last_id": None,
+            "migrated": 0,
+            "skipped": 0,
+            "started_at": datetime.utcnow(),
+            "completed_at": None
+        }
+    else:
+        print(f"🗜️ Resuming {collection_name} migration after {checkpoint['last_id']} ({checkpoint['migrated']} converted)")
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        last_id, migrated, skipped = await migrate_batch(collection_name, checkpoint["last_id"], batch_size)
+        if last_id is None:
+            checkpoint["completed_at"] = datetime.utcnow()
+        else:
+            checkpoint["last_id"] = last_id
+        checkpoint["migrated"] += migrated
+        checkpoint["skipped"] += skipped
+        checkpoint["updated_at"] = datetime.utcnow()
+        await checkpoints.replace_one({"_id": collection_name}, checkpoint, upsert=True)
+        if checkpoint["completed_at"]:
+            break
+        batches += 1
+        await asyncio.sleep(SCHEMA_MIGRATION_BATCH_PAUSE_SECONDS)
+    return checkpoint
+
+
+async def count_outdated(collection_name: str = "user_reports") -> int:
+    """Count reports not yet on the current schema version."""
+    return await _get_collection(collection_name).count_documents({"v": {"$ne": SCHEMA_VERSION}})
+
+
+async def _main():
+    from app.db import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="OceanEye report schema migration")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subcommands.add_parser("migrate", help="Convert reports to the compact schema")
+    migrate_parser.add_argument("--collection", action="append", help="Collection to migrate (repeatable)")
+    migrate_parser.add_argument("--batch-size", type=int, default=SCHEMA_MIGRATION_BATCH_SIZE, help="Reports converted per batch")
+    migrate_parser.add_argument("--max-batches", type=int, default=None, help="Stop after N batches")
+    status_parser = subcommands.add_parser("status", help="Show migration checkpoints and reports left")
+    status_parser.add_argument("--collection", action="append", help="Collection to check (repeatable)")
+    args = parser.parse_args()
+    collection_names = args.collection or ["user_reports", "user_reports_archive"]
+
+    await connect_to_mongo()
+    try:
+        for collection_name in collection_names:
+            if args.command == "migrate":
+                checkpoint = await migrate(collection_name, args.batch_size, args.max_batches)
+                state = "done" if checkpoint["completed_at"] else "paused"
+                print(f"🗜️ {collection_name}: converted {checkpoint['migrated']}, "
+                      f"skipped {checkpoint['skipped']} changed meanwhile ({state})")
+            elif args.command == "status":
+                checkpoint = await _get_collection(MIGRATIONS_COLLECTION).find_one({"_id": collection_name})
+                print(f"🗜️ {collection_name} checkpoint: {checkpoint}")
+                print(f"🗜️ {await count_outdated(collection_name)} reports in {collection_name} below version {SCHEMA_VERSION}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,209 @@
+"""
+Batch sentiment classification for OceanEye social posts.
+
+Posts are tokenized into hashed token/bigram features and scored against a
+coastal-hazard lexicon with vectorized NumPy operations, so a whole batch is
+labelled without a Python loop over lexicon terms. Classification is CPU-only,
+runs on a process pool and writes labels back with one bulk_write per batch.
+
+Run the stage over all unprocessed posts with:
+
+    python -m app.sentiment
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from pymongo import UpdateOne
+
+from app.models import SentimentType
+
+# Size of the hashed feature space (power of two so hashes can be masked)
+N_FEATURES = 1 << 18
+FEATURE_MASK = N_FEATURES - 1
+
+BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "5000"))
+
+# Lexicon terms per label; bigrams are written with a single space
+LEXICON: Dict[SentimentType, List[str]] = {
+    SentimentType.URGENT: [
+        "urgent", "emergency", "evacuate", "evacuation", "evacuated", "sos",
+        "rescue", "trapped", "immediately", "breaking", "live", "tsunami",
+        "help needed", "red alert", "move inland", "emergency response",
+    ],
+    SentimentType.ADVISORY: [
+        "advised", "advisory", "advise", "bulletin", "forecast", "expected",
+        "authorities", "department", "fishermen", "warning", "issued", "imd",
+        "not to venture", "orange alert", "yellow alert", "until further",
+    ],
+    SentimentType.CAUTION: [
+        "caution", "careful", "beware", "dangerous", "avoid", "distance",
+        "safety", "safetyfirst", "precaution", "rough", "stay away",
+        "safe distance", "be careful", "please maintain",
+    ],
+    SentimentType.CONCERN: [
+        "worried", "concerned", "concern", "massive", "scary", "flooding",
+        "flooded", "damage", "damaged", "erosion", "rising", "unusual",
+        "destroyed", "stay safe", "oceanalert", "oil spill",
+    ],
+    SentimentType.POSITIVE: [
+        "beautiful", "calm", "thank", "thanks", "grateful", "relief",
+        "restored", "recovered", "reopened", "clean", "cleanup", "great",
+        "all clear", "safe now", "back to normal",
+    ],
+}
+
+# Label order doubles as tie-break priority (argmax keeps the first maximum)
+LABELS: List[SentimentType] = [
+    SentimentType.URGENT,
+    SentimentType.ADVISORY,
+    SentimentType.CAUTION,
+    SentimentType.CONCERN,
+    SentimentType.POSITIVE,
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into lowercase unigrams and adjacent-word bigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class SentimentClassifier:
+    """Lexicon classifier over hashed token count matrices.
+
+    Feature hashing uses Python's built-in string hash, which is salted per
+    process, so each worker process builds its own weight matrix.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[SentimentType, List[str]]] = None):
+        lexicon = lexicon or LEXICON
+        self.labels = np.array([label.value for label in LABELS], dtype=object)
+        self.weights = np.zeros((len(LABELS), N_FEATURES), dtype=np.float32)
+        for row, label in enumerate(LABELS):
+            for term in lexicon.get(label, []):
+                # Phrases count a little more than the single words they contain
+                weight = 1.5 if " " in term else 1.0
+                self.weights[row, hash(term) & FEATURE_MASK] = weight
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """Return an (n_texts, n_labels) score matrix for a batch."""
+        token_lists = [_tokenize(text) for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(texts))
+        features = np.fromiter(
+            (hash(token) & FEATURE_MASK for tokens in token_lists for token in tokens),
+            dtype=np.int64,
+            count=int(lengths.sum())
+        )
+        doc_ids = np.repeat(np.arange(len(texts)), lengths)
+
+        # Sparse (doc x feature) counts times the dense lexicon weights,
+        # reduced per label with bincount instead of materializing the matrix
+        scores = np.empty((len(texts), len(LABELS)), dtype=np.float32)
+        for row in range(len(LABELS)):
+            scores[:, row] = np.bincount(doc_ids, weights=self.weights[row, features], minlength=len(texts))
+        return scores
+
+    def classify(self, texts: Sequence[str]) -> List[str]:
+        """Label a batch of texts with SentimentType values."""
+        if not texts:
+            return []
+        scores = self.score(texts)
+        labels = self.labels[scores.argmax(axis=1)]
+        labels[scores.max(axis=1) <= 0] = SentimentType.NEUTRAL.value
+        return labels.tolist()
+
+
+# Per-process classifier, built lazily inside each pool worker
+_classifier: Optional[SentimentClassifier] = None
+
+
+def get_classifier() -> SentimentClassifier:
+    """Get the classifier of the current process."""
+    global _classifier
+    if _classifier is None:
+        _classifier = SentimentClassifier()
+    return _classifier
+
+
+def classify_texts(texts: List[str]) -> List[str]:
+    """Classify a batch in the current process (pool worker entry point)."""
+    return get_classifier().classify(texts)
+
+
+async def classify_bucket(
+    collection,
+    executor: ProcessPoolExecutor,
+    batch_size: int = BATCH_SIZE,
+    max_in_flight: int = 1
+) -> int:
+    """Label every unprocessed post of one social bucket collection."""
+    loop = asyncio.get_running_loop()
+    pending = set()
+    processed = 0
+
+    async def label_batch(batch: List[dict]) -> int:
+        labels = await loop.run_in_executor(executor, classify_texts, [doc["content"] for doc in batch])
+        processed_at = datetime.utcnow()
+        await collection.bulk_write(
+            [
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"sentiment": label, "processed_at": processed_at}})
+                for doc, label in zip(batch, labels)
+            ],
+            ordered=False
+        )
+        return len(batch)
+
+    batch = []
+    cursor = collection.find({"processed_at": None}, {"content": 1}).batch_size(batch_size)
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            pending.add(asyncio.ensure_future(label_batch(batch)))
+            batch = []
+            # Keep one batch per worker in flight while reading the next one
+            if len(pending) >= max_in_flight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                processed += sum(task.result() for task in done)
+    if batch:
+        pending.add(asyncio.ensure_future(label_batch(batch)))
+    if pending:
+        processed += sum(await asyncio.gather(*pending))
+    return processed
+
+
+async def run_sentiment_stage(batch_size: int = BATCH_SIZE, workers: Optional[int] = None) -> int:
+    """Label all unprocessed posts across the retained social buckets."""
+    from app.crud import social_posts_crud
+
+    workers = workers or os.cpu_count() or 1
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for day in await social_posts_crud.get_bucket_days():
+            total += await classify_bucket(social_posts_crud.get_bucket(day), executor, batch_size, workers)
+    if total:
+        await social_posts_crud.touch()
+    return total
+
+
+async def _main():
+    from app.db import connect_to_mongo, close_mongo_connection
+
+    await connect_to_mongo()
+    try:
+        started = datetime.utcnow()
+        total = await run_sentiment_stage()
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        print(f"🏷️  Classified {total} social posts in {elapsed:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,130 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+During an alert surge thousands of clients poll the same URLs at once. For
+the routes in SINGLEFLIGHT_PATHS, concurrent GET requests with the same
+normalized path and query parameters (and the same conditional and
+authorization headers) share one run of the endpoint: the first request
+computes the response and every request that arrives while it is in flight
+replays its serialized messages. Nothing is cached once the response is done.
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+SINGLEFLIGHT_PATHS = [
+    path.strip()
+    for path in os.getenv(
+        "SINGLEFLIGHT_PATHS",
+        "/api/reports,/api/social,/api/trending,/api/dashboard/stats,/api/dashboard/bundle"
+    ).split(",")
+    if path.strip()
+]
+
+# Request headers that change the response of a read, so they are part of the key
+KEY_HEADERS = ("if-none-match", "if-modified-since", "authorization", "x-causal-token")
+
+
+@dataclass
+class CoalescingStats:
+    """Request counts of one route."""
+    requests: int = 0
+    coalesced: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Share of requests served by another request's computation."""
+        return self.coalesced / self.requests if self.requests else 0.0
+
+
+def request_key(scope: Scope) -> Tuple:
+    """Build the coalescing key of a request."""
+    query = sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    headers = Headers(scope=scope)
+    return (
+        scope["method"],
+        scope["path"],
+        urlencode(query),
+        *(headers.get(name) for name in KEY_HEADERS),
+    )
+
+
+class SingleFlight:
+    """Registry of in-flight computations shared by key."""
+
+    def __init__(self):
+        self.stats: Dict[str, CoalescingStats] = {}
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+
+    async def do(self, route: str, key: Tuple, fn: Callable[[], Awaitable]):
+        """Await fn(), or the already running call with the same key."""
+        stats = self.stats.setdefault(route, CoalescingStats())
+        stats.requests += 1
+        task = self._inflight.get(key)
+        if task is None:
+            # Run in its own task so a disconnecting first caller does not
+            # cancel the computation the others are waiting on
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            stats.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Tuple, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def metrics(self) -> dict:
+        """Coalescing counts and ratio, overall and per route."""
+        requests = sum(stats.requests for stats in self.stats.values())
+        coalesced = sum(stats.coalesced for stats in self.stats.values())
+        return {
+            "requests": requests,
+            "coalesced": coalesced,
+            "coalescing_ratio": coalesced / requests if requests else 0.0,
+            "in_flight": len(self._inflight),
+            "routes": {
+                route: {"requests": stats.requests, "coalesced": stats.coalesced, "coalescing_ratio": stats.ratio}
+                for route, stats in sorted(self.stats.items())
+            },
+        }
+
+
+# Global single-flight registry for API reads
+single_flight = SingleFlight()
+
+
+class SingleFlightMiddleware:
+    """ASGI middleware sharing one in-flight response between identical GETs."""
+
+    def __init__(self, app: ASGIApp, paths: Optional[List[str]] = None, group: Optional[SingleFlight] = None):
+        self.app = app
+        self.paths = set(SINGLEFLIGHT_PATHS if paths is None else paths)
+        self.group = group or single_flight
+
+    async def _capture(self, scope: Scope, receive: Receive) -> List[Message]:
+        messages: List[Message] = []
+
+        async def capture(message: Message):
+            messages.append(message)
+
+        await self.app(scope, receive, capture)
+        return messages
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        messages = await self.group.do(scope["path"], request_key(scope), lambda: self._capture(scope, receive))
+        for message in messages:
+            if message["type"] == "http.response.start":
+                # Outer middleware edits headers in place, so each client gets a copy
+                message = {**message, "headers": list(message["headers"])}
+            await send(message)
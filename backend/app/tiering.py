@@ -0,0 +1,192 @@
+"""
+Hot/cold tiering of closed user reports.
+
+Resolved and false alarm reports older than ARCHIVE_AFTER_DAYS are moved out
+of user_reports into user_reports_archive, a collection created with zstd
+block compression, so list queries and indexes only cover live reports.
+Reports are still found by ID: get_report falls through to the archive.
+
+Reports move in batches of ARCHIVE_BATCH_SIZE: each batch is upserted into
+the archive, then deleted from user_reports if it is still closed and
+unchanged (same change_seq and updated_at). A report reopened or edited in
+between stays hot and its archived copy is dropped again. The
+pass records its cutoff and progress in tiering_checkpoints, so an
+interrupted pass picks up where it stopped with the same cutoff:
+
+    python -m app.tiering archive [--days N] [--max-batches N]
+    python -m app.tiering status
+
+Archived reports get no tombstone, since they still exist; delta sync
+clients keep their copies.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import CollectionInvalid
+
+from app.db import get_database
+from app.schema import decode_report, encode_filters
+from app.versions import collection_versions
+
+HOT_COLLECTION = "user_reports"
+ARCHIVE_COLLECTION = "user_reports_archive"
+CHECKPOINTS_COLLECTION = "tiering_checkpoints"
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# Pause between batches to leave the primary room for live traffic
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.getenv("ARCHIVE_BATCH_PAUSE_SECONDS", "0.2"))
+
+# Report statuses that are final and can leave the hot tier
+CLOSED_STATUSES = ["resolved", "false_alarm"]
+
+# WiredTiger compresses the archive's blocks with zstd instead of snappy
+ARCHIVE_STORAGE_ENGINE = {"wiredTiger": {"configString": "block_compressor=zstd"}}
+
+
+def _get_collection(name: str):
+    database = get_database()
+    if database is None:
+        raise RuntimeError("Database not connected")
+    return database.get_collection(name)
+
+
+async def create_archive_collection():
+    """Create the compressed archive collection and the index tiering scans."""
+    database = get_database()
+    if database is None:
+        return
+    try:
+        await database.create_collection(ARCHIVE_COLLECTION, storageEngine=ARCHIVE_STORAGE_ENGINE)
+        print(f"🧊 Created {ARCHIVE_COLLECTION} with zstd compression")
+    except CollectionInvalid:
+        pass
+    await database.get_collection(HOT_COLLECTION).create_index([("status", 1), ("timestamp", 1)])
+
+
+async def get_archived(report_id: str) -> Optional[dict]:
+    """Get an archived report by ID."""
+    if not ObjectId.is_valid(report_id):
+        return None
+    result = await _get_collection(ARCHIVE_COLLECTION).find_one({"_id": ObjectId(report_id)})
+    if result:
+        result["_id"] = str(result["_id"])
+    return decode_report(result)
+
+
+async def archive_batch(cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> Tuple[int, int]:
+    """Move one batch of closed reports older than cutoff to the archive.
+
+    Returns how many reports the batch read and how many it moved; reports
+    changed in between are read but stay hot until a later batch.
+    """
+    hot = _get_collection(HOT_COLLECTION)
+    archive = _get_collection(ARCHIVE_COLLECTION)
+    closed = encode_filters({"status": {"$in": CLOSED_STATUSES}, "timestamp": {"$lt": cutoff}})
+
+    docs = await hot.find(closed).sort("timestamp", 1).limit(batch_size).to_list(length=batch_size)
+    if not docs:
+        return 0, 0
+    now = datetime.utcnow()
+    # Upserts make a batch safe to repeat after an interrupted pass
+    await archive.bulk_write([
+        ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": now}, upsert=True)
+        for doc in docs
+    ], ordered=False)
+
+    ids = [doc["_id"] for doc in docs]
+    # Only delete reports still matching the copy archived above; a missing
+    # field matches None, so reports from before change tracking are covered
+    result = await hot.bulk_write([
+        DeleteOne({
+            "_id": doc["_id"],
+            "change_seq": doc.get("change_seq"),
+            "updated_at": doc.get("updated_at"),
+            **closed
+        })
+        for doc in docs
+    ], ordered=False)
+    if result.deleted_count < len(ids):
+        # Changed since the batch was read; the hot copy stays authoritative
+        changed: List[ObjectId] = [
+            doc["_id"] async for doc in hot.find({"_id": {"$in": ids}}, {"_id": 1})
+        ]
+        await archive.delete_many({"_id": {"$in": changed}})
+    if result.deleted_count:
+        await collection_versions.bump(HOT_COLLECTION)
+    return len(docs), result.deleted_count
+
+
+async def archive_closed_reports(
+    days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None
+) -> dict:
+    """Run or resume a tiering pass, returning its checkpoint."""
+    checkpoints = _get_collection(CHECKPOINTS_COLLECTION)
+    checkpoint = await checkpoints.find_one({"_id": HOT_COLLECTION})
+    if checkpoint is None or checkpoint.get("completed_at"):
+        checkpoint = {
+            "_id": HOT_COLLECTION,
+            "cutoff": datetime.utcnow() - timedelta(days=days),
+            "archived": 0,
+            "started_at": datetime.utcnow(),
+            "completed_at": None
+        }
+    else:
+        print(f"🧊 Resuming tiering pass from {checkpoint['started_at']} ({checkpoint['archived']} archived)")
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        read, moved = await archive_batch(checkpoint["cutoff"], batch_size)
+        if not read:
+            checkpoint["completed_at"] = datetime.utcnow()
+        checkpoint["archived"] += moved
+        checkpoint["updated_at"] = datetime.utcnow()
+        await checkpoints.replace_one({"_id": HOT_COLLECTION}, checkpoint, upsert=True)
+        if checkpoint["completed_at"]:
+            break
+        if not moved:
+            # Every report read was changed meanwhile; leave the pass open for the next run
+            print(f"🧊 No reports moved from a batch of {read}, pausing the tiering pass")
+            break
+        batches += 1
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+    return checkpoint
+
+
+async def _main():
+    from app.db import connect_to_mongo, close_mongo_connection
+
+    parser = argparse.ArgumentParser(description="OceanEye report tiering")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    archive_parser = subcommands.add_parser("archive", help="Move old closed reports to the archive")
+    archive_parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="Archive reports older than N days")
+    archive_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Reports moved per batch")
+    archive_parser.add_argument("--max-batches", type=int, default=None, help="Stop after N batches")
+    subcommands.add_parser("status", help="Show the current tiering checkpoint")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        if args.command == "archive":
+            await create_archive_collection()
+            checkpoint = await archive_closed_reports(args.days, args.batch_size, args.max_batches)
+            state = "done" if checkpoint["completed_at"] else "paused"
+            print(f"🧊 Archived {checkpoint['archived']} reports older than {checkpoint['cutoff']} ({state})")
+        elif args.command == "status":
+            checkpoint = await _get_collection(CHECKPOINTS_COLLECTION).find_one({"_id": HOT_COLLECTION})
+            archived = await _get_collection(ARCHIVE_COLLECTION).estimated_document_count()
+            print(f"🧊 Checkpoint: {checkpoint}")
+            print(f"🧊 {archived} reports in {ARCHIVE_COLLECTION}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
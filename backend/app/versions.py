@@ -0,0 +1,161 @@
+"""
+Per-collection write versions for conditional GET (ETag / Last-Modified).
+
+Every write through the CRUD layer bumps its collection's version and
+high-water-mark modification time. The counters live in memory so validating
+a request costs nothing, and are mirrored in the collection_versions
+collection so that writes handled by other worker processes are picked up
+within VERSION_SYNC_SECONDS.
+
+Modification times have whole seconds, like Last-Modified itself. The header
+is held back while its second is still running, so If-Modified-Since never
+validates a response that a write later in the same second has changed.
+"""
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from pymongo import ReturnDocument
+
+from app.db import get_database
+
+VERSIONS_COLLECTION = "collection_versions"
+
+VERSION_SYNC_SECONDS = float(os.getenv("VERSION_SYNC_SECONDS", "1"))
+
+
+def _get_versions_collection():
+    database = get_database()
+    if database is None:
+        return None
+    return database.get_collection(VERSIONS_COLLECTION)
+
+
+class CollectionVersions:
+    """Write versions and last-modified times per collection."""
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._modified: Dict[str, datetime] = {}
+        self._synced_at = 0.0
+        # Distinguishes this process's validators when there is no database
+        self._epoch = uuid.uuid4().hex[:8]
+
+    def version(self, name: str) -> int:
+        return self._versions.get(name, 0)
+
+    def last_modified(self, names: Iterable[str]) -> Optional[datetime]:
+        """Get the latest modification time across collections."""
+        times = [self._modified[name] for name in names if name in self._modified]
+        return max(times) if times else None
+
+    def _merge(self, name: str, version: int, modified: Optional[datetime]):
+        if version > self._versions.get(name, 0):
+            self._versions[name] = version
+        if modified and (name not in self._modified or modified > self._modified[name]):
+            self._modified[name] = modified
+
+    async def bump(self, name: str):
+        """Record a write to a collection."""
+        now = datetime.utcnow().replace(microsecond=0)
+        self._merge(name, self.version(name) + 1, now)
+        collection = _get_versions_collection()
+        if collection is None:
+            return
+        stored = await collection.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$max": {"modified_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._merge(name, stored["version"], stored.get("modified_at"))
+
+    async def sync(self, force: bool = False):
+        """Pick up writes made by other processes, at most every VERSION_SYNC_SECONDS."""
+        if not force and time.monotonic() - self._synced_at < VERSION_SYNC_SECONDS:
+            return
+        self._synced_at = time.monotonic()
+        collection = _get_versions_collection()
+        if collection is None:
+            return
+        async for doc in collection.find():
+            self._merge(doc["_id"], doc.get("version", 0), doc.get("modified_at"))
+
+    def etag(self, names: Iterable[str], params: str = "") -> str:
+        """Build a weak ETag from collection versions and request parameters."""
+        versions = ".".join(f"{name}:{self.version(name)}" for name in sorted(names))
+        digest = hashlib.blake2b(f"{versions}|{params}".encode(), digest_size=8).hexdigest()
+        database = get_database()
+        prefix = database.name if database is not None else self._epoch
+        return f'W/"{prefix}-{digest}"'
+
+
+# Global version registry
+collection_versions = CollectionVersions()
+
+
+def _normalized_query(request: Request) -> str:
+    return "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+async def check_not_modified(
+    request: Request,
+    response: Response,
+    collections: Iterable[str],
+    extra: str = ""
+) -> Optional[Response]:
+    """Set validators on response and return a 304 if the client is current.
+
+    Call before running the query; when a Response is returned the endpoint
+    should return it straight away.
+    """
+    collections = list(collections)
+    try:
+        await collection_versions.sync()
+    except Exception as e:
+        print(f"Failed to sync collection versions: {e}")
+
+    etag = collection_versions.etag(collections, f"{request.url.path}?{_normalized_query(request)}|{extra}")
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    last_modified = collection_versions.last_modified(collections)
+    # Last-Modified has whole seconds, so it is only sent once its second is
+    # over; a later write then always carries a later time
+    if last_modified and datetime.utcnow() - last_modified >= timedelta(seconds=1):
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = False
+        if if_modified_since and last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since).astimezone(timezone.utc).replace(tzinfo=None)
+                not_modified = last_modified <= since
+            except (TypeError, ValueError):
+                pass
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return None
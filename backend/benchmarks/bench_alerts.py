@@ -0,0 +1,147 @@
+"""
+Geofenced alert matching and dispatch benchmark.
+
+Builds the subscription grid with synthetic subscriptions along the Indian
+coastline (mostly circles, some polygons, a few state-sized areas), then
+measures index build time and memory, report matching throughput against a
+linear scan, and end-to-end dispatch throughput through a null sink with
+dedup.
+
+    python -m benchmarks.bench_alerts [subscriptions] [reports]
+"""
+import asyncio
+import random
+import resource
+import statistics
+import sys
+import time
+
+from bson import ObjectId
+
+from app.alerts import AlertDispatcher, AlertEngine, Subscription, SubscriptionGrid
+
+# Coastal stretches as (lat, lng) of their ends
+COASTLINE = [
+    ((8.1, 77.5), (13.1, 80.3)),
+    ((13.1, 80.3), (21.5, 87.0)),
+    ((8.1, 77.5), (12.9, 74.8)),
+    ((12.9, 74.8), (22.5, 69.0)),
+]
+
+SEED = 45
+
+
+def coastal_point(rng: random.Random) -> tuple:
+    (lat1, lng1), (lat2, lng2) = rng.choice(COASTLINE)
+    t = rng.random()
+    return lat1 + (lat2 - lat1) * t + rng.gauss(0, 0.3), lng1 + (lng2 - lng1) * t + rng.gauss(0, 0.3)
+
+
+def subscription_doc(rng: random.Random, i: int) -> dict:
+    lat, lng = coastal_point(rng)
+    roll = rng.random()
+    if roll < 0.85:
+        area = {"center": [lat, lng], "radius_km": rng.uniform(2, 30)}
+    elif roll < 0.999:
+        half = rng.uniform(0.05, 0.4)
+        area = {"polygon": [
+            [lat - half, lng - half], [lat - half, lng + half],
+            [lat + half, lng + half * 0.5], [lat + half, lng - half]
+        ]}
+    else:
+        area = {"center": [lat, lng], "radius_km": rng.uniform(150, 400)}
+    doc = {"_id": f"s{i}", "user_id": f"u{i % 200000}", "area": area}
+    if rng.random() < 0.2:
+        doc["hazard_types"] = ["tsunami", "storm_surge"]
+    return doc
+
+
+def rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class NullSink:
+    """Counts batches instead of delivering them."""
+
+    def __init__(self):
+        self.batches = 0
+
+    async def send(self, batch):
+        self.batches += 1
+
+    async def close(self):
+        pass
+
+
+async def dispatch(engine: AlertEngine, reports: list) -> dict:
+    """Push alertable reports through matching, dedup and batching."""
+    engine.dispatcher.start()
+    started = time.perf_counter()
+    for report_id, report in reports:
+        await engine.notify_report(report_id, report)
+        # Let the sender run, as request handling would
+        await asyncio.sleep(0)
+    await engine.dispatcher.stop()
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, **engine.dispatcher.metrics()}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    report_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(SEED)
+
+    docs = [subscription_doc(rng, i) for i in range(count)]
+    rss_before = rss_mib()
+    started = time.perf_counter()
+    grid = SubscriptionGrid()
+    for doc in docs:
+        grid.put(Subscription.from_doc(doc))
+    build_s = time.perf_counter() - started
+    print(f"{count} subscriptions: built in {build_s:.1f} s, {len(grid.cells)} cells, "
+          f"{len(grid.oversized)} oversized, ~{rss_mib() - rss_before:.0f} MiB")
+
+    reports = []
+    for _ in range(report_count):
+        lat, lng = coastal_point(rng)
+        reports.append((str(ObjectId()), {
+            "title": "Benchmark report",
+            "location": "Coast",
+            "coordinates": [lat, lng],
+            "type": rng.choice(["tsunami", "storm_surge", "high_waves"]),
+            "severity": "critical",
+            "incident_id": f"i{rng.randrange(report_count // 4)}",
+        }))
+
+    latencies = []
+    matched = 0
+    for _, report in reports:
+        lat, lng = report["coordinates"]
+        t0 = time.perf_counter()
+        matched += len(grid.match(lat, lng, report["type"]))
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    print(f"grid match: {report_count / sum(latencies):,.0f} reports/s, "
+          f"p50 {statistics.median(latencies) * 1e3:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms, "
+          f"{matched / report_count:.0f} subscriptions per report")
+
+    # A linear scan over every subscription, on a small sample
+    sample = reports[:20]
+    subscriptions = list(grid.subscriptions.values())
+    t0 = time.perf_counter()
+    for _, report in sample:
+        lat, lng = report["coordinates"]
+        sum(1 for subscription in subscriptions if subscription.contains(lat, lng))
+    scan_ms = (time.perf_counter() - t0) / len(sample) * 1e3
+    print(f"linear scan: {scan_ms:.1f} ms per report")
+
+    engine = AlertEngine(grid, AlertDispatcher(NullSink(), flush_seconds=0.05, queue_size=10_000_000))
+    engine.sync = lambda force=False: asyncio.sleep(0)
+    stats = asyncio.run(dispatch(engine, reports))
+    print(f"dispatch: {report_count / stats['elapsed']:,.0f} reports/s, "
+          f"{stats['sent'] / stats['elapsed']:,.0f} alerts/s, sent {stats['sent']}, "
+          f"deduplicated {stats['deduplicated']}, batches {engine.dispatcher.sink.batches}, dropped {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
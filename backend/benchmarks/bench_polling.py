@@ -0,0 +1,69 @@
+"""
+Steady-state dashboard polling benchmark for conditional GETs.
+
+Polls the dashboard endpoints of a running API, once sending the validators
+from the previous response (If-None-Match) and once without, and compares
+bytes transferred and request latency.
+
+    python -m benchmarks.bench_polling [base_url] [rounds]
+"""
+import statistics
+import sys
+import time
+
+import httpx
+
+ENDPOINTS = ["/api/reports?limit=1000", "/api/social", "/api/trending"]
+
+
+def poll(client: httpx.Client, rounds: int, conditional: bool) -> dict:
+    """Poll every endpoint rounds times and collect bytes and latencies."""
+    etags = {}
+    total_bytes = 0
+    latencies = []
+    not_modified = 0
+    for _ in range(rounds):
+        for endpoint in ENDPOINTS:
+            headers = {}
+            if conditional and endpoint in etags:
+                headers["If-None-Match"] = etags[endpoint]
+            started = time.perf_counter()
+            response = client.get(endpoint, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            total_bytes += len(response.content)
+            if response.status_code == 304:
+                not_modified += 1
+            elif "etag" in response.headers:
+                etags[endpoint] = response.headers["etag"]
+    return {
+        "bytes": total_bytes,
+        "not_modified": not_modified,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def main():
+    base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000"
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        plain = poll(client, rounds, conditional=False)
+        conditional = poll(client, rounds, conditional=True)
+
+    requests = rounds * len(ENDPOINTS)
+    print(f"{requests} polls per mode against {base_url}")
+    for name, stats in (("unconditional", plain), ("conditional", conditional)):
+        print(
+            f"{name:>13}: {stats['bytes'] / 1024:10.1f} KiB, "
+            f"p50 {stats['p50_ms']:6.2f} ms, mean {stats['mean_ms']:6.2f} ms, "
+            f"304s {stats['not_modified']}"
+        )
+    if plain["bytes"]:
+        print(f"Bandwidth saved: {100 * (1 - conditional['bytes'] / plain['bytes']):.1f}%")
+    if plain["mean_ms"]:
+        print(f"Mean latency saved: {100 * (1 - conditional['mean_ms'] / plain['mean_ms']):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Throughput benchmark for the batch sentiment classifier.
+
+Classifies a synthetic corpus on a single core and fails if throughput drops
+below the target of 10k posts/sec per core.
+
+    python -m benchmarks.bench_sentiment [n_posts]
+"""
+import random
+import sys
+import time
+
+from app.sentiment import BATCH_SIZE, SentimentClassifier
+
+TARGET_POSTS_PER_SEC = 10_000
+
+SAMPLE_POSTS = [
+    "Massive waves hitting the shore at #MarinaBeach! Stay safe everyone #ChennaiWeather #OceanAlert",
+    "Fishermen advised not to venture into sea today due to rough weather conditions. Waves up to 4m expected.",
+    "Beautiful but dangerous waves at #PuriBeach today. Tourists please maintain safe distance! #OdishaCoast",
+    "Live: Storm surge footage from Visakhapatnam port - Emergency response in action",
+    "Evacuation ordered for low lying villages near Cuddalore, move inland immediately #TsunamiWatch",
+    "Beach cleanup drive at Juhu this Sunday, thanks to all the volunteers! #CleanCoast",
+    "Tide seems a bit higher than usual near the jetty this evening",
+    "Oil spill reported off the Kochi coast, fishing boats asked to avoid the area",
+]
+
+
+def make_corpus(n_posts: int, seed: int = 42) -> list:
+    """Build a corpus of posts by shuffling words of realistic samples."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n_posts):
+        words = rng.choice(SAMPLE_POSTS).split()
+        rng.shuffle(words)
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def main():
+    n_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    corpus = make_corpus(n_posts)
+    classifier = SentimentClassifier()
+
+    # Warm up allocator and regex caches
+    classifier.classify(corpus[:BATCH_SIZE])
+
+    started = time.perf_counter()
+    labels = []
+    for start in range(0, n_posts, BATCH_SIZE):
+        labels.extend(classifier.classify(corpus[start:start + BATCH_SIZE]))
+    elapsed = time.perf_counter() - started
+
+    throughput = n_posts / elapsed
+    counts = {label: labels.count(label) for label in sorted(set(labels))}
+    print(f"Classified {n_posts} posts in {elapsed:.2f}s on one core")
+    print(f"Throughput: {throughput:,.0f} posts/sec (target {TARGET_POSTS_PER_SEC:,})")
+    print(f"Label distribution: {counts}")
+
+    if throughput < TARGET_POSTS_PER_SEC:
+        print("❌ Below target throughput")
+        sys.exit(1)
+    print("✅ Throughput target met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Server startup benchmark: cold start and time to first request.
+
+Launches the production entry point (main.py) repeatedly and measures, from
+process spawn, when the port accepts connections, when the first request
+completes, the latency of the first and a warm request, and how long the
+server takes to exit after SIGTERM.
+
+    python -m benchmarks.bench_startup [runs] [workers]
+"""
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+STARTUP_TIMEOUT = 60
+FIRST_REQUEST = "/api/reports?limit=100"
+
+
+def wait_for_port(port: int, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                return True
+        except OSError:
+            time.sleep(0.005)
+    return False
+
+
+def run_once(workers: int) -> dict:
+    """Start the server once and time its startup and shutdown."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(PORT), "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_for_port(PORT, started + STARTUP_TIMEOUT):
+            raise RuntimeError("Server did not start listening")
+        listening = time.perf_counter()
+
+        with httpx.Client(base_url=f"http://127.0.0.1:{PORT}", timeout=STARTUP_TIMEOUT) as client:
+            request_started = time.perf_counter()
+            client.get(FIRST_REQUEST).raise_for_status()
+            first_done = time.perf_counter()
+            client.get(FIRST_REQUEST).raise_for_status()
+            warm_done = time.perf_counter()
+
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=STARTUP_TIMEOUT)
+        stopped = time.perf_counter()
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    return {
+        "cold_start_ms": (listening - started) * 1000,
+        "first_request_at_ms": (first_done - started) * 1000,
+        "first_request_ms": (first_done - request_started) * 1000,
+        "warm_request_ms": (warm_done - first_done) * 1000,
+        "shutdown_ms": (stopped - warm_done) * 1000,
+    }
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    results = [run_once(workers) for _ in range(runs)]
+    print(f"{runs} runs of main.py with {workers} worker(s)")
+    for metric, label in (
+        ("cold_start_ms", "spawn -> listening"),
+        ("first_request_at_ms", "spawn -> first response"),
+        ("first_request_ms", "first request latency"),
+        ("warm_request_ms", "warm request latency"),
+        ("shutdown_ms", "SIGTERM -> exit"),
+    ):
+        values = [result[metric] for result in results]
+        print(f"{label:>24}: median {statistics.median(values):8.1f} ms, max {max(values):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
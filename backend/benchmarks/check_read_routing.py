@@ -0,0 +1,75 @@
+"""
+Read routing check against a replica set.
+
+Verifies that list reads are served by a secondary and that a report is
+readable straight after it is created when its causal token is passed, even
+from a secondary. Needs a replica set with at least one secondary, e.g.:
+
+    MONGODB_URL="mongodb://localhost:27017/?replicaSet=rs0" python -m benchmarks.check_read_routing
+"""
+import asyncio
+import sys
+
+from app import db
+from app.crud import user_reports_crud
+from app.models import CoastalHazardType, SeverityLevel, UserReportCreate
+
+ROUND_TRIPS = 20
+
+
+async def check_secondary_reads() -> bool:
+    """Check that list reads are served by a secondary."""
+    cursor = user_reports_crud.read_collection.find({}).limit(1)
+    await cursor.to_list(length=1)
+    secondaries = {(host, port) for host, port in db.client.secondaries}
+    served_by = cursor.address
+    print(f"list read served by {served_by}, secondaries {sorted(secondaries)}")
+    return served_by in secondaries
+
+
+async def check_read_your_writes() -> bool:
+    """Create reports and read each back at once with its causal token."""
+    misses = 0
+    created = []
+    for i in range(ROUND_TRIPS):
+        report = UserReportCreate(
+            title=f"Read routing check {i}",
+            description="Created by benchmarks.check_read_routing",
+            location="Marina Beach, Chennai",
+            coordinates=[13.0478, 80.2619],
+            severity=SeverityLevel.LOW,
+            type=CoastalHazardType.OTHER,
+            author="read-routing-check"
+        )
+        async with db.causal_session() as session:
+            report_id = await user_reports_crud.create(report.model_dump(), session=session)
+            token = db.causal_token(session)
+        created.append(report_id)
+        if await user_reports_crud.get_report(report_id, token) is None:
+            misses += 1
+    print(f"{ROUND_TRIPS - misses}/{ROUND_TRIPS} reports read back with their causal token")
+    for report_id in created:
+        await user_reports_crud.delete(report_id)
+    return misses == 0
+
+
+async def main() -> int:
+    await db.connect_to_mongo()
+    if db.client is None:
+        print("MongoDB is not reachable")
+        return 1
+    try:
+        await db.client.admin.command("ping")
+        if not db.client.secondaries:
+            print("No secondaries found; point MONGODB_URL at a replica set")
+            return 1
+        ok = await check_secondary_reads()
+        ok = await check_read_your_writes() and ok
+    finally:
+        await db.close_mongo_connection()
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,425 @@
+"""
+Surge load test: replays a tsunami warning traffic spike against a running API.
+
+An event profile is a list of phases, each ramping two kinds of virtual users
+linearly from its start to its end counts:
+
+- reporters submit multipart POST /api/reports with photos and videos from a
+  synthetic media corpus, one report every --report-interval seconds on
+  average;
+- dashboards poll /api/reports, /api/dashboard/stats and /api/trending every
+  --poll-interval seconds with If-None-Match, as the web dashboard does.
+
+Every --sample-seconds a line shows throughput, p50/p99 latency, errors, shed
+requests (429/503 from admission control) and the server's resident memory.
+At the end the run is checked against SLO thresholds and the exit status is
+1 if any is breached.
+
+Each reporter has its own author and X-Forwarded-For address, like separate
+phones, so start the server with TRUST_FORWARDED_FOR=true or every report is
+rate limited as one client. Memory is read from /proc for --pid and its
+worker processes, or for a server the harness starts itself with --spawn:
+
+    TRUST_FORWARDED_FOR=true python main.py --workers 2
+    python -m benchmarks.load_surge --pid <server pid> [--profile tsunami|steady|profile.json]
+    python -m benchmarks.load_surge --spawn --workers 2 --time-scale 0.2
+
+Uploaded media is stored by the server under uploads/ like real reports.
+A profile file holds {"phases": [{"name", "seconds", "reporters": [start, end],
+"dashboards": [start, end]}, ...]}.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_startup import BACKEND_DIR, wait_for_port
+
+PROFILES = {
+    # Quiet coast, the warning goes out, reports and viewers surge, then decay
+    "tsunami": [
+        {"name": "baseline", "seconds": 30, "reporters": [5, 5], "dashboards": [50, 50]},
+        {"name": "warning", "seconds": 60, "reporters": [5, 200], "dashboards": [50, 500]},
+        {"name": "peak", "seconds": 120, "reporters": [200, 200], "dashboards": [500, 500]},
+        {"name": "decay", "seconds": 60, "reporters": [200, 20], "dashboards": [500, 100]},
+    ],
+    "steady": [
+        {"name": "steady", "seconds": 120, "reporters": [50, 50], "dashboards": [200, 200]},
+    ],
+}
+
+POLL_ENDPOINTS = ["/api/reports", "/api/dashboard/stats", "/api/trending"]
+REPORT_ENDPOINT = "/api/reports"
+
+# Reported stretches of the Indian coast: (location, latitude, longitude)
+PLACES = [
+    ("Marina Beach, Chennai", 13.0478, 80.2619),
+    ("RK Beach, Visakhapatnam", 17.7145, 83.3237),
+    ("Puri Beach", 19.7983, 85.8249),
+    ("Kovalam Beach", 8.4004, 76.9784),
+    ("Juhu Beach, Mumbai", 19.0988, 72.8267),
+    ("Digha Beach", 21.6266, 87.5074),
+]
+SURGE_HAZARDS = ["tsunami", "storm_surge", "high_waves", "flooding", "unusual_tide"]
+SEVERITIES = ["medium", "high", "critical"]
+
+# Synthetic media: (content type, extension, min KiB, max KiB, share of attachments)
+MEDIA_KINDS = [
+    ("image/jpeg", ".jpg", 80, 600, 0.85),
+    ("video/mp4", ".mp4", 1024, 6144, 0.15),
+]
+CORPUS_FILES_PER_KIND = 8
+
+SLO_DEFAULTS = {
+    "post_p99_ms": 2000.0,
+    "poll_p99_ms": 500.0,
+    "error_rate": 0.01,
+    "shed_rate": 0.05,
+}
+
+
+class Recorder:
+    """Collects request outcomes per endpoint, overall and per sample window."""
+
+    def __init__(self):
+        self.total: Dict[str, List[float]] = defaultdict(list)
+        self.window: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.window_outcomes: Dict[str, int] = defaultdict(int)
+        self.bytes_sent = 0
+
+    def record(self, label: str, latency: float, outcome: str):
+        self.total[label].append(latency)
+        self.window[label].append(latency)
+        self.outcomes[label][outcome] += 1
+        self.window_outcomes[outcome] += 1
+
+    def take_window(self) -> tuple:
+        latencies = [latency for values in self.window.values() for latency in values]
+        outcomes = dict(self.window_outcomes)
+        self.window = defaultdict(list)
+        self.window_outcomes = defaultdict(int)
+        return latencies, outcomes
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def outcome_of(status_code: int) -> str:
+    if status_code < 400:
+        return "ok"
+    if status_code in (429, 503):
+        return "shed"
+    return "error"
+
+
+def build_corpus(directory: Optional[str]) -> List[tuple]:
+    """Load media files from a directory, or generate random ones."""
+    if directory:
+        corpus = []
+        for path in sorted(Path(directory).iterdir()):
+            content_type = "video/mp4" if path.suffix.lower() in (".mp4", ".mov") else "image/jpeg"
+            corpus.append((path.name, path.read_bytes(), content_type, 1.0))
+        return corpus
+    rng = random.Random(48)
+    corpus = []
+    for content_type, extension, min_kib, max_kib, share in MEDIA_KINDS:
+        for i in range(CORPUS_FILES_PER_KIND):
+            size = rng.randint(min_kib, max_kib) * 1024
+            corpus.append((f"surge_{i}{extension}", rng.randbytes(size), content_type, share))
+    return corpus
+
+
+def process_rss_mib(pid: int) -> Optional[float]:
+    """Get the resident memory of a process and its descendants, from /proc."""
+    total_kib = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kib += int(line.split()[1])
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            if current == pid:
+                return None
+    return total_kib / 1024
+
+
+class SurgeTest:
+    """Runs the virtual reporters and dashboards of an event profile."""
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, phases: List[dict], corpus: List[tuple]):
+        self.client = client
+        self.args = args
+        self.phases = phases
+        self.corpus = corpus
+        self.recorder = Recorder()
+        self.reporters: List[asyncio.Task] = []
+        self.dashboards: List[asyncio.Task] = []
+        self.phase_name = phases[0]["name"]
+        self.timeline: List[dict] = []
+        self.max_loop_lag = 0.0
+        self._next_reporter = 0
+
+    async def _timed(self, label: str, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+            outcome = outcome_of(response.status_code)
+        except httpx.HTTPError:
+            response = None
+            outcome = "error"
+        self.recorder.record(label, time.perf_counter() - started, outcome)
+        return response
+
+    def _report_form(self, rng: random.Random, reporter_id: int) -> tuple:
+        location, lat, lng = rng.choice(PLACES)
+        data = {
+            "title": f"Surge report {reporter_id}",
+            "description": "Water rising fast after the warning, people moving inland",
+            "location": location,
+            "latitude": str(lat + rng.gauss(0, 0.02)),
+            "longitude": str(lng + rng.gauss(0, 0.02)),
+            "severity": rng.choice(SEVERITIES),
+            "hazard_type": rng.choice(SURGE_HAZARDS),
+            "author": f"surge-reporter-{reporter_id}",
+        }
+        weights = [share for *_, share in self.corpus]
+        attachments = rng.choices(self.corpus, weights, k=rng.choice([0, 1, 1, 2, 3]))
+        files = [("files", (name, content, content_type)) for name, content, content_type, _ in attachments]
+        return data, files
+
+    async def reporter(self, reporter_id: int):
+        rng = random.Random(reporter_id)
+        headers = {"X-Forwarded-For": f"10.{reporter_id >> 16 & 255}.{reporter_id >> 8 & 255}.{reporter_id & 255}"}
+        # Spread first reports so a ramp doesn't arrive as one burst
+        await asyncio.sleep(rng.uniform(0, self.args.report_interval))
+        while True:
+            data, files = self._report_form(rng, reporter_id)
+            self.recorder.bytes_sent += sum(len(content) for _, (_, content, _) in files)
+            await self._timed(
+                f"POST {REPORT_ENDPOINT}",
+                self.client.post(REPORT_ENDPOINT, data=data, files=files or None, headers=headers)
+            )
+            await asyncio.sleep(rng.expovariate(1 / self.args.report_interval))
+
+    async def dashboard(self, dashboard_id: int):
+        rng = random.Random(-dashboard_id - 1)
+        etags: Dict[str, str] = {}
+
+        async def poll(endpoint: str):
+            headers = {"If-None-Match": etags[endpoint]} if endpoint in etags else {}
+            response = await self._timed(f"GET {endpoint}", self.client.get(endpoint, headers=headers))
+            if response is not None and response.status_code == 200 and "etag" in response.headers:
+                etags[endpoint] = response.headers["etag"]
+
+        await asyncio.sleep(rng.uniform(0, self.args.poll_interval))
+        while True:
+            await asyncio.gather(*(poll(endpoint) for endpoint in POLL_ENDPOINTS))
+            await asyncio.sleep(self.args.poll_interval * rng.uniform(0.8, 1.2))
+
+    def _resize(self, tasks: List[asyncio.Task], target: int, start):
+        while len(tasks) < target:
+            tasks.append(asyncio.create_task(start()))
+        while len(tasks) > target:
+            tasks.pop().cancel()
+
+    def _start_reporter(self):
+        self._next_reporter += 1
+        return self.reporter(self._next_reporter)
+
+    async def _sample(self, elapsed: float):
+        latencies, outcomes = self.recorder.take_window()
+        requests = sum(outcomes.values())
+        rss = process_rss_mib(self.args.pid) if self.args.pid else None
+        sample = {
+            "t": round(elapsed, 1),
+            "phase": self.phase_name,
+            "reporters": len(self.reporters),
+            "dashboards": len(self.dashboards),
+            "rps": requests / self.args.sample_seconds,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "errors": outcomes.get("error", 0),
+            "shed": outcomes.get("shed", 0),
+            "rss_mib": rss,
+        }
+        self.timeline.append(sample)
+        print(
+            f"{sample['t']:7.1f}s {sample['phase']:>10} {sample['reporters']:5d} rep {sample['dashboards']:5d} dash "
+            f"{sample['rps']:8.1f} req/s  p50 {sample['p50_ms']:7.1f} ms  p99 {sample['p99_ms']:7.1f} ms  "
+            f"err {sample['errors']:4d}  shed {sample['shed']:4d}  "
+            f"rss {'-' if rss is None else f'{rss:.0f} MiB'}"
+        )
+
+    async def run(self):
+        started = time.perf_counter()
+        next_sample = self.args.sample_seconds
+        try:
+            for phase in self.phases:
+                self.phase_name = phase["name"]
+                seconds = phase["seconds"] * self.args.time_scale
+                phase_started = time.perf_counter()
+                while (progress := (time.perf_counter() - phase_started) / seconds) < 1:
+                    reporters = round(phase["reporters"][0] + (phase["reporters"][1] - phase["reporters"][0]) * progress)
+                    dashboards = round(phase["dashboards"][0] + (phase["dashboards"][1] - phase["dashboards"][0]) * progress)
+                    self._resize(self.reporters, round(reporters * self.args.scale), self._start_reporter)
+                    self._resize(self.dashboards, round(dashboards * self.args.scale),
+                                 lambda: self.dashboard(len(self.dashboards)))
+                    tick = time.perf_counter()
+                    await asyncio.sleep(0.25)
+                    # A late wake-up means this process, not the server, is the bottleneck
+                    self.max_loop_lag = max(self.max_loop_lag, time.perf_counter() - tick - 0.25)
+                    elapsed = time.perf_counter() - started
+                    if elapsed >= next_sample:
+                        await self._sample(elapsed)
+                        next_sample += self.args.sample_seconds
+        finally:
+            tasks = self.reporters + self.dashboards
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return time.perf_counter() - started
+
+
+def summarize(test: SurgeTest, elapsed: float) -> dict:
+    """Print per-endpoint results and return the figures checked against SLOs."""
+    recorder = test.recorder
+    print(f"\n{'endpoint':>26} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'shed':>6}")
+    totals = defaultdict(int)
+    for label in sorted(recorder.total):
+        latencies = recorder.total[label]
+        outcomes = recorder.outcomes[label]
+        for outcome, count in outcomes.items():
+            totals[outcome] += count
+        print(
+            f"{label:>26} {len(latencies):9d} {len(latencies) / elapsed:8.1f} "
+            f"{percentile(latencies, 0.5) * 1000:8.1f} {percentile(latencies, 0.99) * 1000:8.1f} "
+            f"{outcomes['error']:7d} {outcomes['shed']:6d}"
+        )
+    requests = sum(totals.values())
+    poll_latencies = [latency for label, values in recorder.total.items() if label.startswith("GET") for latency in values]
+    rss_values = [sample["rss_mib"] for sample in test.timeline if sample["rss_mib"] is not None]
+    print(f"\n{requests} requests in {elapsed:.0f} s ({requests / elapsed:.1f} req/s), "
+          f"{recorder.bytes_sent / 2 ** 20:.0f} MiB of media uploaded")
+    if rss_values:
+        print(f"server RSS: start {rss_values[0]:.0f} MiB, peak {max(rss_values):.0f} MiB, end {rss_values[-1]:.0f} MiB")
+    if test.max_loop_lag > 0.1:
+        print(f"⚠️ load generator fell behind by up to {test.max_loop_lag * 1000:.0f} ms; "
+              f"latencies include client-side delay, lower --scale or run it on another machine")
+    return {
+        "post_p99_ms": percentile(recorder.total.get(f"POST {REPORT_ENDPOINT}", []), 0.99) * 1000,
+        "poll_p99_ms": percentile(poll_latencies, 0.99) * 1000,
+        "error_rate": totals["error"] / requests if requests else 0.0,
+        "shed_rate": totals["shed"] / requests if requests else 0.0,
+        "peak_rss_mib": max(rss_values) if rss_values else None,
+    }
+
+
+def check_slos(results: dict, thresholds: dict) -> bool:
+    """Print each SLO check and return whether all of them passed."""
+    print("\nSLOs")
+    passed = True
+    for name, limit in thresholds.items():
+        value = results.get(name)
+        if limit is None or value is None:
+            continue
+        ok = value <= limit
+        passed = passed and ok
+        print(f"{'PASS' if ok else 'FAIL':>6} {name:>14}: {value:10.3f} (limit {limit})")
+    return passed
+
+
+def load_phases(profile: str) -> List[dict]:
+    if profile in PROFILES:
+        return PROFILES[profile]
+    with open(profile) as f:
+        return json.load(f)["phases"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="OceanEye surge load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--profile", default="tsunami", help="Built-in profile (tsunami, steady) or a JSON file")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the profile's user counts")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply the profile's phase durations")
+    parser.add_argument("--report-interval", type=float, default=15.0, help="Mean seconds between one reporter's reports")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between one dashboard's polls")
+    parser.add_argument("--sample-seconds", type=float, default=5.0)
+    parser.add_argument("--corpus", default=None, help="Directory of media files to upload instead of random ones")
+    parser.add_argument("--pid", type=int, default=None, help="Server process to measure memory of")
+    parser.add_argument("--spawn", action="store_true", help="Start main.py on --base-url's port for the run")
+    parser.add_argument("--workers", type=int, default=1, help="Workers of a spawned server")
+    parser.add_argument("--output", default=None, help="Write the timeline and results as JSON")
+    for name, default in SLO_DEFAULTS.items():
+        parser.add_argument(f"--slo-{name.replace('_', '-')}", type=float, default=default)
+    parser.add_argument("--slo-peak-rss-mib", type=float, default=None)
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> int:
+    phases = load_phases(args.profile)
+    corpus = build_corpus(args.corpus)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=2000)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30, limits=limits) as client:
+        test = SurgeTest(client, args, phases, corpus)
+        print(f"Profile {args.profile}: {', '.join(phase['name'] for phase in phases)} against {args.base_url}")
+        elapsed = await test.run()
+    results = summarize(test, elapsed)
+    thresholds = {name: getattr(args, f"slo_{name}") for name in (*SLO_DEFAULTS, "peak_rss_mib")}
+    passed = check_slos(results, thresholds)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"profile": args.profile, "timeline": test.timeline, "results": results,
+                       "slos": thresholds, "passed": passed}, f, indent=2)
+    return 0 if passed else 1
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.spawn:
+        return asyncio.run(run(args))
+
+    port = httpx.URL(args.base_url).port or 8000
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers)],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "TRUST_FORWARDED_FOR": "true"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_for_port(port, time.perf_counter() + 60):
+            print("Server did not start listening")
+            return 1
+        args.pid = process.pid
+        return asyncio.run(run(args))
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,91 @@
+"""
+Production server entry point for the OceanEye API.
+
+    python main.py [--host 0.0.0.0] [--port 8000] [--workers N]
+
+Runs one uvicorn worker process per available core, using uvloop and
+httptools when they are installed. Each worker connects to MongoDB, opens
+its connection pool and loads its in-memory indexes during lifespan startup,
+before it accepts connections. With several workers, each is replaced after
+a jittered number of requests. On SIGTERM the server stops accepting new
+connections and in-flight requests (e.g. uploads) get
+GRACEFUL_SHUTDOWN_SECONDS to finish.
+
+For development with auto-reload, run python -m app.main instead.
+"""
+import argparse
+import importlib.util
+import inspect
+import os
+
+import uvicorn
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+KEEPALIVE_SECONDS = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def available_cpus() -> int:
+    """Count the cores this process may use, honouring affinity and cgroup quotas."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def default_workers() -> int:
+    """Get the worker count from WEB_CONCURRENCY, or one per available core."""
+    return int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+
+
+def server_options(workers: int) -> dict:
+    """Build uvicorn options for a production run."""
+    options = {
+        "workers": workers,
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "lifespan": "on",
+        "timeout_keep_alive": KEEPALIVE_SECONDS,
+        "timeout_graceful_shutdown": GRACEFUL_SHUTDOWN_SECONDS,
+        "proxy_headers": True,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+        "access_log": False,
+    }
+    # Only the multi-worker supervisor replaces a recycled worker; a single
+    # worker would just exit, so it is left running
+    if MAX_REQUESTS > 0 and workers > 1:
+        options["limit_max_requests"] = MAX_REQUESTS
+        # Older uvicorn releases recycle every worker after the same count
+        if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+            options["limit_max_requests_jitter"] = MAX_REQUESTS_JITTER
+    return options
+
+
 def main():
-    print("Hello from backend!")
+    parser = argparse.ArgumentParser(description="OceanEye API production server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    args = parser.parse_args()
+
+    options = server_options(max(1, args.workers))
+    print(
+        f"🚀 Starting OceanEye API on {args.host}:{args.port} with {options['workers']} workers "
+        f"({options['loop']}, {options['http']})"
+    )
+    uvicorn.run("app.main:app", host=args.host, port=args.port, **options)
 
 
 if __name__ == "__main__":
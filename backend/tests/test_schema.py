@@ -0,0 +1,127 @@
+"""
+Round trips of version 1 and 2 report documents through app.schema.
+
+Filters are evaluated by mongomock, standing in for MongoDB's query matcher.
+"""
+from datetime import datetime
+
+import pytest
+
+from app import schema
+from app.models import CoastalHazardType, ReportStatus, SeverityLevel
+
+mongomock = pytest.importorskip("mongomock")
+
+TIMESTAMP = datetime(2025, 1, 15, 6, 30)
+
+REPORT = {
+    "title": "High Waves at Marina Beach",
+    "description": "Waves reaching 3 meters",
+    "location": "Marina Beach, Chennai",
+    "coordinates": [13.0478, 80.2619],
+    "type": "high_waves",
+    "severity": "high",
+    "status": "pending",
+    "author": "Coastal Volunteer",
+    "timestamp": TIMESTAMP,
+}
+
+
+def version_1(report: dict) -> dict:
+    """Build a report as stored before the compact schema."""
+    return {**report, "created_at": report["timestamp"]}
+
+
+@pytest.fixture
+def reports():
+    collection = mongomock.MongoClient().db.user_reports
+    v1_id = collection.insert_one(version_1(REPORT)).inserted_id
+    v2_id = collection.insert_one(schema.encode_report(dict(REPORT))).inserted_id
+    return collection, v1_id, v2_id
+
+
+def api_fields(document: dict) -> dict:
+    decoded = schema.decode_report(dict(document))
+    return {field: decoded.get(field) for field in REPORT}
+
+
+def test_encode_report_is_compact():
+    document = schema.encode_report(dict(REPORT))
+    assert document["v"] == schema.SCHEMA_VERSION
+    assert document["type"] == schema.HAZARD_TYPES.index("high_waves")
+    assert document["severity"] == schema.SEVERITY_LEVELS.index("high")
+    assert document["status"] == schema.REPORT_STATUSES.index("pending")
+    assert document["point"] == {"type": "Point", "coordinates": [80.2619, 13.0478]}
+    assert "coordinates" not in document
+
+
+def test_both_versions_decode_to_the_same_report(reports):
+    collection, v1_id, v2_id = reports
+    assert api_fields(collection.find_one({"_id": v1_id})) == REPORT
+    assert api_fields(collection.find_one({"_id": v2_id})) == REPORT
+
+
+def test_enum_values_are_accepted_as_enums():
+    document = schema.encode_report({**REPORT, "type": CoastalHazardType.HIGH_WAVES, "severity": SeverityLevel.HIGH})
+    assert api_fields(document) == REPORT
+
+
+@pytest.mark.parametrize("filters, matches", [
+    ({"type": "high_waves"}, True),
+    ({"type": CoastalHazardType.TSUNAMI}, False),
+    ({"status": {"$in": [ReportStatus.PENDING, ReportStatus.VERIFIED]}}, True),
+    ({"status": {"$nin": ["pending"]}}, False),
+    ({"severity": {"$ne": "low"}}, True),
+    ({"severity": {"$eq": "low"}}, False),
+    ({"coordinates.0": {"$gte": 13.0, "$lte": 13.1}, "coordinates.1": {"$gte": 80.2, "$lte": 80.3}}, True),
+    ({"coordinates.0": {"$gte": 14.0}}, False),
+    ({"$or": [{"type": "tsunami"}, {"severity": "high"}]}, True),
+    ({"$and": [{"type": "high_waves"}, {"status": "resolved"}]}, False),
+    ({"location": {"$regex": "marina", "$options": "i"}, "timestamp": {"$gte": TIMESTAMP}}, True),
+])
+def test_filters_match_both_versions(reports, filters, matches):
+    collection, v1_id, v2_id = reports
+    found = {doc["_id"] for doc in collection.find(schema.encode_filters(filters))}
+    assert found == ({v1_id, v2_id} if matches else set())
+
+
+def test_filters_on_coordinates_combine_with_or(reports):
+    collection, v1_id, v2_id = reports
+    filters = {"$or": [{"type": "tsunami"}, {"type": "high_waves"}], "coordinates.0": {"$gte": 13.0}}
+    found = {doc["_id"] for doc in collection.find(schema.encode_filters(filters))}
+    assert found == {v1_id, v2_id}
+
+
+def test_update_sets_compact_fields(reports):
+    collection, v1_id, v2_id = reports
+    for report_id in (v1_id, v2_id):
+        collection.update_one({"_id": report_id}, schema.encode_update({"status": "verified", "coordinates": [13.1, 80.3]}))
+        decoded = api_fields(collection.find_one({"_id": report_id}))
+        assert decoded["status"] == "verified"
+        assert decoded["coordinates"] == [13.1, 80.3]
+
+
+def test_migration_converts_version_1(reports):
+    collection, v1_id, v2_id = reports
+    assert schema.migration_update(collection.find_one({"_id": v2_id})) is None
+    update = schema.migration_update(collection.find_one({"_id": v1_id}))
+    result = collection.update_one(update._filter, update._doc)
+    assert result.modified_count == 1
+    migrated = collection.find_one({"_id": v1_id})
+    assert migrated["v"] == schema.SCHEMA_VERSION
+    assert "coordinates" not in migrated and "created_at" not in migrated
+    assert api_fields(migrated) == REPORT
+
+
+def test_migration_skips_a_report_changed_meanwhile(reports):
+    collection, v1_id, _ = reports
+    update = schema.migration_update(collection.find_one({"_id": v1_id}))
+    collection.update_one({"_id": v1_id}, {"$set": {"status": "resolved"}})
+    assert collection.update_one(update._filter, update._doc).modified_count == 0
+    assert api_fields(collection.find_one({"_id": v1_id}))["status"] == "resolved"
+
+
+def test_every_enum_value_has_a_code():
+    for field, enum in (("type", CoastalHazardType), ("severity", SeverityLevel), ("status", ReportStatus)):
+        for member in enum:
+            assert schema.decode_value(field, schema.encode_value(field, member)) == member.value